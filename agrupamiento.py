@@ -0,0 +1,170 @@
+import re
+from collections import Counter
+
+# Marcas técnicas de las releases: desde la primera, el resto del nombre
+# (calidad, códecs, grupo) no es parte del título
+CORTE = frozenset(
+    """
+    360p 480p 540p 576p 720p 1080p 1080i 1440p 2160p 4320p 4k 8k uhd fhd
+    webrip webdl hdtv pdtv hdrip bluray bdrip brrip dvdrip dvdscr
+    hdcam remux x264 x265 h264 h265 hevc avc xvid divx 10bit 8bit
+    """.split()
+)
+# Etiquetas que pueden aparecer en cualquier parte del nombre
+RUIDO = frozenset(
+    """
+    proper repack rerip internal extended unrated uncut remastered limited
+    dubbed subbed subs vose vostfr latino castellano dual multi hdr hdr10
+    aac ac3 eac3 dts ddp ddp5 truehd atmos
+    """.split()
+)
+# Con menos letras no se corrigen errores de tipeo (serían otras series)
+MIN_LETRAS_SIMILARES = 8
+# Cambiar una letra en un título corto suele dar otro título real ("The
+# Crown" y "The Clown"): la sustitución pide claves más largas
+MIN_LETRAS_SUSTITUCION = 10
+
+_CORCHETES = re.compile(r"\[([^\]]*)\]|\{([^}]*)\}")
+_TOKEN = re.compile(r"[^\W_]+")
+_ANIO = re.compile(r"(?:19|20)\d\d")
+# "Serie - 05": número de episodio que obtener_nombre_cap deja en el nombre
+_EPISODIO_SUELTO = re.compile(r"\s-\s+(\d{1,4})(?:v\d)?\b")
+
+
+def limpiar(nombre: str, nombre_archivo: str = "", temporada: str = "") -> str:
+    """
+    `nombre` (de obtener_nombre_cap) sin lo que no es el título: lo que sigue
+    a la primera marca técnica (720p, WEBRip, x264... y el grupo), etiquetas
+    sueltas, un año al final y, de `nombre_archivo`, lo que estaba entre
+    corchetes y un episodio suelto tras " - " (o al final, si hay
+    `temporada`). Si no quedara nada, retorna `nombre` tal cual.
+    """
+    palabras = nombre.split()
+    if "[" in nombre_archivo or "{" in nombre_archivo:
+        # [Grupo] Serie - 01 [1080p][ABCD1234].mkv
+        entre = Counter(
+            t
+            for m in _CORCHETES.finditer(nombre_archivo)
+            for t in _TOKEN.findall((m.group(1) or m.group(2) or "").lower())
+        )
+        limpias = []
+        for p in palabras:
+            if entre[p.lower()] > 0:
+                entre[p.lower()] -= 1
+            else:
+                limpias.append(p)
+        palabras = limpias
+    for i, p in enumerate(palabras):
+        p = p.lower()
+        siguiente = palabras[i + 1].lower() if i + 1 < len(palabras) else ""
+        if i and (p in CORTE or (p == "web" and siguiente in ("dl", "rip"))):
+            palabras = palabras[:i]
+            break
+    palabras = [p for p in palabras if p.lower() not in RUIDO]
+    m = _EPISODIO_SUELTO.search(nombre_archivo)
+    if len(palabras) > 1 and (
+        (m and palabras[-1] == m.group(1))
+        or (temporada and palabras[-1].isdigit() and len(palabras[-1]) <= 3)
+    ):
+        palabras.pop()
+    if len(palabras) > 1 and _ANIO.fullmatch(palabras[-1]):
+        palabras.pop()
+    return " ".join(palabras) or nombre
+
+
+def clave(nombre: str) -> str:
+    # "Breaking Bad" y "BreakingBad" son la misma serie
+    return "".join(_TOKEN.findall(nombre.lower()))
+
+
+def _variantes(k: str):
+    # La clave con una letra menos (los dígitos no: Rocky 2 no es Rocky 3)
+    for i, c in enumerate(k):
+        if c.isalpha():
+            yield k[:i] + k[i + 1 :]
+
+
+def _a_una_edicion(a: str, b: str) -> bool:
+    # Una letra borrada, cambiada o transpuesta, con los umbrales de largo
+    if len(a) < len(b):
+        a, b = b, a
+    letras = min(sum(c.isalpha() for c in k) for k in (a, b))
+    if letras < MIN_LETRAS_SIMILARES or len(a) - len(b) > 1:
+        return False
+    i = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), len(b))
+    if len(a) != len(b):
+        return a[i].isalpha() and a[i + 1 :] == b[i:]
+    if i == len(a):
+        return True
+    if a[i + 1 :] == b[i + 1 :]:
+        return (
+            a[i].isalpha() and b[i].isalpha() and letras >= MIN_LETRAS_SUSTITUCION
+        )
+    return (
+        a[i : i + 2].isalpha()
+        and a[i : i + 2] == b[i + 1 : i + 2] + b[i]
+        and a[i + 2 :] == b[i + 2 :]
+    )
+
+
+def agrupar_nombres(nombres, preferidos=()) -> dict:
+    """
+    Agrupa los nombres (con repetidos: cada uno es un voto) que son la misma
+    serie con otra escritura: iguales sin espacios ni mayúsculas, o a una
+    letra borrada, cambiada o transpuesta de distancia. Retorna nombre ->
+    nombre canónico del grupo: el de `preferidos` (p. ej. carpetas que ya
+    existen) si hay, si no el más repetido.
+
+    Cada grupo se forma alrededor de su nombre más votado y solo se suman
+    los que están a una edición de él, no de cualquier miembro: así no se
+    encadenan series distintas. En vez de comparar todos los pares, los
+    representantes se indexan por sus variantes con una letra borrada (como
+    IndicePalabrasClave): el costo crece con la cantidad de nombres y el
+    largo de cada uno.
+    """
+    votos = Counter(nombres)
+    preferidos = set(preferidos)
+    todos = list(votos) + [p for p in preferidos if p not in votos]
+
+    # 1) Misma clave exacta
+    por_clave = {}
+    for nombre in todos:
+        por_clave.setdefault(clave(nombre), []).append(nombre)
+    claves = list(por_clave)
+
+    # 2) Claves a una edición del representante de un grupo, empezando por
+    # los preferidos y los más votados
+    def peso(k):
+        miembros = por_clave[k]
+        return (
+            not any(n in preferidos for n in miembros),
+            -sum(votos[n] for n in miembros),
+            len(k),
+            k,
+        )
+
+    grupos = {}  # representante -> claves, en orden de peso
+    cubetas = {}  # clave o variante -> representantes que la generaron
+    for k in sorted(claves, key=peso):
+        variantes = (k, *_variantes(k))
+        candidatos = {r for v in variantes for r in cubetas.get(v, ())}
+        cerca = [r for r in candidatos if _a_una_edicion(r, k)]
+        if cerca:
+            grupos[min(cerca, key=peso)].append(k)
+            continue
+        grupos[k] = [k]
+        if sum(c.isalpha() for c in k) >= MIN_LETRAS_SIMILARES:
+            for v in variantes:
+                cubetas.setdefault(v, []).append(k)
+
+    # 3) Un nombre canónico por grupo
+    canonicos = {}
+    for grupo in grupos.values():
+        miembros = [n for k in grupo for n in por_clave[k]]
+        canonico = min(
+            miembros,
+            key=lambda n: (n not in preferidos, -votos[n], len(n), n),
+        )
+        for nombre in miembros:
+            canonicos[nombre] = canonico
+    return canonicos
@@ -0,0 +1,8 @@
+"""
+Benchmarks del organizador sobre bibliotecas sintéticas.
+
+Uso (desde la raíz del proyecto):
+
+    python -m benchmarks --archivos 1000 10000 --salida bench.json
+    python -m benchmarks --archivos 10000 --comparar bench.json
+"""
@@ -0,0 +1,190 @@
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import organizador_core as core
+from benchmarks.generador import generar_biblioteca, generar_db, generar_nombres
+
+EXTENSIONES = [".avi", ".mp4", ".mkv", ".mpg", ".mov", ".wmv", ".mp3"]
+
+
+# -------------------------------
+# Etapas
+# -------------------------------
+# Cada etapa es preparar(tmp, n) -> estado y correr(estado). Solo se mide
+# correr(); preparar() genera de nuevo lo que la etapa anterior consumió.
+
+
+def _cfg():
+    return core.cargar_config(Path("__no_existe__.json"))
+
+
+def preparar_parseo(tmp: Path, n: int):
+    # Parser nuevo en cada repetición para medir también los fallos de caché
+    return core.ParserNombres(), [Path(r).name for r in generar_nombres(n)]
+
+
+def correr_parseo(estado):
+    parser, nombres = estado
+    parser.parsear_lote(nombres)
+
+
+def preparar_consulta(tmp: Path, n: int):
+    nombres = generar_nombres(n)
+    db = tmp / "consulta.db"
+    if not db.exists():
+        generar_db(db, nombres)
+    bases = sorted({core.obtener_nombre_cap(Path(r).name)[0] for r in nombres})
+    return db, bases
+
+
+def correr_consulta(estado):
+    db, bases = estado
+    with core.ClasificacionRepo(db) as repo:
+        repo.buscar_lote(bases)
+
+
+def preparar_mover(tmp: Path, n: int):
+    lib = tmp / "mover"
+    shutil.rmtree(lib, ignore_errors=True)
+    creados = generar_biblioteca(lib, n)
+    destino = lib / "_destino"
+    return [core.Movimiento(lib / r, destino / Path(r).name) for r in creados]
+
+
+def correr_mover(movimientos):
+    for _ in core.ejecutar_movimientos(movimientos):
+        pass
+
+
+def preparar_simple(tmp: Path, n: int):
+    lib = tmp / "simple"
+    shutil.rmtree(lib, ignore_errors=True)
+    generar_biblioteca(lib, n)
+    return lib
+
+
+def correr_simple(lib):
+    core.organizar_simple(lib, EXTENSIONES, profundidad=None)
+
+
+def preparar_clasificar(tmp: Path, n: int):
+    lib = tmp / "clasificar"
+    shutil.rmtree(lib, ignore_errors=True)
+    creados = generar_biblioteca(lib, n)
+    db = tmp / "clasificar.db"
+    db.unlink(missing_ok=True)
+    generar_db(db, creados)
+    return lib, db
+
+
+def correr_clasificar(estado):
+    lib, db = estado
+    with core.ClasificacionRepo(db) as repo:
+        core.organizar_clasificar(
+            lib, repo, _cfg(), profundidad=None, frontend=core.FrontendReglas()
+        )
+
+
+ETAPAS = {
+    "obtener_nombre_cap": (preparar_parseo, correr_parseo),
+    "obtener_clasificacion": (preparar_consulta, correr_consulta),
+    "mover_archivo": (preparar_mover, correr_mover),
+    "organizar_simple": (preparar_simple, correr_simple),
+    "organizar_clasificar": (preparar_clasificar, correr_clasificar),
+}
+
+
+# -------------------------------
+# Medición
+# -------------------------------
+def medir(etapa: str, n: int, repeticiones: int, tmp: Path) -> dict:
+    preparar, correr = ETAPAS[etapa]
+    tiempos = []
+    for _ in range(repeticiones):
+        estado = preparar(tmp, n)
+        t0 = time.perf_counter()
+        correr(estado)
+        tiempos.append(time.perf_counter() - t0)
+
+    # Memoria en una corrida aparte: tracemalloc distorsiona los tiempos
+    estado = preparar(tmp, n)
+    tracemalloc.start()
+    correr(estado)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "etapa": etapa,
+        "archivos": n,
+        "repeticiones": repeticiones,
+        "segundos_min": min(tiempos),
+        "segundos_mediana": statistics.median(tiempos),
+        "pico_memoria_kb": round(pico / 1024, 1),
+    }
+
+
+def comparar(actual: list, previo_path: Path):
+    with previo_path.open("r", encoding="utf-8") as f:
+        previo = {
+            (r["etapa"], r["archivos"]): r for r in json.load(f)["resultados"]
+        }
+    print(f"\nComparación con {previo_path}:")
+    for r in actual:
+        p = previo.get((r["etapa"], r["archivos"]))
+        if p is None:
+            continue
+        ratio = r["segundos_mediana"] / p["segundos_mediana"]
+        marca = "  <-- más lento" if ratio > 1.10 else ""
+        print(f"  {r['etapa']:<22} {r['archivos']:>8}  x{ratio:.2f}{marca}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del organizador")
+    parser.add_argument(
+        "--archivos", type=int, nargs="+", default=[1000], help="Tamaños a medir"
+    )
+    parser.add_argument("--etapas", nargs="+", choices=sorted(ETAPAS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", metavar="ARCHIVO.json")
+    parser.add_argument("--comparar", metavar="ARCHIVO.json")
+    parser.add_argument("--tmp", help="Carpeta de trabajo (por defecto, temporal)")
+    args = parser.parse_args()
+
+    etapas = args.etapas or list(ETAPAS)
+    resultados = []
+    with tempfile.TemporaryDirectory(dir=args.tmp) as tmp:
+        for n in args.archivos:
+            for etapa in etapas:
+                r = medir(etapa, n, args.repeticiones, Path(tmp))
+                resultados.append(r)
+                print(
+                    f"{etapa:<22} {n:>8} archivos  "
+                    f"mediana {r['segundos_mediana']:.3f}s  "
+                    f"min {r['segundos_min']:.3f}s  "
+                    f"pico {r['pico_memoria_kb']:.0f} KB"
+                )
+
+    if args.salida:
+        datos = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "plataforma": platform.platform(),
+            "resultados": resultados,
+        }
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False, indent=1)
+    if args.comparar:
+        comparar(resultados, Path(args.comparar))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import random
+from pathlib import Path
+
+from organizador_core import ClasificacionRepo, obtener_nombre_cap
+
+PALABRAS = [
+    "Amor",
+    "Reina",
+    "Sur",
+    "Pasión",
+    "Gavilanes",
+    "Señora",
+    "Acero",
+    "Café",
+    "Aroma",
+    "Mujer",
+    "Breaking",
+    "Dark",
+    "Élite",
+    "Office",
+    "Crown",
+    "Noche",
+    "Corazón",
+    "Fuego",
+    "Destino",
+    "Sombra",
+    "Camino",
+    "Ciudad",
+    "Imperio",
+    "Tierra",
+    "Secretos",
+    "Legado",
+    "Hermanos",
+    "Pacto",
+    "Ángel",
+    "Lobo",
+]
+RUIDO = ["720p", "1080p", "x264", "HDTV", "WEB-DL", "[Grupo]", "Latino", "2019"]
+SEPARADORES = [" ", ".", "_", " - "]
+EXTS_VIDEO = [".mkv", ".mp4", ".avi"]
+
+
+def _titulo(rnd: random.Random) -> str:
+    return " ".join(rnd.sample(PALABRAS, rnd.randint(1, 3)))
+
+
+def _nombre_episodio(rnd: random.Random, titulo: str, temp: int, ep: int) -> str:
+    formato = rnd.randrange(5)
+    if formato == 0:
+        token = f"{temp}x{ep:02d}"
+    elif formato == 1:
+        token = f"S{temp:02d}E{ep:02d}"
+    elif formato == 2:
+        token = f"EP{ep}"
+    elif formato == 3:
+        token = f"[TEMP {temp}] {ep:02d}"
+    else:
+        token = f"Season {temp} E{ep:02d}"
+    sep = rnd.choice(SEPARADORES)
+    partes = titulo.split(" ") + [token]
+    if rnd.random() < 0.3:
+        partes.append(rnd.choice(RUIDO))
+    return sep.join(partes)
+
+
+def generar_nombres(n: int, semilla: int = 0) -> list:
+    """
+    Genera n nombres de archivo realistas: episodios con distintos formatos,
+    películas, música, acentos y duplicados "(1)". Retorna rutas relativas
+    (algunas dentro de subcarpetas).
+    """
+    rnd = random.Random(semilla)
+    series = [_titulo(rnd) for _ in range(max(1, n // 40))]
+    peliculas = [_titulo(rnd) for _ in range(max(1, n // 20))]
+    carpetas = ["", "", "", "Descargas", "Descargas/Completas", "Torrents/2024/Oct"]
+
+    nombres = []
+    while len(nombres) < n:
+        r = rnd.random()
+        if r < 0.75:
+            base = _nombre_episodio(
+                rnd, rnd.choice(series), rnd.randint(1, 5), rnd.randint(1, 40)
+            )
+            ext = rnd.choice(EXTS_VIDEO)
+        elif r < 0.92:
+            base = f"{rnd.choice(peliculas)} ({rnd.randint(1970, 2024)})"
+            ext = rnd.choice(EXTS_VIDEO)
+        else:
+            base = f"{rnd.choice(PALABRAS)} - {_titulo(rnd)}"
+            ext = ".mp3"
+        if rnd.random() < 0.05:
+            base += " (1)"
+        nombres.append(f"{rnd.choice(carpetas)}/{base}{ext}".lstrip("/"))
+    return nombres
+
+
+def generar_biblioteca(destino: Path, n: int, semilla: int = 0, tamano: int = 0):
+    """
+    Crea n archivos vacíos (o dispersos de `tamano` bytes) bajo `destino`.
+    Retorna la lista de rutas relativas creadas.
+    """
+    destino = Path(destino)
+    creados = []
+    for rel in generar_nombres(n, semilla):
+        ruta = destino / rel
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        if ruta.exists():
+            continue  # nombre repetido por azar
+        with ruta.open("wb") as f:
+            if tamano:
+                f.truncate(tamano)  # archivo disperso: no ocupa disco
+        creados.append(rel)
+    return creados
+
+
+def generar_db(db_path: Path, nombres_archivo, proporcion: float = 0.8, semilla=0):
+    """
+    Crea una clasificacion.db con una fila por nombre base para `proporcion`
+    de los títulos; el resto queda para la búsqueda por palabras clave o para
+    la clasificación manual.
+    """
+    rnd = random.Random(semilla)
+    bases = sorted({obtener_nombre_cap(Path(n).name)[0] for n in nombres_archivo})
+    clasificaciones = {}
+    for nb in bases:
+        if rnd.random() >= proporcion:
+            continue
+        r = rnd.random()
+        if r < 0.6:
+            clasificaciones[nb] = ("serie", "", "")
+        elif r < 0.8:
+            clasificaciones[nb] = ("pelicula", "Drama", "")
+        elif r < 0.95:
+            clasificaciones[nb] = ("novela", "", "Mexicana")
+        else:
+            clasificaciones[nb] = ("show", "", "")
+    with ClasificacionRepo(db_path) as repo:
+        repo.guardar_lote(clasificaciones)
+    return clasificaciones
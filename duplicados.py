@@ -0,0 +1,160 @@
+import hashlib
+import mmap
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+# Tamaño de cada extremo que se lee para la huella parcial
+BLOQUE = 64 * 1024
+# Lectura por partes para la huella completa
+TROZO = 1024 * 1024
+
+
+class ArchivoHuella(NamedTuple):
+    ruta: str
+    tamano: int
+    mtime_ns: int
+    inodo: int
+    dispositivo: int
+
+    @property
+    def clave(self) -> tuple:
+        # Clave de la caché de huellas: el inodo solo es único en su volumen
+        return (self.dispositivo, self.inodo, self.tamano, self.mtime_ns)
+
+
+def huella_parcial(ruta: str, tamano: int) -> str:
+    """Hash del primer y el último bloque (todo el archivo si es chico)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, "rb") as f:
+        if tamano <= 2 * BLOQUE:
+            h.update(f.read())
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m[:BLOQUE])
+                h.update(m[-BLOQUE:])
+    return h.hexdigest()
+
+
+def huella_completa(ruta: str) -> str:
+    h = hashlib.blake2b(digest_size=32)
+    buffer = bytearray(TROZO)
+    vista = memoryview(buffer)
+    with open(ruta, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            h.update(vista[:n])
+    return h.hexdigest()
+
+
+def _agrupar(indices, clave) -> list:
+    # Todos los grupos, también los de un solo elemento
+    grupos = {}
+    for i in indices:
+        grupos.setdefault(clave(i), []).append(i)
+    return list(grupos.values())
+
+
+def agrupar_duplicados(archivos, requeridos=None, cargar_cache=None, hilos=4):
+    """
+    Agrupa los archivos (lista de ArchivoHuella) que tienen el mismo contenido.
+
+    Se compara por etapas y cada una solo ve los candidatos que dejó la
+    anterior: tamaño, huella de los extremos y huella completa. Los enlaces
+    duros de un mismo inodo se leen una sola vez. Los archivos vacíos o que
+    no se pueden leer no se agrupan.
+
+    - requeridos: índices de los que interesa encontrar copias; los grupos
+      sin ninguno de ellos se descartan antes de leer nada.
+    - cargar_cache(claves) -> {clave: (parcial, completa)}: huellas ya
+      calculadas ("" si falta alguna).
+
+    Retorna (grupos, nuevas): listas de índices con el mismo contenido y las
+    huellas calculadas en esta llamada, para guardarlas en la caché.
+    """
+
+    def interesa(grupo):
+        return requeridos is None or any(i in requeridos for i in grupo)
+
+    # 1) Por tamaño, y dentro de cada tamaño un representante por inodo
+    miembros = {}  # representante -> índices con ese mismo inodo
+    conjuntos = []  # listas de representantes que aún pueden ser iguales
+    por_tamano = _agrupar(
+        (i for i, a in enumerate(archivos) if a.tamano > 0),
+        lambda i: archivos[i].tamano,
+    )
+    for grupo in por_tamano:
+        if len(grupo) < 2 or not interesa(grupo):
+            continue
+        por_inodo = _agrupar(
+            grupo, lambda i: (archivos[i].dispositivo, archivos[i].inodo)
+        )
+        for mismos in por_inodo:
+            miembros[mismos[0]] = mismos
+        conjuntos.append([mismos[0] for mismos in por_inodo])
+
+    cache = {}
+    if cargar_cache is not None and conjuntos:
+        cache = dict(cargar_cache({archivos[i].clave for c in conjuntos for i in c}))
+    nuevas = {}
+    resueltos = []
+
+    def pendiente(c):
+        # Conjunto que todavía puede tener copias que interesan
+        return len(c) > 1 and interesa([i for rep in c for i in miembros[rep]])
+
+    def refinar(conjuntos, posicion, calcular):
+        # Calcula en paralelo las huellas que faltan y subdivide cada conjunto.
+        # Un representante solo ya está resuelto (puede tener enlaces duros)
+        resueltos.extend(c for c in conjuntos if len(c) == 1)
+        conjuntos = [c for c in conjuntos if pendiente(c)]
+        faltan = [
+            i
+            for c in conjuntos
+            for i in c
+            if not cache.get(archivos[i].clave, ("", ""))[posicion]
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, hilos)) as pool:
+            for i, huella in zip(faltan, pool.map(calcular, faltan)):
+                if huella is None:
+                    continue
+                clave = archivos[i].clave
+                fila = list(cache.get(clave, ("", "")))
+                fila[posicion] = huella
+                cache[clave] = nuevas[clave] = tuple(fila)
+
+        def huella_de(i):
+            # Sin huella (no se pudo leer) el archivo queda solo
+            return cache.get(archivos[i].clave, ("", ""))[posicion] or ("?", i)
+
+        resultado = []
+        for c in conjuntos:
+            resultado += _agrupar(c, huella_de)
+        return resultado
+
+    def parcial(i):
+        try:
+            return huella_parcial(archivos[i].ruta, archivos[i].tamano)
+        except OSError:
+            return None
+
+    def completa(i):
+        if archivos[i].tamano <= 2 * BLOQUE:
+            # La huella parcial ya cubrió todo el archivo
+            return cache[archivos[i].clave][0]
+        try:
+            return huella_completa(archivos[i].ruta)
+        except OSError:
+            return None
+
+    # 2) y 3) Huella de los extremos y, solo si coincide, huella completa
+    conjuntos = refinar(conjuntos, 0, parcial)
+    conjuntos = refinar(conjuntos, 1, completa)
+
+    grupos = []
+    for c in resueltos + conjuntos:
+        todos = [i for rep in c for i in miembros[rep]]
+        if len(todos) > 1 and interesa(todos):
+            grupos.append(todos)
+    return grupos, nuevas
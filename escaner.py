@@ -0,0 +1,192 @@
+import fnmatch
+import os
+import re
+import stat
+from typing import Iterator, NamedTuple, Optional
+
+# Carpetas que crea el modo "Clasificar y ordenar" en la raíz
+CARPETAS_ORGANIZADAS = frozenset({"Series", "Películas", "Novelas", "Audio", "Shows"})
+# Donde se apartan las copias duplicadas; nunca se vuelve a recorrer
+CARPETA_DUPLICADOS = "_Duplicados"
+
+
+class EntradaArchivo(NamedTuple):
+    ruta: str  # ruta completa del archivo
+    nombre: str  # nombre con extensión
+    ext: str  # extensión en minúsculas
+    carpeta: str  # carpeta que lo contiene
+    profundidad: int  # 0 = directamente en la raíz
+    # Solo con con_stat=True (si no, quedan en -1)
+    tamano: int = -1
+    mtime_ns: int = -1
+    inodo: int = -1
+
+
+def _compilar_globs(patrones) -> Optional[re.Pattern]:
+    # Une todos los globs en una sola expresión para probarlos de una vez
+    patrones = [p for p in patrones or () if p]
+    if not patrones:
+        return None
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    return re.compile("|".join(fnmatch.translate(p) for p in patrones), flags)
+
+
+class FiltroEscaneo:
+    """
+    Los criterios de escanear() (ver ahí), para probarlos también sobre
+    rutas sueltas, p. ej. las que avisa el modo vigilancia.
+    """
+
+    def __init__(
+        self,
+        raiz,
+        extensiones,
+        profundidad_max: Optional[int] = 0,
+        incluir=(),
+        excluir=(),
+        omitir_organizadas: bool = True,
+    ):
+        self.raiz = os.path.normpath(os.fspath(raiz))
+        self.exts = frozenset(e.lower() for e in extensiones)
+        self.profundidad_max = profundidad_max
+        self.omitir_organizadas = omitir_organizadas
+        self._incl = _compilar_globs(incluir)
+        self._excl = _compilar_globs(excluir)
+
+    def omitir_carpeta(self, nombre: str, rel: str, prof: int) -> bool:
+        # prof: profundidad de la carpeta que la contiene
+        if self.profundidad_max is not None and prof >= self.profundidad_max:
+            return True
+        if prof == 0 and (
+            nombre == CARPETA_DUPLICADOS
+            or (self.omitir_organizadas and nombre in CARPETAS_ORGANIZADAS)
+        ):
+            return True
+        excl = self._excl
+        return bool(excl and (excl.match(nombre) or excl.match(rel)))
+
+    def acepta_archivo(self, nombre: str, rel: str, ext: str) -> bool:
+        if ext not in self.exts:
+            return False
+        incl, excl = self._incl, self._excl
+        if incl and not (incl.match(nombre) or incl.match(rel)):
+            return False
+        return not (excl and (excl.match(nombre) or excl.match(rel)))
+
+    def _partes(self, ruta) -> Optional[list]:
+        # Partes de la ruta relativa a la raíz, si todas sus carpetas se recorren
+        ruta = os.path.normpath(os.fspath(ruta))
+        if ruta == self.raiz:
+            return []
+        if not ruta.startswith(self.raiz.rstrip(os.sep) + os.sep):
+            return None
+        partes = ruta[len(self.raiz) :].strip(os.sep).split(os.sep)
+        for prof, nombre in enumerate(partes[:-1]):
+            if self.omitir_carpeta(nombre, "/".join(partes[: prof + 1]), prof):
+                return None
+        return partes
+
+    def carpeta(self, ruta) -> bool:
+        """Si escanear() entraría en la carpeta `ruta`."""
+        partes = self._partes(ruta)
+        return partes is not None and not (
+            partes
+            and self.omitir_carpeta(partes[-1], "/".join(partes), len(partes) - 1)
+        )
+
+    def entrada(self, ruta) -> Optional[EntradaArchivo]:
+        """
+        La EntradaArchivo (siempre con stat) que escanear() daría para `ruta`,
+        o None si no la daría o el archivo ya no existe.
+        """
+        partes = self._partes(ruta)
+        if not partes:
+            return None
+        nombre = partes[-1]
+        ext = os.path.splitext(nombre)[1].lower()
+        if not self.acepta_archivo(nombre, "/".join(partes), ext):
+            return None
+        ruta = os.path.join(self.raiz, *partes)
+        try:
+            st = os.stat(ruta)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return EntradaArchivo(
+            ruta,
+            nombre,
+            ext,
+            os.path.dirname(ruta),
+            len(partes) - 1,
+            st.st_size,
+            st.st_mtime_ns,
+            st.st_ino,
+        )
+
+
+def escanear(
+    raiz,
+    extensiones,
+    profundidad_max: Optional[int] = 0,
+    incluir=(),
+    excluir=(),
+    omitir_organizadas: bool = True,
+    con_stat: bool = False,
+) -> Iterator[EntradaArchivo]:
+    """
+    Recorre `raiz` con os.scandir y genera una EntradaArchivo por cada archivo
+    cuya extensión esté en `extensiones`, sin construir listas intermedias.
+
+    - profundidad_max: 0 solo la raíz, N niveles de subcarpetas, None sin límite.
+    - incluir / excluir: globs que se prueban contra el nombre y contra la ruta
+      relativa (con "/"); excluir también descarta subcarpetas.
+    - omitir_organizadas: no entrar en las carpetas que crea el organizador.
+    - con_stat: completar tamaño, mtime e inodo (un stat por archivo aceptado).
+    """
+    filtro = FiltroEscaneo(
+        raiz, extensiones, profundidad_max, incluir, excluir, omitir_organizadas
+    )
+    raiz = os.fspath(raiz)
+
+    pila = [(raiz, "", 0)]
+    while pila:
+        carpeta, relativa, prof = pila.pop()
+        subcarpetas = []
+        try:
+            it = os.scandir(carpeta)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                nombre = entry.name
+                rel = f"{relativa}{nombre}"
+                try:
+                    # is_dir/is_file usan el tipo cacheado en DirEntry
+                    if entry.is_dir(follow_symlinks=False):
+                        if not filtro.omitir_carpeta(nombre, rel, prof):
+                            subcarpetas.append((entry.path, f"{rel}/", prof + 1))
+                    elif entry.is_file():
+                        ext = os.path.splitext(nombre)[1].lower()
+                        if not filtro.acepta_archivo(nombre, rel, ext):
+                            continue
+                        if con_stat:
+                            st = entry.stat()
+                            yield EntradaArchivo(
+                                entry.path,
+                                nombre,
+                                ext,
+                                carpeta,
+                                prof,
+                                st.st_size,
+                                st.st_mtime_ns,
+                                entry.inode(),
+                            )
+                        else:
+                            yield EntradaArchivo(
+                                entry.path, nombre, ext, carpeta, prof
+                            )
+                except OSError:
+                    continue
+        # Orden de recorrido en profundidad, respetando el orden del listado
+        pila.extend(reversed(subcarpetas))
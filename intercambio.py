@@ -0,0 +1,95 @@
+import csv
+import json
+import os
+
+# Tablas que se intercambian y columna que hace de clave en cada una
+TABLAS = {"clasificacion": "nombre", "palabras_clave": "palabra"}
+CAMPOS = ("tabla", "clave", "tipo", "categoria", "nacionalidad", "actualizado")
+
+
+def formato(ruta) -> str:
+    # .csv es CSV; cualquier otra extensión, JSON Lines
+    return "csv" if os.path.splitext(str(ruta))[1].lower() == ".csv" else "jsonl"
+
+
+def exportar(repo, ruta, tablas=tuple(TABLAS), al_progreso=None) -> int:
+    """
+    Escribe las filas de `tablas` en `ruta` (CSV o JSON Lines, con las
+    columnas de CAMPOS) a medida que salen del cursor. Retorna cuántas.
+    """
+    escritas = 0
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        if formato(ruta) == "csv":
+            escritor = csv.writer(f)
+            escritor.writerow(CAMPOS)
+            escribir = escritor.writerow
+        else:
+
+            def escribir(fila):
+                datos = dict(zip(CAMPOS, fila))
+                f.write(json.dumps(datos, ensure_ascii=False) + "\n")
+
+        for tabla in tablas:
+            for fila in repo.exportar(tabla):
+                escribir((tabla, *fila))
+                escritas += 1
+                if al_progreso and escritas % repo.FILAS_POR_LOTE == 0:
+                    al_progreso(escritas)
+    if al_progreso:
+        al_progreso(escritas)
+    return escritas
+
+
+def _fila(datos: dict, linea: int) -> tuple:
+    # Acepta también catálogos con columna "nombre" o "palabra" y sin "tabla"
+    tabla = datos.get("tabla") or (
+        "palabras_clave" if "palabra" in datos else "clasificacion"
+    )
+    if tabla not in TABLAS:
+        raise ValueError(f"Línea {linea}: tabla desconocida {tabla!r}")
+    clave = datos.get("clave") or datos.get(TABLAS[tabla])
+    if not clave:
+        raise ValueError(f"Línea {linea}: falta la clave ({TABLAS[tabla]})")
+    try:
+        actualizado = float(datos.get("actualizado") or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"Línea {linea}: fecha inválida") from None
+    return (
+        tabla,
+        str(clave),
+        datos.get("tipo") or "",
+        datos.get("categoria") or "",
+        datos.get("nacionalidad") or "",
+        actualizado,
+    )
+
+
+def leer(f, fmt: str):
+    """
+    Filas (tabla, clave, tipo, categoria, nacionalidad, actualizado) de un
+    archivo abierto, una por vez. Sin fecha, una fila cuenta como la más
+    antigua.
+    """
+    if fmt == "csv":
+        # line_num cuenta líneas físicas: una clave entre comillas puede
+        # ocupar varias
+        lector = csv.DictReader(f)
+        for datos in lector:
+            yield _fila(datos, lector.line_num)
+        return
+    for linea, texto in enumerate(f, start=1):
+        if not texto.strip():
+            continue
+        try:
+            datos = json.loads(texto)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Línea {linea}: {e}") from None
+        if not isinstance(datos, dict):
+            raise ValueError(f"Línea {linea}: se esperaba un objeto JSON")
+        yield _fila(datos, linea)
+
+
+def importar(repo, ruta, politica: str = "conservar", al_progreso=None) -> dict:
+    """Importa un archivo de exportar() (o un catálogo) con repo.importar()."""
+    with open(ruta, encoding="utf-8-sig", newline="") as f:
+        return repo.importar(leer(f, formato(ruta)), politica, al_progreso)
@@ -1,9 +1,21 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from organizador_core import procesar_directorio
+from tkinter.scrolledtext import ScrolledText
+from organizador_core import (
+    FrontendClasificacion,
+    clasificar_por_lote,
+    procesar_directorios,
+)
+
+# Mensajes del hilo de trabajo hacia la interfaz
+eventos = queue.Queue()
+cancelar = threading.Event()
+MAX_LINEAS_LOG = 20000
 
 
 # Obtener la ruta base (compatible con ejecutables)
@@ -39,35 +51,157 @@ def ejecutar_script():
     db_path = resource_path("clasificacion.db")
     config_path = resource_path("config.json")
 
-    progress["maximum"] = len(carpetas)
+    progress["maximum"] = 1
     progress["value"] = 0
+    texto_log.delete("1.0", tk.END)
+    cancelar.clear()
+    boton_iniciar.config(state="disabled")
+    boton_cancelar.config(state="normal")
+
+    hilo = threading.Thread(
+        target=procesar_en_hilo,
+        args=(list(carpetas), modo, db_path, config_path),
+        daemon=True,
+    )
+    hilo.start()
+    ventana.after(100, drenar_eventos)
+
+
+def procesar_en_hilo(carpetas, modo, db_path, config_path):
+    # Corre fuera del hilo de Tk: solo se comunica a través de la cola
+    eventos.put(("carpeta", len(carpetas)))
+    try:
+        resultados = procesar_directorios(
+            carpetas,
+            modo=modo,
+            db_path=db_path,
+            config_path=config_path,
+            al_evento=lambda d, evento: eventos.put(("evento", d, evento)),
+            progreso=lambda hechos, total: eventos.put(("progreso", hechos, total)),
+            cancelar=cancelar,
+            frontend=FrontendHiloPrincipal(),
+            al_iniciar=lambda d, ejecucion: eventos.put(
+                ("log", f"[{d}] Ejecución {ejecucion} (--undo {ejecucion})")
+            ),
+        )
+    except Exception as e:
+        eventos.put(("log", f"[ERROR]\n{e}\n"))
+        eventos.put(("fin", len(carpetas), len(carpetas)))
+        return
+
+    errores = 0
+    for directorio in carpetas:
+        resultado = resultados.get(directorio)
+        if isinstance(resultado, Exception):
+            errores += 1
+            eventos.put(("log", f"[ERROR] {directorio}\n{resultado}\n"))
+        else:
+            eventos.put(
+                (
+                    "log",
+                    f"[OK] {directorio}: {resultado['movido']} movidos, "
+                    f"{resultado['omitido']} omitidos, {resultado['error']} errores",
+                )
+            )
+    eventos.put(("fin", len(carpetas), errores))
+
+
+class FrontendHiloPrincipal(FrontendClasificacion):
+    # La ventana de clasificación es Tk: se pide al hilo principal y se espera.
+    # Los lotes que la ventana guarda mientras está abierta vuelven por
+    # `lotes` y se escriben aquí, en el hilo dueño de la conexión a la BD
+    def clasificar(self, pendientes, cfg, db_path, sugerencias=None, al_guardar=None):
+        lotes = queue.Queue()
+        respuesta = {}
+        eventos.put(
+            ("clasificar", pendientes, cfg, db_path, sugerencias, respuesta, lotes)
+        )
+        while True:
+            lote = lotes.get()
+            if lote is None:
+                break
+            if al_guardar is not None:
+                al_guardar(lote)
+        return respuesta
 
-    resultados = []
-    for i, directorio in enumerate(carpetas, start=1):
+
+def drenar_eventos():
+    # Un mensaje que falla se anota y la cola se sigue leyendo; solo "fin"
+    # deja de sondear (ejecutar_script vuelve a empezar)
+    try:
+        if _drenar():
+            return
+    except Exception as e:
+        eventos.put(("log", f"[ERROR]\n{e}\n"))
+    ventana.after(100, drenar_eventos)
+
+
+def _drenar() -> bool:
+    # Procesa un número acotado de mensajes por vuelta para no congelar la UI
+    for _ in range(500):
         try:
-            salida = procesar_directorio(
-                directorio=directorio,
-                modo=modo,
-                db_path=db_path,
-                config_path=config_path,
-                parent=ventana,  # para que cualquier UI de clasificación sea modal
+            evento = eventos.get_nowait()
+        except queue.Empty:
+            break
+        tipo = evento[0]
+        if tipo == "evento":
+            _, directorio, ev = evento
+            agregar_log(f"[{os.path.basename(directorio) or directorio}] {ev.texto()}")
+        elif tipo == "log":
+            agregar_log(evento[1])
+        elif tipo == "progreso":
+            _, hechos, total = evento
+            progress["maximum"] = max(total, 1)
+            progress["value"] = hechos
+        elif tipo == "carpeta":
+            _, total = evento
+            progress["value"] = 0
+            label_estado.config(text=f"Procesando {total} carpeta(s)...")
+        elif tipo == "clasificar":
+            _, pendientes, cfg, db_path, sugerencias, respuesta, lotes = evento
+            try:
+                respuesta.update(
+                    clasificar_por_lote(
+                        pendientes,
+                        cfg,
+                        db_path,
+                        parent=ventana,
+                        sugerencias=sugerencias,
+                        al_guardar=lotes.put,
+                    )
+                )
+            except Exception as e:
+                # El hilo de trabajo sigue (sin clasificar) y la UI no se corta
+                eventos.put(("log", f"[ERROR] Clasificación\n{e}\n"))
+            finally:
+                lotes.put(None)  # fin de la sesión
+        elif tipo == "fin":
+            _, total, errores = evento
+            boton_iniciar.config(state="normal")
+            boton_cancelar.config(state="disabled")
+            estado = "cancelado" if cancelar.is_set() else "terminado"
+            label_estado.config(text=f"Proceso {estado}.")
+            messagebox.showinfo(
+                "Resultado",
+                f"Proceso {estado}: {total} carpeta(s), {errores} con error.\n"
+                "El detalle está en el registro.",
             )
-            resultados.append(f"[OK] {directorio}\n{salida}\n")
-        except Exception as e:
-            resultados.append(f"[ERROR] {directorio}\n{e}\n")
-        finally:
-            progress["value"] = i
-            ventana.update_idletasks()
-
-    resumen = "\n".join(resultados)
-    messagebox.showinfo(
-        "Resultado",
-        (
-            resumen
-            if len(resumen) < 5000
-            else resumen[:5000] + "\n...\n(Resumen truncado)"
-        ),
-    )
+            return True
+    return False
+
+
+def agregar_log(linea):
+    texto_log.insert(tk.END, linea + "\n")
+    # Mantener acotado el registro en pantalla
+    sobrantes = int(texto_log.index("end-1c").split(".")[0]) - MAX_LINEAS_LOG
+    if sobrantes > 0:
+        texto_log.delete("1.0", f"{sobrantes + 1}.0")
+    texto_log.see(tk.END)
+
+
+def cancelar_proceso():
+    cancelar.set()
+    label_estado.config(text="Cancelando...")
 
 
 def abrir_ayuda():
@@ -86,7 +220,7 @@ def abrir_ayuda():
 # GUI principal
 ventana = tk.Tk()
 ventana.title("Organizador de Videos")
-ventana.geometry("520x460")
+ventana.geometry("620x640")
 
 # Tema
 style = ttk.Style()
@@ -134,12 +268,23 @@ ttk.Button(ventana, text="Ayuda", command=abrir_ayuda).grid(
 progress = ttk.Progressbar(ventana, mode="determinate")
 progress.grid(row=5, column=0, columnspan=3, pady=(6, 0), padx=12, sticky="ew")
 
-ttk.Button(ventana, text="iniciar", command=ejecutar_script).grid(
-    row=6, column=0, columnspan=3, pady=10, padx=12, sticky="ew"
+label_estado = ttk.Label(ventana, text="")
+label_estado.grid(row=6, column=0, columnspan=3, padx=12, sticky="w")
+
+boton_iniciar = ttk.Button(ventana, text="iniciar", command=ejecutar_script)
+boton_iniciar.grid(row=7, column=0, columnspan=2, pady=10, padx=12, sticky="ew")
+boton_cancelar = ttk.Button(
+    ventana, text="Cancelar", command=cancelar_proceso, state="disabled"
 )
+boton_cancelar.grid(row=7, column=2, pady=10, padx=(6, 12), sticky="ew")
+
+# Registro de resultados
+texto_log = ScrolledText(ventana, height=12, wrap="none")
+texto_log.grid(row=8, column=0, columnspan=3, pady=(0, 12), padx=12, sticky="nsew")
 
 # Grid weights
 ventana.grid_rowconfigure(3, weight=1)
+ventana.grid_rowconfigure(8, weight=2)
 ventana.grid_columnconfigure(0, weight=1)
 ventana.grid_columnconfigure(1, weight=1)
 ventana.grid_columnconfigure(2, weight=1)
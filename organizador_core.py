@@ -1,13 +1,28 @@
 import unicodedata
 import argparse
+import errno
+import itertools
 import json
+import os
 import re
 import shutil
 import sqlite3
 import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
-import tkinter as tk
-from tkinter import ttk
+from typing import NamedTuple
+from agrupamiento import agrupar_nombres, limpiar
+from duplicados import ArchivoHuella, agrupar_duplicados
+from escaner import CARPETA_DUPLICADOS, FiltroEscaneo, escanear
+import intercambio
+from reglas import REGLAS_INTERNAS, MotorReglas
+from sondeo import EXTENSIONES as EXTENSIONES_SONDEO, InfoMedio, sondear_lote
+from sugerencias import ModeloBayes, Sugerencia, caracteristicas, contar
 
 # -------------------------------
 # Utilidades de rutas
@@ -15,17 +30,222 @@ from tkinter import ttk
 
 
 def procesar_directorio(
-    directorio: str, modo: str, db_path: str, config_path: str, parent=None
-) -> str:
-    ruta = Path(directorio).resolve()
-    if not ruta.exists() or not ruta.is_dir():
-        raise ValueError(f"Directorio inválido: {directorio}")
-
+    directorio: str,
+    modo: str,
+    db_path: str,
+    config_path: str,
+    parent=None,
+    profundidad=0,
+    incluir=(),
+    excluir=(),
+    incremental=False,
+    al_evento=None,
+    progreso=None,
+    cancelar=None,
+    frontend=None,
+    diario=None,
+) -> dict:
+    # Una carpeta es el caso particular de varias
+    resultado = procesar_directorios(
+        [directorio],
+        modo,
+        db_path,
+        config_path,
+        parent,
+        profundidad,
+        incluir,
+        excluir,
+        incremental,
+        al_evento,
+        progreso,
+        cancelar,
+        frontend,
+        diario,
+    )[directorio]
+    if isinstance(resultado, Exception):
+        raise resultado
+    return resultado
+
+
+def procesar_directorios(
+    directorios,
+    modo: str,
+    db_path: str,
+    config_path: str,
+    parent=None,
+    profundidad=0,
+    incluir=(),
+    excluir=(),
+    incremental=False,
+    al_evento=None,
+    progreso=None,
+    cancelar=None,
+    frontend=None,
+    diario=None,
+    al_iniciar=None,
+) -> dict:
+    """
+    Procesa varias carpetas a la vez: escanea y analiza todas en paralelo,
+    abre una sola sesión de clasificación con los títulos pendientes de todas
+    (sin repetidos) y luego mueve los archivos de cada carpeta en paralelo.
+
+    Retorna un dict directorio -> conteo de eventos (ver aplicar_plan) o la
+    excepción si esa carpeta falló. `al_evento(directorio, evento)` recibe
+    cada Evento en cuanto ocurre y `progreso(hechos, total)` el avance sumando
+    todas las carpetas.
+
+    Los movimientos se anotan en el diario de la BD (para --resume y --undo)
+    si `diario` es True; por defecto, en todos los modos menos "simple", que
+    no usa la BD. `al_iniciar(directorio, ejecucion)` recibe el id de cada
+    ejecución anotada.
+    """
     cfg = cargar_config(Path(config_path))
-    if modo == "simple":
-        return organizar_simple(ruta, [e.lower() for e in cfg["extensiones"]])
-    else:
-        return organizar_clasificar(ruta, Path(db_path), cfg, parent=parent)
+    if diario is None:
+        diario = modo != "simple"
+    extensiones = [e.lower() for e in cfg["extensiones"]]
+    hilos = cfg["hilos"]
+    resultados = {}
+    rutas = {}
+    for directorio in directorios:
+        ruta = Path(directorio).resolve()
+        if not ruta.exists() or not ruta.is_dir():
+            resultados[directorio] = ValueError(f"Directorio inválido: {directorio}")
+        else:
+            rutas[directorio] = ruta
+    if not rutas:
+        return resultados
+
+    repo = None
+    if modo != "simple" or incremental or cfg["duplicados"]:
+        repo = ClasificacionRepo(Path(db_path))
+    try:
+        # El manifiesto se lee aquí: la conexión es de este hilo
+        manifiestos = {
+            d: Manifiesto(
+                repo,
+                r,
+                FiltroEscaneo(r, extensiones, profundidad, incluir, excluir),
+            )
+            if incremental
+            else None
+            for d, r in rutas.items()
+        }
+
+        # 1) Escaneo y análisis de todas las carpetas en paralelo
+        def analizar(directorio):
+            ruta, manifiesto = rutas[directorio], manifiestos[directorio]
+            if modo == "simple":
+                return planificar_simple(
+                    ruta,
+                    extensiones,
+                    profundidad,
+                    incluir,
+                    excluir,
+                    manifiesto,
+                    cfg["agrupar_similares"],
+                )
+            return analizar_carpeta(
+                ruta, cfg, profundidad, incluir, excluir, manifiesto
+            )
+
+        analisis = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(hilos, len(rutas)))) as pool:
+            futuros = {pool.submit(analizar, d): d for d in rutas}
+            for futuro in as_completed(futuros):
+                directorio = futuros[futuro]
+                try:
+                    analisis[directorio] = futuro.result()
+                except Exception as e:
+                    resultados[directorio] = e
+
+        # 2) Una sola consulta y una sola sesión de clasificación para todas
+        if modo == "simple":
+            planes = analisis
+        else:
+            nombres_base = set().union(*(a.nombres_base for a in analisis.values()))
+            nombres_nuevos = set().union(
+                *(a.nombres_nuevos for a in analisis.values())
+            )
+            senales = {}
+            archivos = {}
+            for a in analisis.values():
+                for nb, (cap, temp) in a.senales().items():
+                    previas = senales.get(nb, (False, False))
+                    senales[nb] = (previas[0] or cap, previas[1] or temp)
+                for nb, lista in a.por_nombre().items():
+                    archivos.setdefault(nb, []).extend(lista)
+            encontrados = repo.buscar_lote(sorted(nombres_base))
+            clasificar_pendientes(
+                repo,
+                cfg,
+                encontrados,
+                nombres_nuevos,
+                frontend or FrontendTk(parent),
+                senales,
+                archivos,
+            )
+            planes = {
+                d: armar_plan_clasificar(a, encontrados, manifiestos[d])
+                for d, a in analisis.items()
+            }
+        if cfg["duplicados"]:
+            for d, plan in planes.items():
+                planes[d] = marcar_duplicados(plan, cfg["duplicados"], repo, hilos)
+
+        # 3) Movimientos de cada carpeta en paralelo
+        total = sum(len(p.pasos) for p in planes.values())
+        hechos = {d: 0 for d in planes}
+        lock = threading.Lock()
+
+        def avance(directorio):
+            def _avance(n, _total):
+                with lock:
+                    hechos[directorio] = n
+                    suma = sum(hechos.values())
+                if progreso is not None:
+                    progreso(suma, total)
+
+            return _avance
+
+        def aplicar(directorio):
+            manifiesto = manifiestos[directorio]
+            with Diario(Path(db_path)) if diario else nullcontext() as anotador:
+                if anotador is not None:
+                    ejecucion = anotador.iniciar(planes[directorio])
+                    if al_iniciar is not None:
+                        al_iniciar(directorio, ejecucion)
+                return aplicar_plan(
+                    planes[directorio],
+                    hilos,
+                    cfg["copias_por_dispositivo"],
+                    _encadenar(
+                        manifiesto.al_terminar if manifiesto else None,
+                        anotador.al_terminar if anotador else None,
+                    ),
+                    cancelar,
+                    avance(directorio),
+                    (lambda evento: al_evento(directorio, evento))
+                    if al_evento
+                    else None,
+                    anotador.al_reservar if anotador else None,
+                )
+
+        with ThreadPoolExecutor(max_workers=max(1, min(hilos, len(planes)))) as pool:
+            futuros = {pool.submit(aplicar, d): d for d in planes}
+            for futuro in as_completed(futuros):
+                directorio = futuros[futuro]
+                try:
+                    resultados[directorio] = futuro.result()
+                except Exception as e:
+                    resultados[directorio] = e
+
+        for directorio in planes:
+            if manifiestos[directorio]:
+                manifiestos[directorio].guardar()
+    finally:
+        if repo is not None:
+            repo.cerrar()
+    return resultados
 
 
 def resource_path(relative_path: str) -> Path:
@@ -65,6 +285,23 @@ def cargar_config(path_config: Path) -> dict:
             "Estadounidense",
             "Otra",
         ],
+        "hilos": 4,
+        "copias_por_dispositivo": 1,
+        # "" (no buscar), "saltar", "enlazar" o "cuarentena"
+        "duplicados": "",
+        # Ver MotorReglas; se prueban antes de consultar la BD
+        "reglas": [],
+        # Modo simple: juntar en una carpeta los nombres que son la misma serie
+        # con etiquetas de release o errores de tipeo (ver agrupar_nombres).
+        # Apagado: cambia las carpetas que ya usaba cada biblioteca
+        "agrupar_similares": False,
+        # Confianza mínima de una sugerencia para clasificar sin preguntar
+        # (más de 1 = solo sugerir). Naive Bayes exagera su confianza, así
+        # que por defecto no mueve nada sin confirmación
+        "umbral_sugerencias": 1.1,
+        # Un título sin capítulo ni temporada cuyos videos duran más que esto
+        # es una película (se lee la duración del contenedor; 0 = no mirar)
+        "minutos_pelicula": 75,
     }
     try:
         if path_config.exists():
@@ -72,18 +309,140 @@ def cargar_config(path_config: Path) -> dict:
                 cfg = json.load(f)
                 # Mezcla básica para no romper si faltan claves
                 default.update({k: v for k, v in cfg.items() if k in default})
-        return default
     except Exception:
         # Si hay error al leer JSON, usar default
-        return default
+        pass
+    default["motor_reglas"] = _motor_reglas(path_config, default["reglas"])
+    return default
+
+
+_motores = {}  # ruta de la config -> (mtime_ns, MotorReglas)
+
+
+def _motor_reglas(path_config: Path, reglas: list) -> MotorReglas:
+    # Compilar miles de reglas cuesta: solo se rehace si la config cambió
+    try:
+        mtime = path_config.stat().st_mtime_ns
+    except OSError:
+        mtime = None
+    clave = str(path_config)
+    guardado = _motores.get(clave)
+    if guardado is None or guardado[0] != mtime:
+        guardado = _motores[clave] = (mtime, MotorReglas(reglas + REGLAS_INTERNAS))
+    return guardado[1]
+
+
+# -------------------------------
+# Instrumentación
+# -------------------------------
+_SIN_MEDICION = nullcontext()
+
+
+class Medidor:
+    """
+    Tiempos por etapa y contadores de una ejecución. Está apagado por defecto:
+    etapa() devuelve un contexto vacío, iterar() el mismo iterable y contar()
+    retorna enseguida, así que sin --profile el costo es una comparación.
+    Los tiempos de las etapas que corren en varios hilos se suman.
+    """
+
+    def __init__(self):
+        self.activo = False
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.etapas = {}  # nombre -> [segundos, veces]
+        self.contadores = {}
+
+    def activar(self, activo: bool = True):
+        self.activo = activo
+
+    def etapa(self, nombre: str):
+        if not self.activo:
+            return _SIN_MEDICION
+        return self._medir(nombre)
+
+    @contextmanager
+    def _medir(self, nombre: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._sumar(nombre, time.perf_counter() - t0)
+
+    def _sumar(self, nombre: str, segundos: float):
+        with self._lock:
+            etapa = self.etapas.setdefault(nombre, [0.0, 0])
+            etapa[0] += segundos
+            etapa[1] += 1
+
+    def contar(self, nombre: str, n: int = 1):
+        if not self.activo:
+            return
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    def iterar(self, nombre: str, iterable, contador: str = None):
+        """
+        Mide solo el tiempo que se pasa dentro de `iterable` (p. ej. el
+        escaneo, sin el trabajo que se hace con cada elemento) y cuenta sus
+        elementos en `contador`.
+        """
+        if not self.activo:
+            return iterable
+        return self._iterar(nombre, iter(iterable), contador)
+
+    def _iterar(self, nombre: str, it, contador):
+        segundos, n = 0.0, 0
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    elemento = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    segundos += time.perf_counter() - t0
+                n += 1
+                yield elemento
+        finally:
+            self._sumar(nombre, segundos)
+            if contador:
+                self.contar(contador, n)
+
+    def como_dict(self) -> dict:
+        with self._lock:
+            return {
+                "etapas": {
+                    nombre: {"segundos": round(seg, 6), "veces": veces}
+                    for nombre, (seg, veces) in self.etapas.items()
+                },
+                "contadores": dict(self.contadores),
+            }
+
+    def resumen(self) -> str:
+        datos = self.como_dict()
+        lineas = [f"{'Etapa':<24}{'Segundos':>12}{'Veces':>8}", "-" * 44]
+        for nombre, e in sorted(
+            datos["etapas"].items(), key=lambda x: -x[1]["segundos"]
+        ):
+            lineas.append(f"{nombre:<24}{e['segundos']:>12.3f}{e['veces']:>8}")
+        lineas += ["", f"{'Contador':<32}{'Valor':>12}", "-" * 44]
+        for nombre, valor in sorted(datos["contadores"].items()):
+            lineas.append(f"{nombre:<32}{valor:>12}")
+        return "\n".join(lineas)
+
+
+# Instancia única del proceso; main() la activa con --profile
+medidor = Medidor()
 
 
 # -------------------------------
 # Base de datos
 # -------------------------------
-def inicializar_db(db_path: Path):
-    conn = sqlite3.connect(str(db_path))
-    c = conn.cursor()
+def _esquema_inicial(c: sqlite3.Cursor):
+    # Versión 1: las tablas tal como se creaban antes de las migraciones
     c.execute(
         """CREATE TABLE IF NOT EXISTS clasificacion (
                  nombre TEXT PRIMARY KEY,
@@ -98,54 +457,1049 @@ def inicializar_db(db_path: Path):
                  categoria TEXT,
                  nacionalidad TEXT)"""
     )
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS manifiesto (
+                 ruta TEXT PRIMARY KEY,
+                 tamano INTEGER,
+                 mtime_ns INTEGER,
+                 inodo INTEGER,
+                 nombre TEXT,
+                 capitulo TEXT,
+                 temporada TEXT,
+                 destino TEXT)"""
+    )
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS huellas (
+                 inodo INTEGER,
+                 tamano INTEGER,
+                 mtime_ns INTEGER,
+                 parcial TEXT,
+                 completa TEXT,
+                 PRIMARY KEY (inodo, tamano, mtime_ns))"""
+    )
+    # Cuentas del modelo de sugerencias (ver ModeloBayes)
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS modelo_clases (
+                 tipo TEXT,
+                 categoria TEXT,
+                 nacionalidad TEXT,
+                 titulos INTEGER,
+                 tokens INTEGER,
+                 PRIMARY KEY (tipo, categoria, nacionalidad))"""
+    )
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS modelo_tokens (
+                 token TEXT,
+                 tipo TEXT,
+                 categoria TEXT,
+                 nacionalidad TEXT,
+                 cuenta INTEGER,
+                 PRIMARY KEY (token, tipo, categoria, nacionalidad))"""
+    )
+    # Diario de movimientos (ver Diario)
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS ejecuciones (
+                 id TEXT PRIMARY KEY,
+                 modo TEXT,
+                 raiz TEXT,
+                 inicio REAL,
+                 estado TEXT)"""
+    )
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS diario (
+                 ejecucion TEXT,
+                 orden INTEGER,
+                 origen TEXT,
+                 carpeta_destino TEXT,
+                 nombre_final TEXT,
+                 fuente TEXT,
+                 enlazar_a TEXT,
+                 destino_final TEXT,
+                 estado TEXT,
+                 error TEXT,
+                 PRIMARY KEY (ejecucion, orden))"""
+    )
+
+
+def _palabras_titulo(nombre: str) -> list:
+    # Palabras de un título que sirven como palabra clave, normalizadas
+    palabras = re.findall(r"\w+", quitar_acentos(nombre).lower())
+    return [p for p in dict.fromkeys(palabras) if len(p) > 3]
+
+
+def _enlaces_titulo(nombre: str):
+    # Filas de titulo_palabra: cada palabra pesa más cuanto más corto el título
+    palabras = _palabras_titulo(nombre)
+    return ((nombre, p, 1.0 / len(palabras)) for p in palabras)
+
+
+def _indices_titulo(c: sqlite3.Cursor):
+    # Versión 2: enlaces título -> palabra e índices secundarios
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS titulo_palabra (
+                 nombre TEXT,
+                 palabra TEXT,
+                 peso REAL,
+                 PRIMARY KEY (nombre, palabra)) WITHOUT ROWID"""
+    )
+    c.execute(
+        """CREATE INDEX IF NOT EXISTS titulo_palabra_palabra
+                 ON titulo_palabra (palabra)"""
+    )
+    c.execute(
+        """CREATE INDEX IF NOT EXISTS clasificacion_tipo
+                 ON clasificacion (tipo, categoria)"""
+    )
+    c.execute(
+        """CREATE INDEX IF NOT EXISTS palabras_clave_tipo
+                 ON palabras_clave (tipo, categoria)"""
+    )
+    c.executemany(
+        "INSERT OR IGNORE INTO titulo_palabra VALUES (?, ?, ?)",
+        (
+            fila
+            for (nombre,) in c.connection.execute("SELECT nombre FROM clasificacion")
+            for fila in _enlaces_titulo(nombre)
+        ),
+    )
+
+
+def _importacion(c: sqlite3.Cursor):
+    # Versión 3: cuándo se escribió cada fila (para importar con "reciente");
+    # las filas anteriores quedan en 0, más viejas que cualquier otra
+    for tabla in ("clasificacion", "palabras_clave"):
+        c.execute(f"ALTER TABLE {tabla} ADD COLUMN actualizado REAL DEFAULT 0")
+
+
+def _sondeos(c: sqlite3.Cursor):
+    # Versión 4: caché de sondear_lote(), como la de huellas
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS sondeos (
+                 inodo INTEGER,
+                 tamano INTEGER,
+                 mtime_ns INTEGER,
+                 duracion REAL,
+                 ancho INTEGER,
+                 alto INTEGER,
+                 titulo TEXT,
+                 PRIMARY KEY (inodo, tamano, mtime_ns))"""
+    )
+
+
+def _diario_tamano(c: sqlite3.Cursor):
+    # Versión 5: tamaño del origen al reservar su destino, para comprobar al
+    # reanudar o deshacer que el archivo del destino es el que se movió
+    c.execute("ALTER TABLE diario ADD COLUMN tamano INTEGER DEFAULT -1")
+
+
+def _sin_texto(c: sqlite3.Cursor):
+    # Versión 6: obtener() y buscar_lote() comparten el índice en memoria; se
+    # borra el FTS5 que la versión 2 creaba en las bases de antes
+    for trigger in ("ai", "ad", "au"):
+        c.execute(f"DROP TRIGGER IF EXISTS clasificacion_fts_{trigger}")
+    c.execute("DROP TABLE IF EXISTS clasificacion_fts")
+
+
+def _senales_clasificacion(c: sqlite3.Cursor):
+    # Versión 7: capítulo y temporada con que el modelo aprendió cada título,
+    # para olvidarlo con las mismas características si se reclasifica. Las
+    # filas anteriores toman las del manifiesto, como reentrenar_modelo()
+    for columna in ("capitulo", "temporada"):
+        c.execute(f"ALTER TABLE clasificacion ADD COLUMN {columna} INTEGER DEFAULT 0")
+    c.executemany(
+        "UPDATE clasificacion SET capitulo = ?, temporada = ? WHERE nombre = ?",
+        c.connection.execute(
+            """SELECT MAX(capitulo != ''), MAX(temporada != ''), nombre
+                 FROM manifiesto GROUP BY nombre"""
+        ).fetchall(),
+    )
+
+
+def _dispositivo_en_caches(c: sqlite3.Cursor):
+    # Versión 8: el inodo se repite entre volúmenes, así que las cachés de
+    # huellas y sondeos también se indexan por st_dev. Lo guardado sin él no
+    # se puede atribuir a un volumen: se descarta y se vuelve a calcular
+    c.execute("DROP TABLE huellas")
+    c.execute(
+        """CREATE TABLE huellas (
+                 dispositivo INTEGER,
+                 inodo INTEGER,
+                 tamano INTEGER,
+                 mtime_ns INTEGER,
+                 parcial TEXT,
+                 completa TEXT,
+                 PRIMARY KEY (dispositivo, inodo, tamano, mtime_ns))"""
+    )
+    c.execute("DROP TABLE sondeos")
+    c.execute(
+        """CREATE TABLE sondeos (
+                 dispositivo INTEGER,
+                 inodo INTEGER,
+                 tamano INTEGER,
+                 mtime_ns INTEGER,
+                 duracion REAL,
+                 ancho INTEGER,
+                 alto INTEGER,
+                 titulo TEXT,
+                 PRIMARY KEY (dispositivo, inodo, tamano, mtime_ns))"""
+    )
+
+
+# La posición en la lista es la versión (PRAGMA user_version) que deja cada una
+MIGRACIONES = [
+    _esquema_inicial,
+    _indices_titulo,
+    _importacion,
+    _sondeos,
+    _diario_tamano,
+    _sin_texto,
+    _senales_clasificacion,
+    _dispositivo_en_caches,
+]
+
+# Políticas de importar() cuando la fila ya existe en la BD
+POLITICAS_IMPORTACION = ("conservar", "sobrescribir", "reciente")
+
+
+def migrar(conn: sqlite3.Connection):
+    """
+    Lleva la BD a la última versión del esquema, aplicando en una sola
+    transacción las migraciones que le faltan. Las BD anteriores a las
+    migraciones (versión 0) ya tienen las tablas de la versión 1.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= len(MIGRACIONES):
+        return
     conn.commit()
-    conn.close()
+    # IMMEDIATE: si otra conexión está migrando, se espera y se vuelve a mirar
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        c = conn.cursor()
+        for numero, migracion in enumerate(MIGRACIONES[version:], start=version + 1):
+            migracion(c)
+            c.execute(f"PRAGMA user_version = {numero}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+class ClasificacionRepo:
+    """
+    Conexión única a la base de clasificaciones durante toda una ejecución.
+    Las escrituras se acumulan y se confirman juntas en una sola transacción
+    (al llamar a confirmar() o al salir del bloque with).
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(str(self.db_path))
+        c = self.conn.cursor()
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
+        c.execute("PRAGMA cache_size=-16000")  # ~16 MB
+        c.execute("PRAGMA mmap_size=67108864")  # 64 MB
+        c.execute("PRAGMA temp_store=MEMORY")
+        migrar(self.conn)
+        self._clasif_pendientes = []
+        self._palabras_pendientes = []
+        self._senales_pendientes = {}  # nombre_base -> (capítulo, temporada)
+        self._indice = None
+        self._modelo = None
+        self._version_datos = None
+        self._firma_datos = self._firma()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+
+    def _firma(self) -> tuple:
+        # Último rowid de cada tabla: cambia al agregar títulos o palabras
+        return self.conn.execute(
+            """SELECT (SELECT MAX(rowid) FROM clasificacion),
+                      (SELECT MAX(rowid) FROM palabras_clave)"""
+        ).fetchone()
+
+    def recargar_si_cambio(self) -> bool:
+        """
+        Si otra conexión (otro proceso, la ventana de clasificación) agregó
+        títulos o palabras clave desde la última llamada, descarta el índice
+        y el modelo cargados, para leerlos de nuevo, y retorna True.
+        """
+        # data_version solo cambia con escrituras de otras conexiones (el
+        # diario también cuenta); la firma se mira solo entonces
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version_datos:
+            return False
+        self._version_datos = version
+        firma = self._firma()
+        if firma == self._firma_datos:
+            return False
+        self._firma_datos = firma
+        self._indice = None
+        self._modelo = None
+        return True
+
+    @property
+    def indice(self) -> "IndicePalabrasClave":
+        # Se carga una vez y se descarta al escribir clasificaciones. Los
+        # títulos que usan cada palabra votan con su peso y gana la
+        # clasificación con más peso, con el mismo desempate que
+        # IndicePalabrasClave. Las filas de palabras_clave votan con peso 0,
+        # así solo deciden en las palabras sin títulos (p. ej. importadas)
+        if self._indice is None:
+            por_titulos = self.conn.execute(
+                """SELECT palabra, tipo, categoria, nacionalidad, peso
+                     FROM (SELECT tp.palabra, c.tipo, c.categoria,
+                                  c.nacionalidad, SUM(tp.peso) AS peso,
+                                  ROW_NUMBER() OVER (
+                                      PARTITION BY tp.palabra
+                                      ORDER BY SUM(tp.peso) DESC,
+                                               COALESCE(c.tipo, ''),
+                                               COALESCE(c.categoria, ''),
+                                               COALESCE(c.nacionalidad, '')
+                                  ) AS puesto
+                             FROM titulo_palabra tp
+                             JOIN clasificacion c ON c.nombre = tp.nombre
+                            GROUP BY tp.palabra, c.tipo, c.categoria,
+                                     c.nacionalidad)
+                    WHERE puesto = 1"""
+            )
+            sueltas = self.conn.execute(
+                "SELECT palabra, tipo, categoria, nacionalidad FROM palabras_clave"
+            )
+            self._indice = IndicePalabrasClave(itertools.chain(por_titulos, sueltas))
+        return self._indice
+
+    @property
+    def modelo(self) -> ModeloBayes:
+        # Se carga una vez; la primera vez se entrena con lo ya clasificado
+        if self._modelo is None:
+            clases = self.conn.execute(
+                "SELECT tipo, categoria, nacionalidad, titulos, tokens "
+                "FROM modelo_clases"
+            ).fetchall()
+            if not clases:
+                return self.reentrenar_modelo()
+            self._modelo = ModeloBayes(
+                clases,
+                self.conn.execute(
+                    "SELECT token, tipo, categoria, nacionalidad, cuenta "
+                    "FROM modelo_tokens"
+                ),
+            )
+        return self._modelo
+
+    def reentrenar_modelo(self) -> ModeloBayes:
+        """Rehace el modelo de sugerencias desde la tabla clasificacion."""
+        # Con las mismas señales que usó la actualización incremental
+        filas = self.conn.execute(
+            """SELECT nombre, tipo, categoria, nacionalidad, capitulo, temporada
+                 FROM clasificacion"""
+        )
+        clases, tokens = contar(
+            (
+                (t or "", cat or "", nac or ""),
+                caracteristicas(nombre, bool(cap), bool(temp)),
+                1,
+            )
+            for nombre, t, cat, nac, cap, temp in filas
+        )
+        with self.conn:
+            self.conn.execute("DELETE FROM modelo_clases")
+            self.conn.execute("DELETE FROM modelo_tokens")
+            self._guardar_cuentas(clases, tokens)
+        self._modelo = ModeloBayes()
+        self._modelo.sumar(clases, tokens)
+        return self._modelo
+
+    def _guardar_cuentas(self, clases: dict, tokens: dict):
+        # Suma los cambios de contar() a las tablas del modelo
+        self.conn.executemany(
+            """INSERT INTO modelo_clases VALUES (?, ?, ?, ?, ?)
+                 ON CONFLICT (tipo, categoria, nacionalidad) DO UPDATE
+                 SET titulos = titulos + excluded.titulos,
+                     tokens = tokens + excluded.tokens""",
+            ((*clasif, n, m) for clasif, (n, m) in clases.items()),
+        )
+        self.conn.executemany(
+            """INSERT INTO modelo_tokens VALUES (?, ?, ?, ?, ?)
+                 ON CONFLICT (token, tipo, categoria, nacionalidad) DO UPDATE
+                 SET cuenta = cuenta + excluded.cuenta""",
+            ((token, *clasif, n) for (token, clasif), n in tokens.items() if n),
+        )
+        # Solo pueden quedar en cero las que bajaron (sin recorrer las tablas)
+        self.conn.executemany(
+            """DELETE FROM modelo_clases
+                WHERE tipo = ? AND categoria = ? AND nacionalidad = ?
+                  AND titulos <= 0""",
+            (clasif for clasif, (n, _) in clases.items() if n < 0),
+        )
+        self.conn.executemany(
+            """DELETE FROM modelo_tokens
+                WHERE token = ? AND tipo = ? AND categoria = ?
+                  AND nacionalidad = ? AND cuenta <= 0""",
+            ((token, *clasif) for (token, clasif), n in tokens.items() if n < 0),
+        )
+
+    def obtener(self, nombre_base: str):
+        """
+        Clasificación de un solo título o None. Es buscar_lote() con un
+        nombre, así que da lo mismo que la búsqueda por lotes.
+        """
+        return self.obtener_lote([nombre_base]).get(nombre_base)
+
+    def obtener_lote(self, nombres_base) -> dict:
+        """
+        Retorna un dict nombre_base -> (tipo, categoria, nacionalidad) solo
+        con los nombres que tienen clasificación.
+        """
+        encontrados = self.buscar_lote(nombres_base)
+        return {nb: clasif for nb, (clasif, _) in encontrados.items()}
+
+    def buscar_lote(self, nombres_base) -> dict:
+        """
+        Resuelve todos los nombres con una consulta de conjunto para las
+        coincidencias exactas y el índice en memoria para las palabras clave
+        (solo palabras exactas: las aproximadas son sugerencias, ver
+        clasificar_pendientes).
+        Retorna un dict nombre_base -> (clasificación, fuente), donde fuente
+        es "exacta" o "palabra_clave".
+        """
+        nombres = list(dict.fromkeys(nombres_base))
+        resultados = {}
+        if not nombres:
+            return resultados
+        with medidor.etapa("consulta_bd"):
+            self._buscar_lote(nombres, resultados)
+        return resultados
+
+    def _exactas(self, nombres, con_senales=False) -> dict:
+        # Una sola consulta de conjunto: nombre -> (tipo, categoria, nacionalidad)
+        # y, con `con_senales`, (capítulo, temporada) al final
+        columnas = ", cl.capitulo, cl.temporada" if con_senales else ""
+        c = self.conn.cursor()
+        c.execute("CREATE TEMP TABLE IF NOT EXISTS _buscar (clave TEXT PRIMARY KEY)")
+        c.execute("DELETE FROM _buscar")
+        c.executemany(
+            "INSERT OR IGNORE INTO _buscar VALUES (?)", ((n,) for n in nombres)
+        )
+        # CROSS JOIN fija el orden: se recorre _buscar y se busca cada nombre
+        # por la clave primaria (si no, SQLite puede recorrer clasificacion)
+        c.execute(
+            f"""SELECT cl.nombre, cl.tipo, cl.categoria, cl.nacionalidad{columnas}
+                  FROM _buscar b CROSS JOIN clasificacion cl
+                    ON cl.nombre = b.clave"""
+        )
+        encontrados = {f[0]: tuple(f[1:]) for f in c.fetchall()}
+        c.execute("DELETE FROM _buscar")
+        medidor.contar("consultas_bd")
+        return encontrados
+
+    def _buscar_lote(self, nombres: list, resultados: dict):
+        # Coincidencias exactas
+        for nombre, clasif in self._exactas(nombres).items():
+            resultados[nombre] = (clasif, "exacta")
+        medidor.contar("aciertos_bd_exactos", len(resultados))
+
+        # Búsqueda por palabras clave (en memoria) de los que faltan
+        exactos = len(resultados)
+        for nb in nombres:
+            if nb not in resultados:
+                encontrado = self.indice.buscar(nb)
+                if encontrado:
+                    resultados[nb] = (encontrado[0], "palabra_clave")
+        medidor.contar("aciertos_palabra_clave", len(resultados) - exactos)
+        self.conn.commit()
+
+    def guardar(
+        self,
+        nombre_base: str,
+        tipo: str,
+        categoria: str,
+        nacionalidad: str,
+        senales=(False, False),
+    ):
+        # Solo se encola; se escribe en confirmar(). `senales`: si los archivos
+        # del título tienen capítulo y temporada (para el modelo)
+        self._clasif_pendientes.append((nombre_base, tipo, categoria, nacionalidad))
+        self._senales_pendientes[nombre_base] = tuple(senales)
+        for palabra in _palabras_titulo(nombre_base):
+            self._palabras_pendientes.append((palabra, tipo, categoria, nacionalidad))
+
+    def guardar_lote(self, clasificaciones: dict, senales: dict = None):
+        senales = senales or {}
+        for nb, (t, cat, nac) in clasificaciones.items():
+            self.guardar(nb, t, cat or "", nac or "", senales.get(nb, (False, False)))
+        self.confirmar()
+
+    def confirmar(self):
+        if not self._clasif_pendientes:
+            return
+        medidor.contar("transacciones_bd")
+        # Antes de escribir: el modelo se entrena con lo anterior si hace falta
+        modelo = self.modelo
+        ahora = time.time()
+        with medidor.etapa("guardar_bd"), self.conn:
+            cambios, senales = self._cambios_modelo()
+            self._escribir_clasificaciones(
+                (*f, ahora, *senales[f[0]]) for f in self._clasif_pendientes
+            )
+            self.conn.executemany(
+                """INSERT OR IGNORE INTO palabras_clave
+                     (palabra, tipo, categoria, nacionalidad, actualizado)
+                     VALUES (?, ?, ?, ?, ?)""",
+                ((*f, ahora) for f in self._palabras_pendientes),
+            )
+            self._guardar_cuentas(*cambios)
+        modelo.sumar(*cambios)
+        # Los votos de las palabras cambiaron: se recarga cuando se necesite
+        self._indice = None
+        self._clasif_pendientes = []
+        self._palabras_pendientes = []
+        self._senales_pendientes = {}
+
+    def _escribir_clasificaciones(self, filas):
+        # (nombre, tipo, categoria, nacionalidad, actualizado, capitulo,
+        # temporada), con sus enlaces
+        filas = list(filas)
+        self.conn.executemany(
+            """INSERT INTO clasificacion
+                 (nombre, tipo, categoria, nacionalidad, actualizado, capitulo,
+                  temporada)
+                 VALUES (?, ?, ?, ?, ?, ?, ?)
+                 ON CONFLICT (nombre) DO UPDATE
+                 SET tipo = excluded.tipo, categoria = excluded.categoria,
+                     nacionalidad = excluded.nacionalidad,
+                     actualizado = excluded.actualizado,
+                     capitulo = excluded.capitulo,
+                     temporada = excluded.temporada""",
+            filas,
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO titulo_palabra VALUES (?, ?, ?)",
+            (fila for f in filas for fila in _enlaces_titulo(f[0])),
+        )
+
+    def _cambios_modelo(self, nuevos: dict = None, senales: dict = None) -> tuple:
+        """
+        Cambios del modelo por escribir `nuevos` (nombre -> clasificación):
+        cada clasificación reemplazada se olvida con el capítulo y la
+        temporada con que se aprendió (guardados en su fila) y la nueva se
+        aprende con los de `senales` o, si no están, con los de la fila
+        anterior. Retorna (cambios de contar(), nombre -> señales usadas),
+        para guardar las señales junto a cada fila.
+        """
+        if nuevos is None:
+            nuevos = {f[0]: f[1:] for f in self._clasif_pendientes}
+            senales = self._senales_pendientes
+        senales = senales or {}
+        previas = self._exactas(nuevos, con_senales=True)
+        ejemplos = [
+            (tuple(v or "" for v in f[:3]), caracteristicas(nb, *map(bool, f[3:])), -1)
+            for nb, f in previas.items()
+        ]
+        usadas = {}
+        for nb, clasif in nuevos.items():
+            if nb in senales:
+                cap, temp = senales[nb]
+            else:
+                cap, temp = previas[nb][3:] if nb in previas else (False, False)
+            usadas[nb] = (bool(cap), bool(temp))
+            ejemplos.append(
+                (tuple(v or "" for v in clasif), caracteristicas(nb, *usadas[nb]), 1)
+            )
+        return contar(ejemplos), usadas
+
+    # -------------------------------
+    # Exportación e importación (ver intercambio.py)
+    # -------------------------------
+    FILAS_POR_LOTE = 5000  # filas por executemany
+    FILAS_POR_TRANSACCION = 200_000
+
+    def exportar(self, tabla: str):
+        """
+        Cursor con las filas (clave, tipo, categoria, nacionalidad,
+        actualizado) de `tabla`; se leen de la BD a medida que se recorre.
+        """
+        clave = {"clasificacion": "nombre", "palabras_clave": "palabra"}[tabla]
+        return self.conn.execute(
+            f"""SELECT {clave}, tipo, categoria, nacionalidad, actualizado
+                  FROM {tabla} ORDER BY rowid"""
+        )
+
+    def importar(self, filas, politica: str = "conservar", al_progreso=None) -> dict:
+        """
+        Escribe `filas` (tabla, clave, tipo, categoria, nacionalidad,
+        actualizado) en lotes de FILAS_POR_LOTE con executemany, confirmando
+        cada FILAS_POR_TRANSACCION, sin tener todas en memoria. Si la clave ya
+        existe, `politica` decide: "conservar" la de la BD, "sobrescribir" o
+        quedarse con la más "reciente" según actualizado. El modelo de
+        sugerencias se actualiza en la misma transacción que cada lote.
+        Retorna {"leidas": n, "escritas": m}; al_progreso(leidas, escritas)
+        se llama tras cada lote.
+        """
+        if politica not in POLITICAS_IMPORTACION:
+            raise ValueError(f"Política de importación desconocida: {politica}")
+        self.confirmar()
+        self.modelo  # entrena con lo que ya hay antes de sumar cambios
+        lotes = {"clasificacion": [], "palabras_clave": []}
+        conteo = {"leidas": 0, "escritas": 0}
+        sin_confirmar = 0
+
+        def volcar(tabla):
+            nonlocal sin_confirmar
+            lote = lotes[tabla]
+            if tabla == "clasificacion":
+                conteo["escritas"] += self._importar_clasificaciones(lote, politica)
+            else:
+                conteo["escritas"] += self._importar_palabras(lote, politica)
+            sin_confirmar += len(lote)
+            lote.clear()
+            if sin_confirmar >= self.FILAS_POR_TRANSACCION:
+                self.conn.commit()
+                sin_confirmar = 0
+            if al_progreso:
+                al_progreso(conteo["leidas"], conteo["escritas"])
+
+        try:
+            with medidor.etapa("importar_bd"):
+                for tabla, *fila in filas:
+                    lote = lotes[tabla]
+                    lote.append(fila)
+                    conteo["leidas"] += 1
+                    if len(lote) >= self.FILAS_POR_LOTE:
+                        volcar(tabla)
+                for tabla, lote in lotes.items():
+                    if lote:
+                        volcar(tabla)
+                self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        finally:
+            # Se recargan de la BD la próxima vez que se usen
+            self._indice = None
+            self._modelo = None
+        return conteo
+
+    def _importar_clasificaciones(self, lote: list, politica: str) -> int:
+        c = self.conn.cursor()
+        c.execute("CREATE TEMP TABLE IF NOT EXISTS _buscar (clave TEXT PRIMARY KEY)")
+        c.execute("DELETE FROM _buscar")
+        c.executemany(
+            "INSERT OR IGNORE INTO _buscar VALUES (?)", ((f[0],) for f in lote)
+        )
+        c.execute(
+            """SELECT cl.nombre, cl.tipo, cl.categoria, cl.nacionalidad,
+                      cl.actualizado
+                 FROM _buscar b CROSS JOIN clasificacion cl
+                   ON cl.nombre = b.clave"""
+        )
+        previas = {f[0]: f[1:] for f in c.fetchall()}
+        # Cada fila se compara con la última aceptada de su clave, así las
+        # repetidas dentro de un lote siguen la política igual que entre lotes
+        nuevas = {}
+        for fila in lote:
+            actual = nuevas.get(fila[0]) or previas.get(fila[0])
+            if (
+                actual is None
+                or politica == "sobrescribir"
+                or (politica == "reciente" and fila[4] > (actual[-1] or 0))
+            ):
+                nuevas[fila[0]] = fila[1:]
+        if nuevas:
+            # Sin señales: se aprende con las que ya tenía cada título
+            cambios, senales = self._cambios_modelo(
+                {nb: f[:3] for nb, f in nuevas.items()}
+            )
+            self._escribir_clasificaciones(
+                (nb, *f, *senales[nb]) for nb, f in nuevas.items()
+            )
+            self._guardar_cuentas(*cambios)
+        return len(nuevas)
+
+    def _importar_palabras(self, lote: list, politica: str) -> int:
+        si_existe = {
+            "conservar": "NOTHING",
+            "sobrescribir": "UPDATE SET tipo = excluded.tipo, "
+            "categoria = excluded.categoria, "
+            "nacionalidad = excluded.nacionalidad, "
+            "actualizado = excluded.actualizado",
+        }
+        si_existe["reciente"] = (
+            si_existe["sobrescribir"]
+            + " WHERE excluded.actualizado > coalesce(palabras_clave.actualizado, 0)"
+        )
+        antes = self.conn.total_changes
+        self.conn.executemany(
+            f"""INSERT INTO palabras_clave
+                  (palabra, tipo, categoria, nacionalidad, actualizado)
+                  VALUES (?, ?, ?, ?, ?)
+                  ON CONFLICT (palabra) DO {si_existe[politica]}""",
+            lote,
+        )
+        return self.conn.total_changes - antes
+
+    def cargar_manifiesto(self, raiz: str) -> dict:
+        """Filas del manifiesto bajo `raiz`: ruta -> FilaManifiesto."""
+        prefijo = os.path.join(raiz, "")
+        hasta = prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+        medidor.contar("consultas_bd")
+        filas = self.conn.execute(
+            """SELECT ruta, tamano, mtime_ns, inodo, nombre, capitulo, temporada,
+                      destino
+                 FROM manifiesto WHERE ruta >= ? AND ruta < ?""",
+            (prefijo, hasta),
+        )
+        return {f[0]: FilaManifiesto(*f[1:]) for f in filas}
+
+    def guardar_manifiesto(self, filas: dict, borrar):
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM manifiesto WHERE ruta=?", ((r,) for r in borrar)
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO manifiesto VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((ruta, *fila) for ruta, fila in filas.items()),
+            )
+
+    def cargar_huellas(self, claves) -> dict:
+        """
+        Huellas guardadas: (dispositivo, inodo, tamano, mtime_ns) ->
+        (parcial, completa).
+        """
+        c = self.conn.cursor()
+        c.execute(
+            """CREATE TEMP TABLE IF NOT EXISTS _huellas (
+                     dispositivo INTEGER, inodo INTEGER, tamano INTEGER,
+                     mtime_ns INTEGER)"""
+        )
+        c.execute("DELETE FROM _huellas")
+        c.executemany("INSERT INTO _huellas VALUES (?, ?, ?, ?)", claves)
+        medidor.contar("consultas_bd")
+        c.execute(
+            """SELECT h.dispositivo, h.inodo, h.tamano, h.mtime_ns, h.parcial,
+                      h.completa
+                 FROM huellas h JOIN _huellas b
+                   ON b.dispositivo = h.dispositivo AND b.inodo = h.inodo
+                  AND b.tamano = h.tamano AND b.mtime_ns = h.mtime_ns"""
+        )
+        encontradas = {tuple(f[:4]): (f[4], f[5]) for f in c.fetchall()}
+        c.execute("DELETE FROM _huellas")
+        self.conn.commit()
+        return encontradas
+
+    def guardar_huellas(self, huellas: dict):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO huellas VALUES (?, ?, ?, ?, ?, ?)",
+                ((*clave, *huella) for clave, huella in huellas.items()),
+            )
+
+    def cargar_sondeos(self, claves) -> dict:
+        """Sondeos guardados: (dispositivo, inodo, tamano, mtime_ns) -> InfoMedio."""
+        c = self.conn.cursor()
+        c.execute(
+            """CREATE TEMP TABLE IF NOT EXISTS _sondeos (
+                     dispositivo INTEGER, inodo INTEGER, tamano INTEGER,
+                     mtime_ns INTEGER)"""
+        )
+        c.execute("DELETE FROM _sondeos")
+        c.executemany("INSERT INTO _sondeos VALUES (?, ?, ?, ?)", claves)
+        medidor.contar("consultas_bd")
+        c.execute(
+            """SELECT s.dispositivo, s.inodo, s.tamano, s.mtime_ns, s.duracion,
+                      s.ancho, s.alto, s.titulo
+                 FROM _sondeos b CROSS JOIN sondeos s
+                   ON s.dispositivo = b.dispositivo AND s.inodo = b.inodo
+                  AND s.tamano = b.tamano AND s.mtime_ns = b.mtime_ns"""
+        )
+        encontrados = {tuple(f[:4]): InfoMedio(*f[4:]) for f in c.fetchall()}
+        c.execute("DELETE FROM _sondeos")
+        self.conn.commit()
+        return encontrados
+
+    def guardar_sondeos(self, sondeos: dict):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO sondeos VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((*clave, *info) for clave, info in sondeos.items()),
+            )
+
+    def cerrar(self):
+        if self.conn is None:
+            return
+        try:
+            self.confirmar()
+        finally:
+            self.conn.close()
+            self.conn = None
+
+
+class IndicePalabrasClave:
+    """
+    Índice en memoria de la tabla palabras_clave. Busca cada palabra del
+    nombre por coincidencia exacta (sin acentos), por prefijo (trie) y con
+    un error de una letra (variantes por borrado), sin consultas SQL.
+
+    Cada palabra puede recibir votos (con peso) de varias clasificaciones y
+    se queda con la de más peso; en empate, con la menor, de modo que el
+    resultado no depende del orden en que llegan las filas.
+    """
+
+    PUNTOS_EXACTA = 1.0
+    PUNTOS_PREFIJO = 0.8
+    PUNTOS_UN_ERROR = 0.7
+    PUNTOS_MINIMOS = 0.5
+    # Largo mínimo de palabra y palabra clave para prefijos y errores: con
+    # menos, "dark" coincidiría con "darko"
+    LARGO_DIFUSA = 6
+
+    def __init__(self, filas=()):
+        self._exactas = {}  # palabra normalizada -> clasificación ganadora
+        self._votos = {}  # palabra normalizada -> {clasificación: peso}
+        # Trie: letra -> nodo; "$" = palabra completa, "*" = la más corta debajo
+        self._trie = {}
+        self._borrados = {}  # palabra con una letra borrada -> {palabras}
+        # Filas (palabra, tipo, categoria, nacionalidad[, peso])
+        for palabra, tipo, categoria, nacionalidad, *peso in filas:
+            self.agregar(palabra, (tipo, categoria, nacionalidad), *peso)
+
+    def __len__(self):
+        return len(self._exactas)
+
+    @staticmethod
+    def _normalizar(texto: str) -> str:
+        return quitar_acentos(texto).lower()
+
+    @staticmethod
+    def _gana(votos: dict, a: tuple, b: tuple) -> tuple:
+        # Más peso primero; en empate, la menor clasificación (sin None)
+        if votos[a] != votos[b]:
+            return a if votos[a] > votos[b] else b
+        return min(a, b, key=lambda c: tuple(v or "" for v in c))
+
+    def agregar(self, palabra: str, clasif: tuple, peso: float = 0.0):
+        """Suma `peso` a la clasificación `clasif` de la palabra."""
+        palabra = self._normalizar(palabra)
+        clasif = tuple(clasif)
+        votos = self._votos.get(palabra)
+        if votos is not None:
+            votos[clasif] = votos.get(clasif, 0.0) + peso
+            # Si solo subió `clasif`, gana ella o la que ya ganaba
+            actual = self._exactas[palabra]
+            if peso < 0:
+                for otra in votos:
+                    actual = self._gana(votos, actual, otra)
+            self._exactas[palabra] = self._gana(votos, actual, clasif)
+            return
+        self._votos[palabra] = {clasif: peso}
+        self._exactas[palabra] = clasif
+
+        nodo = self._trie
+        for letra in palabra:
+            nodo = nodo.setdefault(letra, {})
+            corta = nodo.get("*")
+            if corta is None or len(palabra) < len(corta):
+                nodo["*"] = palabra
+        nodo["$"] = palabra
+
+        for i in range(len(palabra)):
+            self._borrados.setdefault(palabra[:i] + palabra[i + 1 :], set()).add(
+                palabra
+            )
+
+    def _mejor_para(self, token: str, difusas: bool = True):
+        """
+        Retorna (puntos, palabra) de la mejor palabra clave para un token.
+        Sin `difusas`, solo la coincidencia exacta.
+        """
+        if token in self._exactas:
+            return self.PUNTOS_EXACTA, token
+
+        mejor = (0.0, None)
+        if not difusas or len(token) < self.LARGO_DIFUSA:
+            return mejor
+        minimo = self.LARGO_DIFUSA
+
+        # Prefijos: palabras clave que empiezan por el token y palabras clave
+        # que son prefijo del token, todo en un solo recorrido del trie.
+        nodo = self._trie
+        for letra in token:
+            nodo = nodo.get(letra)
+            if nodo is None:
+                break
+            clave = nodo.get("$")
+            if clave and len(clave) >= minimo:
+                puntos = self.PUNTOS_PREFIJO * len(clave) / len(token)
+                mejor = max(mejor, (puntos, clave))
+        else:
+            clave = nodo.get("*")
+            if clave:
+                puntos = self.PUNTOS_PREFIJO * len(token) / len(clave)
+                mejor = max(mejor, (puntos, clave))
+
+        # Distancia de edición 1 (inserción, borrado o sustitución)
+        candidatas = set(self._borrados.get(token, ()))
+        for i in range(len(token)):
+            variante = token[:i] + token[i + 1 :]
+            if variante in self._exactas:
+                candidatas.add(variante)
+            candidatas.update(self._borrados.get(variante, ()))
+        for clave in candidatas:
+            if len(clave) >= minimo and _distancia_uno(token, clave):
+                mejor = max(mejor, (self.PUNTOS_UN_ERROR, clave))
+
+        return mejor
+
+    def _tokens(self, nombre: str) -> list:
+        return [
+            t
+            for t in dict.fromkeys(re.findall(r"\w+", self._normalizar(nombre)))
+            if len(t) > 3
+        ]
+
+    def buscar(self, nombre: str, difusas: bool = False):
+        """
+        Puntúa cada clasificación sumando la mejor coincidencia de cada
+        palabra del nombre. Retorna (clasificación, puntos) o None. Por
+        defecto solo cuentan las palabras exactas (lo que se clasifica sin
+        preguntar); con `difusas`, también prefijos y un error (ver sugerir).
+        """
+        puntos_por_clasif = {}
+        for token in self._tokens(nombre):
+            puntos, clave = self._mejor_para(token, difusas)
+            if clave is None or puntos < self.PUNTOS_MINIMOS:
+                continue
+            clasif = self._exactas[clave]
+            # En empate gana la que apareció primero en el nombre (dict ordenado)
+            puntos_por_clasif[clasif] = puntos_por_clasif.get(clasif, 0.0) + puntos
+        if not puntos_por_clasif:
+            return None
+        clasif = max(puntos_por_clasif, key=puntos_por_clasif.get)
+        return clasif, puntos_por_clasif[clasif]
+
+    def sugerir(self, nombre: str):
+        """
+        Sugerencia (nunca se aplica sola) con prefijos y errores de una letra.
+        La confianza es la parte del nombre que coincidió: los puntos sobre
+        la cantidad de palabras.
+        """
+        encontrado = self.buscar(nombre, difusas=True)
+        if encontrado is None:
+            return None
+        clasif, puntos = encontrado
+        return Sugerencia(clasif, min(1.0, puntos / len(self._tokens(nombre))))
+
+
+def _distancia_uno(a: str, b: str) -> bool:
+    # Verdadero si a y b difieren exactamente en una edición
+    if a == b or abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1 :] == b[i + 1 :]
+    return a[i:] == b[i + 1 :]
+
+
+class FilaManifiesto(NamedTuple):
+    tamano: int
+    mtime_ns: int
+    inodo: int
+    nombre: str
+    capitulo: str
+    temporada: str
+    destino: str  # ruta donde quedó el archivo; "" si no se movió
+
+
+class Manifiesto:
+    """
+    Estado del último escaneo de una carpeta (tabla manifiesto). Permite
+    reconocer los archivos que no cambiaron desde la ejecución anterior para
+    no volver a analizarlos ni moverlos. Con `filtro` (el del escaneo), los
+    archivos movidos a carpetas que el escaneo no recorre no se anotan.
+    """
+
+    def __init__(self, repo: ClasificacionRepo, raiz, filtro: FiltroEscaneo = None):
+        self.repo = repo
+        self.raiz = str(raiz)
+        self.filtro = filtro
+        self._previo = repo.cargar_manifiesto(self.raiz)
+        self._nuevo = {}  # ruta -> FilaManifiesto
+
+    def sin_cambios(self, entrada):
+        """Retorna la fila anterior si el archivo no cambió, o None."""
+        previo = self._previo.get(entrada.ruta)
+        if previo is None or (previo.tamano, previo.mtime_ns, previo.inodo) != (
+            entrada.tamano,
+            entrada.mtime_ns,
+            entrada.inodo,
+        ):
+            return None
+        self._nuevo[entrada.ruta] = previo
+        return previo
+
+    def anotar(self, entrada, nombre: str, cap: str, temp: str, destino: str = ""):
+        self._nuevo[entrada.ruta] = FilaManifiesto(
+            entrada.tamano,
+            entrada.mtime_ns,
+            entrada.inodo,
+            nombre,
+            cap,
+            temp,
+            destino,
+        )
+
+    def al_terminar(self, paso, destino_final, error):
+        # Callback de aplicar_plan: la fila pasa a la ruta nueva del archivo,
+        # si el próximo escaneo la va a ver (si no, se borraría y se volvería
+        # a anotar en cada ejecución)
+        if error is not None or paso.origen not in self._nuevo:
+            return
+        fila = self._nuevo.pop(paso.origen)
+        carpeta = os.path.dirname(destino_final)
+        if self.filtro is not None and not self.filtro.carpeta(carpeta):
+            return
+        try:
+            inodo = os.stat(destino_final).st_ino or fila.inodo
+        except OSError:
+            return
+        destino = str(destino_final)
+        self._nuevo[destino] = fila._replace(inodo=inodo, destino=destino)
+
+    def guardar(self):
+        # Se olvidan las rutas que no aparecieron en este escaneo
+        borrar = [r for r in self._previo if r not in self._nuevo]
+        self.repo.guardar_manifiesto(self._nuevo, borrar)
+
+
+def inicializar_db(db_path: Path):
+    ClasificacionRepo(db_path).cerrar()
 
 
 def obtener_clasificacion(nombre_base: str, db_path: Path):
-    conn = sqlite3.connect(str(db_path))
-    c = conn.cursor()
-    c.execute(
-        "SELECT tipo, categoria, nacionalidad FROM clasificacion WHERE nombre=?",
-        (nombre_base,),
-    )
-    res = c.fetchone()
-    if res:
-        conn.close()
-        return res
-    # Búsqueda por palabras clave
-    palabras = re.findall(r"\w+", nombre_base.lower())
-    for p in palabras:
-        if len(p) > 3:
-            c.execute(
-                "SELECT tipo, categoria, nacionalidad FROM palabras_clave WHERE palabra=?",
-                (p,),
-            )
-            r2 = c.fetchone()
-            if r2:
-                conn.close()
-                return r2
-    conn.close()
-    return None
+    with ClasificacionRepo(db_path) as repo:
+        return repo.obtener(nombre_base)
+
+
+def obtener_clasificaciones_lote(nombres_base, db_path: Path) -> dict:
+    with ClasificacionRepo(db_path) as repo:
+        return repo.obtener_lote(nombres_base)
 
 
 def guardar_clasificacion_en_db(
     nombre_base: str, tipo: str, categoria: str, nacionalidad: str, db_path: Path
 ):
-    conn = sqlite3.connect(str(db_path))
-    c = conn.cursor()
-    c.execute(
-        "INSERT OR REPLACE INTO clasificacion VALUES (?, ?, ?, ?)",
-        (nombre_base, tipo, categoria, nacionalidad),
-    )
-    for palabra in re.findall(r"\w+", nombre_base.lower()):
-        if len(palabra) > 3:
-            c.execute(
-                "INSERT OR IGNORE INTO palabras_clave VALUES (?, ?, ?, ?)",
-                (palabra, tipo, categoria, nacionalidad),
-            )
-    conn.commit()
-    conn.close()
+    with ClasificacionRepo(db_path) as repo:
+        repo.guardar(nombre_base, tipo, categoria, nacionalidad)
 
 
 # -------------------------------
@@ -153,7 +1507,12 @@ def guardar_clasificacion_en_db(
 # -------------------------------
 
 
+_NO_ALFANUM = re.compile(r"[^a-zA-Z0-9]+")
+
+
 def quitar_acentos(s: str) -> str:
+    if s.isascii():
+        return s  # NFKD no cambia texto ASCII
     return "".join(
         ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch)
     )
@@ -162,76 +1521,526 @@ def quitar_acentos(s: str) -> str:
 def normalizar_nombre(nombre: str) -> str:
     # Elimina acentos y caracteres no alfanuméricos, dejando espacios
     nombre = quitar_acentos(nombre)
-    nombre = re.sub(r"[^a-zA-Z0-9]+", " ", nombre).strip()
+    nombre = _NO_ALFANUM.sub(" ", nombre).strip()
     return nombre.title()
 
 
-def obtener_nombre_cap(nombre_archivo: str):
-    nombre, _ = Path(nombre_archivo).stem, Path(nombre_archivo).suffix
-    capitulo = ""
-    temporada = ""
-    capitulo_patterns = [
-        r"\b(\d{1,3}[xX]\d{1,3})\b",  # 1x02
-        r"\b([sS]\d{1,3}[eE]\d{1,3})\b",  # S01E03
-        r"\b(ep?\s?\d{1,3})\b",  # EP12, Ep5
-        r"\b(\d{3,4})\b",  # 103 (S1E03)
-    ]
-    base = nombre
-    for pattern in capitulo_patterns:
-        m = re.search(pattern, base)
-        if m:
-            capitulo = m.group(1).upper()
-            base = base.replace(m.group(0), " ")
-            break
-    temporada_patterns = [
-        r"\[TEMP\s*(\d+)\]",  # [TEMP 2]
-        r"\bSeason\s*(\d+)\b",  # Season 3
-        r"\b[Ss](\d{1,2})\b",  # S02
-    ]
+def _stem(nombre_archivo: str) -> str:
+    # Igual que Path(nombre_archivo).stem, sin construir un Path
+    nombre = os.path.basename(nombre_archivo.rstrip("/" + os.sep))
+    i = nombre.rfind(".")
+    return nombre[:i] if 0 < i < len(nombre) - 1 else nombre
+
+
+class ParserNombres:
+    """
+    Extrae (nombre, capítulo, temporada) de nombres de archivo con patrones
+    precompilados. Guarda en caché LRU el resultado por stem y, por separado,
+    la normalización del nombre ya sin el capítulo: los episodios de una
+    misma serie comparten esa parte, así que casi siempre se reutiliza.
+    """
+
+    CAPITULO = (
+        re.compile(r"\b(\d{1,3}[xX]\d{1,3})\b"),  # 1x02
+        re.compile(r"\b([sS]\d{1,3}[eE]\d{1,3})\b"),  # S01E03
+        re.compile(r"\b(ep?\s?\d{1,3})\b"),  # EP12, Ep5
+        re.compile(r"\b(\d{3,4})\b"),  # 103 (S1E03)
+    )
+    TEMPORADA = (
+        re.compile(r"\[TEMP\s*(\d+)\]", re.IGNORECASE),  # [TEMP 2]
+        re.compile(r"\bSeason\s*(\d+)\b", re.IGNORECASE),  # Season 3
+        re.compile(r"\b[Ss](\d{1,2})\b", re.IGNORECASE),  # S02
+    )
+    # Prefiltros combinados: si no encuentran nada, ningún patrón individual
+    # puede coincidir y se evita probarlos uno por uno
+    _ALGUN_DIGITO = re.compile(r"\d")
+    _ALGUNA_TEMPORADA = re.compile(
+        "|".join(p.pattern for p in TEMPORADA), re.IGNORECASE
+    )
+
+    def __init__(self, tam_cache: int = 65536):
+        self._parsear_stem = lru_cache(maxsize=tam_cache)(self._parsear_stem)
+        self._normalizar = lru_cache(maxsize=tam_cache)(normalizar_nombre)
+
+    def parsear(self, nombre_archivo: str):
+        return self._parsear_stem(_stem(nombre_archivo))
+
+    def parsear_lote(self, nombres_archivo) -> list:
+        # Los stems repetidos dentro del lote se resuelven una sola vez
+        vistos = {}
+        resultados = []
+        for nombre_archivo in nombres_archivo:
+            stem = _stem(nombre_archivo)
+            r = vistos.get(stem)
+            if r is None:
+                r = vistos[stem] = self._parsear_stem(stem)
+            resultados.append(r)
+        return resultados
+
+    def _parsear_stem(self, base: str):
+        capitulo = ""
+        temporada = ""
+        if self._ALGUN_DIGITO.search(base):
+            for pattern in self.CAPITULO:
+                m = pattern.search(base)
+                if m:
+                    capitulo = m.group(1).upper()
+                    base = base.replace(m.group(0), " ")
+                    break
+
+        if self._ALGUNA_TEMPORADA.search(base):
+            for pattern in self.TEMPORADA:
+                m = pattern.search(base)
+                if m:
+                    temporada = f"Season {m.group(1)}"
+                    base = pattern.sub(" ", base)
+                    break
+        return self._normalizar(base.strip()), capitulo, temporada
+
+    def info_cache(self):
+        return self._parsear_stem.cache_info(), self._normalizar.cache_info()
+
 
-    for pattern in temporada_patterns:
-        m = re.search(pattern, base, re.IGNORECASE)
-        if m:
-            temporada = f"Season {m.group(1)}"
-            base = re.sub(pattern, " ", base, flags=re.IGNORECASE)
-            break
-    return normalizar_nombre(base.strip()), capitulo, temporada
+_parser_nombres = ParserNombres()
+
+
+def obtener_nombre_cap(nombre_archivo: str):
+    return _parser_nombres.parsear(nombre_archivo)
 
 
 # -------------------------------
 # Movimiento de archivos
 # -------------------------------
-def mover_archivo(origen: Path, destino: Path):
-    destino.parent.mkdir(parents=True, exist_ok=True)
-    if destino.exists():
-        base = destino.with_suffix("")  # sin extensión
-        ext = destino.suffix
-        i = 1
-        while True:
-            candidato = Path(f"{base} ({i}){ext}")
-            if not candidato.exists():
-                shutil.move(str(origen), str(candidato))
+class AsignadorDestinos:
+    """
+    Reparte nombres libres en las carpetas de destino. Cada carpeta se lista
+    una sola vez; los nombres ocupados quedan en memoria y el siguiente sufijo
+    " (n)" de cada nombre se guarda, así que no se prueba candidato por
+    candidato con exists(). Cada nombre se reclama creando el archivo con
+    O_EXCL, de modo que otro hilo u otro proceso no puede recibir el mismo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ocupados = {}  # carpeta -> {nombres (normcase)}
+        self._siguiente = {}  # (carpeta, nombre) -> próximo sufijo a probar
+
+    def _ocupados_en(self, carpeta: Path) -> set:
+        ocupados = self._ocupados.get(carpeta)
+        if ocupados is None:
+            try:
+                ocupados = {os.path.normcase(n) for n in os.listdir(carpeta)}
+            except FileNotFoundError:
+                carpeta.mkdir(parents=True, exist_ok=True)
+                ocupados = set()
+            self._ocupados[carpeta] = ocupados
+        return ocupados
+
+    def reservar(self, destino: Path) -> Path:
+        """Crea un archivo vacío con el primer nombre libre y retorna su ruta."""
+        carpeta = destino.parent
+        clave = (carpeta, os.path.normcase(destino.name))
+        with self._lock:
+            ocupados = self._ocupados_en(carpeta)
+            i = self._siguiente.get(clave, 0)
+            while True:
+                if i == 0:
+                    nombre = destino.name
+                else:
+                    nombre = f"{destino.stem} ({i}){destino.suffix}"
+                i += 1
+                if os.path.normcase(nombre) in ocupados:
+                    continue
+                candidato = carpeta / nombre
+                try:
+                    fd = os.open(candidato, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                except FileExistsError:
+                    # Lo creó otro proceso después de listar la carpeta
+                    ocupados.add(os.path.normcase(nombre))
+                    continue
+                os.close(fd)
+                ocupados.add(os.path.normcase(nombre))
+                self._siguiente[clave] = i
+                if nombre != destino.name:
+                    medidor.contar("colisiones_resueltas")
                 return candidato
-            i += 1
-    else:
-        shutil.move(str(origen), str(destino))
-        return destino
+
+
+def mover_archivo(
+    origen: Path,
+    destino: Path,
+    mismo_dispositivo: bool = None,
+    asignador: AsignadorDestinos = None,
+    enlazar_a: Path = None,
+    al_reservar=None,
+):
+    """
+    Mueve `origen` al primer nombre libre de `destino` y retorna la ruta final.
+    Con `enlazar_a` (un archivo de contenido idéntico) el destino pasa a ser
+    un enlace duro a ese archivo y el origen se borra; si no se puede enlazar
+    (otro volumen, sistema sin enlaces) se mueve como siempre.
+
+    `al_reservar(final)` se llama con el nombre reservado antes de mover
+    nada (ver Diario.al_reservar). Se intenta renombrar salvo que
+    `mismo_dispositivo` sea False; entre volúmenes (o si el rename da EXDEV)
+    se copia a un nombre temporal, así el nombre final nunca tiene una copia
+    a medias.
+    """
+    if asignador is None:
+        asignador = AsignadorDestinos()
+    final = asignador.reservar(destino)
+    temporal = final.with_name(f".{final.name}.parcial")
+    ocupado = False  # si `final` ya no es la reserva vacía
+    try:
+        if al_reservar is not None:
+            al_reservar(final)
+        if enlazar_a is not None and _enlazar(enlazar_a, final):
+            ocupado = True
+            os.unlink(origen)
+            medidor.contar("duplicados_enlazados")
+            return final
+        if mismo_dispositivo is not False:
+            try:
+                # Reemplaza de forma atómica el archivo vacío reservado
+                os.replace(origen, final)
+                if medidor.activo:
+                    medidor.contar("archivos_renombrados")
+                    medidor.contar("bytes_renombrados", os.path.getsize(final))
+                return final
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+        shutil.copy2(str(origen), str(temporal))
+        os.replace(temporal, final)
+        ocupado = True
+        os.unlink(origen)
+        if medidor.activo:
+            medidor.contar("archivos_copiados")
+            medidor.contar("bytes_copiados", os.path.getsize(final))
+        return final
+    except BaseException:
+        # Si el origen sigue ahí (o nunca llegó nada al destino) el movimiento
+        # no ocurrió: liberar la reserva
+        sobrantes = [temporal]
+        if not ocupado or os.path.exists(origen):
+            sobrantes.append(final)
+        for sobrante in sobrantes:
+            try:
+                sobrante.unlink()
+            except OSError:
+                pass
+        raise
+
+
+def _enlazar(original: Path, final: Path) -> bool:
+    # El enlace se crea con otro nombre y reemplaza a la reserva de una vez
+    temporal = final.with_name(f".{final.name}.enlace")
+    try:
+        os.link(original, temporal)
+    except OSError:
+        return False
+    try:
+        os.replace(temporal, final)
+    except OSError:
+        os.unlink(temporal)
+        return False
+    return True
+
+
+# -------------------------------
+# Motor de movimientos en paralelo
+# -------------------------------
+class Movimiento(NamedTuple):
+    origen: Path
+    destino: Path
+    enlazar_a: Path = None  # copia idéntica: crear un enlace duro a este archivo
+
+
+def _dispositivo(path: Path, cache: dict):
+    # st_dev de la carpeta existente más cercana (el destino aún puede no existir)
+    if path in cache:
+        return cache[path]
+    try:
+        dev = os.stat(path).st_dev
+    except FileNotFoundError:
+        dev = None if path.parent == path else _dispositivo(path.parent, cache)
+    cache[path] = dev
+    return dev
+
+
+class OperacionCancelada(Exception):
+    def __str__(self):
+        return "Cancelado"
+
+
+def ejecutar_movimientos(
+    movimientos,
+    hilos: int = 4,
+    copias_por_dispositivo: int = 1,
+    cancelar=None,
+    al_reservar=None,
+):
+    """
+    Ejecuta una lista de Movimiento en un pool de hilos. Los movimientos dentro
+    del mismo volumen son un os.rename; las copias entre volúmenes se limitan a
+    `copias_por_dispositivo` simultáneas por volumen de destino.
+    Genera (indice, destino_final, error) a medida que cada archivo termina.
+    Si `cancelar` (threading.Event) se activa, los archivos que aún no
+    empezaron terminan con OperacionCancelada. `al_reservar(indice, final)`
+    recibe el nombre reservado de cada archivo antes de moverlo.
+
+    Si el `enlazar_a` de un movimiento es el origen de otro anterior de la
+    lista, se espera a que ese termine y se enlaza a su destino final. El
+    pool toma los trabajos en orden, así que el anterior ya está en marcha.
+    """
+    movimientos = list(movimientos)
+    if not movimientos:
+        return
+    devs = {}
+    semaforos = {}
+    asignador = AsignadorDestinos()
+    indices = {mov.origen: i for i, mov in enumerate(movimientos)}
+    esperados = {
+        indices[mov.enlazar_a]: threading.Event()
+        for mov in movimientos
+        if mov.enlazar_a in indices
+    }
+    finales = {}
+
+    def enlace(mov: Movimiento):
+        j = indices.get(mov.enlazar_a)
+        if j is None:
+            return mov.enlazar_a
+        esperados[j].wait()
+        return finales.get(j)  # None si falló: se mueve como siempre
+
+    def mover(i: int, mov: Movimiento):
+        if cancelar is not None and cancelar.is_set():
+            raise OperacionCancelada()
+        original = enlace(mov) if mov.enlazar_a is not None else None
+        reservado = None
+        if al_reservar is not None:
+
+            def reservado(final):
+                al_reservar(i, final)
+
+        dev_origen = _dispositivo(mov.origen.parent, devs)
+        dev_destino = _dispositivo(mov.destino.parent, devs)
+        # Sin saber el volumen del origen se prueba renombrar (ver EXDEV)
+        mismo = None if dev_origen is None else dev_origen == dev_destino
+        if mismo or original is not None:
+            # Un enlace no copia datos: no ocupa el turno de copia del volumen
+            return mover_archivo(
+                mov.origen, mov.destino, mismo, asignador, original, reservado
+            )
+        with semaforos[dev_destino]:
+            return mover_archivo(
+                mov.origen, mov.destino, mismo, asignador, None, reservado
+            )
+
+    def trabajo(i: int, mov: Movimiento):
+        try:
+            finales[i] = mover(i, mov)
+            return finales[i]
+        finally:
+            if i in esperados:
+                esperados[i].set()
+
+    # Precalcular volúmenes en el hilo principal: los hilos solo leen la cache
+    for mov in movimientos:
+        _dispositivo(mov.origen.parent, devs)
+        dev = _dispositivo(mov.destino.parent, devs)
+        if dev not in semaforos:
+            semaforos[dev] = threading.Semaphore(max(1, copias_por_dispositivo))
+
+    with ThreadPoolExecutor(max_workers=max(1, hilos)) as pool:
+        futuros = {
+            pool.submit(trabajo, i, mov): i for i, mov in enumerate(movimientos)
+        }
+        for futuro in as_completed(futuros):
+            i = futuros[futuro]
+            try:
+                yield i, futuro.result(), None
+            except Exception as e:
+                yield i, None, e
+
+
+# -------------------------------
+# Frontends de clasificación
+# -------------------------------
+class FrontendClasificacion:
+    """
+    Decide qué hacer con los títulos que no están en la BD. clasificar()
+    retorna un dict nombre_base -> (tipo, categoria, nacionalidad) con los
+    que se pudieron clasificar; el resto queda omitido. `sugerencias` trae
+    nombre_base -> Sugerencia del modelo para proponerlas como valor inicial.
+    Un frontend puede pasar a `al_guardar` dicts parciales con lo ya
+    clasificado para que se guarde antes de terminar.
+    """
+
+    def clasificar(
+        self,
+        pendientes: list,
+        cfg: dict,
+        db_path: Path,
+        sugerencias=None,
+        al_guardar=None,
+    ) -> dict:
+        raise NotImplementedError
+
+
+class FrontendTk(FrontendClasificacion):
+    # Ventana de clasificar_por_lote (Tk se importa al abrirla)
+    def __init__(self, parent=None):
+        self.parent = parent
+
+    def clasificar(self, pendientes, cfg, db_path, sugerencias=None, al_guardar=None):
+        return clasificar_por_lote(
+            pendientes,
+            cfg,
+            db_path,
+            parent=self.parent,
+            sugerencias=sugerencias,
+            al_guardar=al_guardar,
+        )
+
+
+class FrontendTerminal(FrontendClasificacion):
+    TIPOS = {"s": "serie", "p": "pelicula", "n": "novela", "m": "musica", "h": "show"}
+
+    def __init__(self, entrada=input, salida=print):
+        self.entrada = entrada
+        self.salida = salida
+
+    def _preguntar(self, texto: str) -> str:
+        try:
+            return self.entrada(texto).strip().lower()
+        except EOFError:
+            return "q"
+
+    def _elegir(self, titulo: str, opciones: list, defecto: str) -> str:
+        for i, op in enumerate(opciones, start=1):
+            self.salida(f"  {i}. {op}")
+        resp = self._preguntar(f"{titulo} [Enter = {defecto}]: ")
+        if resp.isdigit() and 1 <= int(resp) <= len(opciones):
+            return opciones[int(resp) - 1]
+        return defecto
+
+    def clasificar(self, pendientes, cfg, db_path, sugerencias=None, al_guardar=None):
+        resultados = {}
+        total = len(pendientes)
+        for i, nombre_base in enumerate(pendientes, start=1):
+            sugerencia = (sugerencias or {}).get(nombre_base)
+            if sugerencia:
+                # Enter acepta la sugerencia en vez de omitir
+                sug_t, sug_cat, sug_nac = sugerencia.clasif
+                detalle = "/".join(v for v in sugerencia.clasif if v)
+                enter = f"Enter = {detalle} ({sugerencia.confianza:.0%})"
+            else:
+                sug_t, sug_cat, sug_nac = "", "", ""
+                enter = "Enter = omitir"
+            resp = self._preguntar(
+                f"[{i}/{total}] {nombre_base}: (s)erie, (p)elícula, (n)ovela, "
+                f"(m)úsica, s(h)ow, {enter}, q = omitir todos: "
+            )
+            if resp == "q":
+                break
+            if not resp and sugerencia:
+                resultados[nombre_base] = sugerencia.clasif
+                continue
+            t = self.TIPOS.get(resp)
+            if t is None:
+                continue
+            cat, nac = "", ""
+            if t == "pelicula":
+                cat = self._elegir(
+                    "Categoría",
+                    cfg["categorias_peliculas"],
+                    sug_cat if sug_t == t and sug_cat else "Otros",
+                )
+            elif t == "novela":
+                nac = self._elegir(
+                    "Nacionalidad",
+                    cfg["nacionalidades_novelas"],
+                    sug_nac if sug_t == t and sug_nac else "Otra",
+                )
+            elif t == "musica":
+                cat = self._elegir(
+                    "Subtipo",
+                    ["audio", "video"],
+                    sug_cat if sug_t == t and sug_cat else "audio",
+                )
+            resultados[nombre_base] = (t, cat, nac)
+        return resultados
+
+
+class FrontendCola(FrontendClasificacion):
+    # Sin interacción: anota los pendientes en un archivo para revisarlos después
+    def __init__(self, archivo: Path):
+        self.archivo = Path(archivo)
+
+    def clasificar(self, pendientes, cfg, db_path, sugerencias=None, al_guardar=None):
+        if not pendientes:
+            return {}
+        try:
+            with self.archivo.open("r", encoding="utf-8") as f:
+                ya_anotados = {linea.rstrip("\n") for linea in f}
+        except FileNotFoundError:
+            ya_anotados = set()
+        nuevos = [nb for nb in pendientes if nb not in ya_anotados]
+        if nuevos:
+            with self.archivo.open("a", encoding="utf-8") as f:
+                f.writelines(f"{nb}\n" for nb in nuevos)
+        return {}
+
+
+class FrontendReglas(FrontendClasificacion):
+    # Solo BD, palabras clave, reglas y sugerencias seguras: el resto se omite
+    def clasificar(self, pendientes, cfg, db_path, sugerencias=None, al_guardar=None):
+        return {}
+
+
+FRONTENDS = {
+    "tk": FrontendTk,
+    "terminal": FrontendTerminal,
+    "cola": FrontendCola,
+    "reglas": FrontendReglas,
+}
 
 
 # -------------------------------
 # Clasificación por lote (UI)
 # -------------------------------
+GUARDAR_CADA = 100  # títulos asignados que se guardan juntos
+ESPERA_GUARDAR_MS = 2000  # o lo asignado hasta ahora, tras esta pausa
+
+
 def clasificar_por_lote(
-    pendientes: list, cfg: dict, db_path: Path, parent=None
+    pendientes: list,
+    cfg: dict,
+    db_path: Path,
+    parent=None,
+    sugerencias=None,
+    al_guardar=None,
 ) -> dict:
     """
-    Muestra una ventana modal para clasificar elementos pendientes.
+    Muestra una ventana modal con los elementos pendientes en una tabla: se
+    filtran escribiendo, se eligen uno o varios (clic, Shift/Ctrl+clic,
+    Ctrl+A) y se les asigna una clasificación o su sugerencia de una vez.
+    Solo se dibujan las filas visibles, así que la lista puede tener miles.
+    Si se da `al_guardar`, recibe cada tanto un dict con lo asignado desde la
+    llamada anterior para guardarlo sin esperar a que se cierre la ventana.
     Retorna un dict nombre_base -> (tipo, categoria, nacionalidad)
     """
+    sugerencias = sugerencias or {}
     resultados = {}
     if not pendientes:
         return resultados
 
+    # Tk se importa solo aquí para que el núcleo funcione sin pantalla
+    import tkinter as tk
+    from tkinter import ttk
+
     # Crear ventana modal sobre la principal si hay parent
     if parent is not None:
         win = tk.Toplevel(parent)
@@ -241,126 +2050,327 @@ def clasificar_por_lote(
         win = tk.Tk()
 
     win.title("Clasificar contenido")
-    win.geometry("420x420")
-    win.resizable(False, False)
+    win.geometry("760x600")
+    win.minsize(520, 420)
 
-    idx = {"i": 0}
     total = len(pendientes)
+    claves = {nb: quitar_acentos(nb).lower() for nb in pendientes}
+    # Estado de la tabla: la lista filtrada, la primera fila visible y la
+    # selección (por nombre, porque las filas de la tabla se reutilizan)
+    estado = {"texto": "", "inicio": 0, "filas": 20, "ancla": None, "filtro": None}
+    filtrados = list(pendientes)  # coinciden con el texto del filtro
+    visibles = list(pendientes)  # además, sin los ya clasificados si se ocultan
+    seleccion = set()
+    sin_guardar = {}
+    guardado = {"n": 0, "tarea": None}
 
     tipo_var = tk.StringVar(value="serie")
     categoria_var = tk.StringVar(value="")
     nacionalidad_var = tk.StringVar(value="")
     subtipo_var = tk.StringVar(value="audio")  # música
+    filtro_var = tk.StringVar(value="")
+    mostrar_var = tk.BooleanVar(value=False)  # mostrar los ya clasificados
+
+    # Filtro
+    frame_filtro = ttk.Frame(win)
+    frame_filtro.pack(fill="x", padx=10, pady=(10, 4))
+    ttk.Label(frame_filtro, text="Filtrar:").pack(side="left")
+    entrada_filtro = ttk.Entry(frame_filtro, textvariable=filtro_var)
+    entrada_filtro.pack(side="left", fill="x", expand=True, padx=6)
+    ttk.Checkbutton(
+        frame_filtro, text="Mostrar clasificados", variable=mostrar_var
+    ).pack(side="left")
+    label_prog = ttk.Label(win, text="")
+    label_prog.pack(anchor="w", padx=10)
+
+    # Tabla virtual: Treeview con solo las filas que entran en pantalla y una
+    # barra de desplazamiento que mueve el inicio en la lista
+    frame_tabla = ttk.Frame(win)
+    frame_tabla.pack(fill="both", expand=True, padx=10, pady=4)
+    tabla = ttk.Treeview(
+        frame_tabla,
+        columns=("clasificacion", "sugerencia"),
+        selectmode="none",
+        height=1,
+    )
+    tabla.heading("#0", text="Título")
+    tabla.heading("clasificacion", text="Clasificación")
+    tabla.heading("sugerencia", text="Sugerencia")
+    tabla.column("#0", width=380)
+    tabla.column("clasificacion", width=150, stretch=False)
+    tabla.column("sugerencia", width=170, stretch=False)
+    tabla.tag_configure("elegido", background="#cce4ff")
+    barra = ttk.Scrollbar(frame_tabla, orient="vertical")
+    barra.pack(side="right", fill="y")
+    tabla.pack(side="left", fill="both", expand=True)
+    alto_fila = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+
+    def texto_clasif(clasif) -> str:
+        return " / ".join(v for v in clasif if v)
+
+    def dibujar():
+        n = len(visibles)
+        inicio = max(0, min(estado["inicio"], n - estado["filas"]))
+        estado["inicio"] = inicio
+        tabla.delete(*tabla.get_children())
+        for i in range(inicio, min(n, inicio + estado["filas"])):
+            nb = visibles[i]
+            sugerencia = sugerencias.get(nb)
+            tabla.insert(
+                "",
+                "end",
+                iid=str(i),
+                text=nb,
+                values=(
+                    texto_clasif(resultados[nb]) if nb in resultados else "",
+                    f"{texto_clasif(sugerencia.clasif)} "
+                    f"({sugerencia.confianza:.0%})"
+                    if sugerencia
+                    else "",
+                ),
+                tags=("elegido",) if nb in seleccion else (),
+            )
+        if n:
+            barra.set(inicio / n, min(1.0, (inicio + estado["filas"]) / n))
+        else:
+            barra.set(0.0, 1.0)
+        label_prog.config(
+            text=f"{len(visibles)} de {total} · {len(resultados)} clasificados · "
+            f"{len(seleccion)} elegidos · {guardado['n']} guardados"
+        )
 
-    ttk.Label(win, text="", font=("Arial", 11, "bold")).pack(pady=10)
-    label_titulo = win.pack_slaves()[0]  # el último ttk.Label añadido
-    label_prog = ttk.Label(win, text=f"0/{total}")
-    label_prog.pack()
+    def desplazar(*args):
+        # Protocolo de la barra: ("moveto", fracción) o ("scroll", n, unidad)
+        if args[0] == "moveto":
+            estado["inicio"] = int(float(args[1]) * len(visibles))
+        elif args[0] == "scroll":
+            paso = estado["filas"] if args[2] == "pages" else 1
+            estado["inicio"] += int(args[1]) * paso
+        dibujar()
+
+    barra.config(command=desplazar)
+
+    def rueda(evento):
+        if getattr(evento, "num", None) in (4, 5):
+            desplazar("scroll", -3 if evento.num == 4 else 3, "units")
+        elif evento.delta:
+            desplazar("scroll", -3 if evento.delta > 0 else 3, "units")
+
+    def al_redimensionar(evento):
+        # Filas que entran, descontando el encabezado
+        filas = max(1, (evento.height - alto_fila - 6) // alto_fila)
+        if filas != estado["filas"]:
+            estado["filas"] = filas
+            dibujar()
+
+    def cargar_en_panel(nb):
+        # Un solo elegido: el panel muestra su clasificación o su sugerencia
+        if nb in resultados:
+            t, cat, nac = resultados[nb]
+        elif nb in sugerencias:
+            t, cat, nac = sugerencias[nb].clasif
+        else:
+            return
+        tipo_var.set(t)
+        categoria_var.set(cat if t == "pelicula" else "")
+        nacionalidad_var.set(nac)
+        subtipo_var.set(cat if t == "musica" and cat else "audio")
+        actualizar_campos()
 
+    def clic(evento, modo=""):
+        fila = tabla.identify_row(evento.y)
+        if not fila:
+            return
+        i = int(fila)
+        nb = visibles[i]
+        if modo == "rango" and estado["ancla"] is not None:
+            a, b = sorted((estado["ancla"], i))
+            seleccion.update(visibles[a : b + 1])
+        elif modo == "alternar":
+            seleccion.symmetric_difference_update((nb,))
+            estado["ancla"] = i
+        else:
+            seleccion.clear()
+            seleccion.add(nb)
+            estado["ancla"] = i
+            cargar_en_panel(nb)
+        dibujar()
+
+    def mover(paso: int, extender=False):
+        # Flechas: mueve el elegido (con Shift, agranda la selección)
+        ancla = estado["ancla"]
+        return ir_a(0 if ancla is None else ancla + paso, extender)
+
+    def ir_a(i: int, extender=False):
+        if not visibles:
+            return "break"
+        i = max(0, min(len(visibles) - 1, i))
+        if not extender:
+            seleccion.clear()
+            cargar_en_panel(visibles[i])
+        seleccion.add(visibles[i])
+        estado["ancla"] = i
+        if i < estado["inicio"]:
+            estado["inicio"] = i
+        elif i >= estado["inicio"] + estado["filas"]:
+            estado["inicio"] = i - estado["filas"] + 1
+        dibujar()
+        return "break"
+
+    def elegir_todos(_evento=None):
+        seleccion.update(visibles)
+        dibujar()
+        return "break"
+
+    tabla.bind("<Button-1>", clic)
+    tabla.bind("<Shift-Button-1>", lambda e: clic(e, "rango"))
+    tabla.bind("<Control-Button-1>", lambda e: clic(e, "alternar"))
+    tabla.bind("<MouseWheel>", rueda)
+    tabla.bind("<Button-4>", rueda)
+    tabla.bind("<Button-5>", rueda)
+    tabla.bind("<Configure>", al_redimensionar)
+    for widget in (tabla, entrada_filtro):
+        widget.bind("<Down>", lambda e: mover(1))
+        widget.bind("<Up>", lambda e: mover(-1))
+        widget.bind("<Shift-Down>", lambda e: mover(1, True))
+        widget.bind("<Shift-Up>", lambda e: mover(-1, True))
+        widget.bind("<Next>", lambda e: mover(estado["filas"]))
+        widget.bind("<Prior>", lambda e: mover(-estado["filas"]))
+    tabla.bind("<Control-a>", elegir_todos)
+
+    def recalcular_visibles():
+        mostrar = mostrar_var.get()
+        visibles[:] = [nb for nb in filtrados if mostrar or nb not in resultados]
+        seleccion.intersection_update(visibles)
+        estado["ancla"] = None
+        dibujar()
+
+    def filtrar():
+        # Todas las palabras escritas deben estar en el título; si el texto
+        # nuevo agranda el anterior, basta con filtrar lo que ya coincidía
+        estado["filtro"] = None
+        texto = quitar_acentos(filtro_var.get()).lower().strip()
+        base = filtrados if texto.startswith(estado["texto"]) else pendientes
+        palabras = texto.split()
+        filtrados[:] = [nb for nb in base if all(p in claves[nb] for p in palabras)]
+        estado["texto"] = texto
+        estado["inicio"] = 0
+        recalcular_visibles()
+
+    def al_escribir(*_):
+        # Se espera a que se deje de escribir un momento
+        if estado["filtro"]:
+            win.after_cancel(estado["filtro"])
+        estado["filtro"] = win.after(150, filtrar)
+
+    filtro_var.trace_add("write", al_escribir)
+    mostrar_var.trace_add("write", lambda *a: recalcular_visibles())
+
+    # Panel de asignación
     frame_tipo = ttk.LabelFrame(win, text="Tipo de contenido")
-    frame_tipo.pack(fill="x", padx=10, pady=6)
+    frame_tipo.pack(fill="x", padx=10, pady=4)
     for t in ["serie", "pelicula", "novela", "musica", "show"]:
         ttk.Radiobutton(
             frame_tipo, text=t.capitalize(), variable=tipo_var, value=t
         ).pack(side="left", padx=5)
 
-    frame_categoria = ttk.LabelFrame(win, text="Categoría (Películas)")
-    frame_categoria.pack(fill="x", padx=10, pady=6)
-    combo_categoria = ttk.Combobox(
-    frame_categoria,
-    textvariable=categoria_var,
-    values=cfg.get("categorias_peliculas", []),
-    state="readonly",
-)
-    combo_categoria.pack(fill="x", padx=8, pady=6)
-
-    frame_nacionalidad = ttk.LabelFrame(win, text="Nacionalidad (Novelas)")
-    frame_nacionalidad.pack(fill="x", padx=10, pady=6)
-    combo_nacionalidad = ttk.Combobox(
-    frame_nacionalidad,
-    textvariable=nacionalidad_var,
-    values=cfg.get("nacionalidades_novelas", []),
-    state="readonly",
-)
-    combo_nacionalidad.pack(fill="x", padx=8, pady=6)
-
-    frame_subtipo = ttk.LabelFrame(win, text="Subtipo (Música)")
-    frame_subtipo.pack(fill="x", padx=10, pady=6)
-    combo_subtipo = ttk.Combobox(
-        frame_subtipo,
-        textvariable=subtipo_var,
-        values=["audio", "video"],
-        state="readonly",
-    )
-    combo_subtipo.pack(fill="x", padx=8, pady=6)
+    frame_detalle = ttk.Frame(win)
+    frame_detalle.pack(fill="x", padx=10, pady=4)
+    combos = []
+    for texto, variable, valores in (
+        ("Categoría (Películas)", categoria_var, cfg.get("categorias_peliculas", [])),
+        (
+            "Nacionalidad (Novelas)",
+            nacionalidad_var,
+            cfg.get("nacionalidades_novelas", []),
+        ),
+        ("Subtipo (Música)", subtipo_var, ["audio", "video"]),
+    ):
+        marco = ttk.LabelFrame(frame_detalle, text=texto)
+        marco.pack(side="left", fill="x", expand=True, padx=(0, 6))
+        combo = ttk.Combobox(
+            marco, textvariable=variable, values=valores, state="readonly"
+        )
+        combo.pack(fill="x", padx=6, pady=4)
+        combos.append(combo)
+    combo_categoria, combo_nacionalidad, combo_subtipo = combos
 
     def actualizar_campos(*_):
-        if tipo_var.get() == "pelicula":
-            combo_categoria.config(state="readonly")
-            combo_nacionalidad.config(state="disabled")
-            combo_subtipo.config(state="disabled")
-        elif tipo_var.get() == "novela":
-            combo_categoria.config(state="disabled")
-            combo_nacionalidad.config(state="readonly")
-            combo_subtipo.config(state="disabled")
-        elif tipo_var.get() == "musica":
-            combo_categoria.config(state="disabled")
-            combo_nacionalidad.config(state="disabled")
-            combo_subtipo.config(state="readonly")
-        else:
-            combo_categoria.config(state="disabled")
-            combo_nacionalidad.config(state="disabled")
-            combo_subtipo.config(state="disabled")
+        activo = {"pelicula": 0, "novela": 1, "musica": 2}.get(tipo_var.get())
+        for i, combo in enumerate(combos):
+            combo.config(state="readonly" if i == activo else "disabled")
 
     tipo_var.trace_add("write", lambda *a: actualizar_campos())
     actualizar_campos()
 
-    def cargar_actual():
-        i = idx["i"]
-        nombre_base = pendientes[i]
-        label_titulo.config(text=f"Clasificar: {nombre_base}")
-        label_prog.config(text=f"{i+1}/{total}")
-        tipo_var.set("serie")
-        categoria_var.set("")
-        nacionalidad_var.set("")
-        subtipo_var.set("audio")
-        actualizar_campos()
-
-    def guardar_y_siguiente():
-        i = idx["i"]
-        nombre_base = pendientes[i]
+    def clasif_del_panel() -> tuple:
         t = tipo_var.get()
         if t == "pelicula":
-            cat = categoria_var.get() or "Otros"
-            nac = ""
-        elif t == "novela":
-            cat = ""
-            nac = nacionalidad_var.get() or "Otra"
-        elif t == "musica":
-            cat = subtipo_var.get() or "audio"
-            nac = ""
-        else:
-            cat = ""
-            nac = ""
-        resultados[nombre_base] = (t, cat, nac)
-        avanzar()
-
-    def avanzar():
-        idx["i"] += 1
-        if idx["i"] >= total:
-            win.destroy()
-        else:
-            cargar_actual()
+            return t, categoria_var.get() or "Otros", ""
+        if t == "novela":
+            return t, "", nacionalidad_var.get() or "Otra"
+        if t == "musica":
+            return t, subtipo_var.get() or "audio", ""
+        return t, "", ""
+
+    def guardar():
+        # Lo asignado desde la última vez, en una sola transacción
+        tarea, guardado["tarea"] = guardado["tarea"], None
+        if tarea:
+            win.after_cancel(tarea)
+        if sin_guardar and al_guardar is not None:
+            lote = dict(sin_guardar)
+            sin_guardar.clear()
+            al_guardar(lote)
+            guardado["n"] += len(lote)
+            dibujar()
+
+    def asignar(elegir):
+        # elegir(nombre_base) -> clasificación, o None para dejarlo como está
+        cambios = {}
+        for nb in seleccion:
+            clasif = elegir(nb)
+            if clasif is not None:
+                cambios[nb] = clasif
+        resultados.update(cambios)
+        if al_guardar is not None:
+            sin_guardar.update(cambios)
+            if len(sin_guardar) >= GUARDAR_CADA:
+                guardar()
+            elif sin_guardar and guardado["tarea"] is None:
+                guardado["tarea"] = win.after(ESPERA_GUARDAR_MS, guardar)
+        i = estado["ancla"]
+        recalcular_visibles()
+        if cambios and len(seleccion) <= 1 and visibles and i is not None:
+            # Como "guardar y siguiente": queda elegido el que sigue
+            ir_a(i)
+
+    def asignar_panel(_evento=None):
+        clasif = clasif_del_panel()
+        asignar(lambda nb: clasif)
+
+    def aceptar_sugerencias():
+        asignar(lambda nb: sugerencias[nb].clasif if nb in sugerencias else None)
+
+    def terminar():
+        guardar()
+        win.destroy()
 
     btns = ttk.Frame(win)
-    btns.pack(pady=10)
-    ttk.Button(btns, text="Guardar y siguiente", command=guardar_y_siguiente).pack(
+    btns.pack(pady=8)
+    ttk.Button(btns, text="Asignar a elegidos", command=asignar_panel).pack(
         side="left", padx=6
     )
-    ttk.Button(btns, text="Omitir", command=avanzar).pack(side="left", padx=6)
-    ttk.Button(btns, text="Omitir todos", command=win.destroy).pack(side="left", padx=6)
+    ttk.Button(btns, text="Aceptar sugerencias", command=aceptar_sugerencias).pack(
+        side="left", padx=6
+    )
+    ttk.Button(btns, text="Terminar", command=terminar).pack(side="left", padx=6)
+    tabla.bind("<Return>", asignar_panel)
+    entrada_filtro.bind("<Return>", asignar_panel)
+    win.protocol("WM_DELETE_WINDOW", terminar)
 
-    cargar_actual()
+    entrada_filtro.focus_set()
+    dibujar()
 
     if parent is not None:
         win.wait_window(win)
@@ -371,116 +2381,1078 @@ def clasificar_por_lote(
 
 
 # -------------------------------
-# Modo: Solo ordenar (v1.0 mejorado)
+# Plan de movimientos
 # -------------------------------
-def organizar_simple(ruta: Path, extensiones: list) -> str:
-    archivos_por_serie = {}
-    for item in ruta.iterdir():
-        if item.is_file() and item.suffix.lower() in extensiones:
-            nombre, cap, temp = obtener_nombre_cap(item.name)
-            clave = (nombre, temp)
-            archivos_por_serie.setdefault(clave, []).append(item)
-
-    logs = []
-    for (nombre_serie, temporada), archivos in archivos_por_serie.items():
-        nombre_carpeta = (
-            nombre_serie if not temporada else f"{nombre_serie} - {temporada}"
+class PasoPlan(NamedTuple):
+    origen: str
+    carpeta_destino: str
+    nombre_final: str
+    # simple | regla | exacta | palabra_clave | sugerencia | sondeo | manual
+    # | duplicado
+    fuente: str
+    enlazar_a: str = ""  # ver marcar_duplicados
+
+
+class Plan(NamedTuple):
+    modo: str
+    raiz: str
+    pasos: tuple  # de PasoPlan
+    omitidos: tuple  # de (origen, motivo)
+
+
+def _carpeta_relativa(carpeta: str, raiz: str) -> str:
+    try:
+        return str(Path(carpeta).relative_to(raiz))
+    except ValueError:
+        return carpeta
+
+
+def guardar_plan(plan: Plan, path: Path):
+    datos = {
+        "version": 1,
+        "modo": plan.modo,
+        "raiz": plan.raiz,
+        "pasos": [p._asdict() for p in plan.pasos],
+        "omitidos": [{"origen": o, "motivo": m} for o, m in plan.omitidos],
+    }
+    with Path(path).open("w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=1)
+
+
+def cargar_plan(path: Path) -> Plan:
+    with Path(path).open("r", encoding="utf-8") as f:
+        datos = json.load(f)
+    return Plan(
+        modo=datos["modo"],
+        raiz=datos["raiz"],
+        pasos=tuple(PasoPlan(**p) for p in datos["pasos"]),
+        omitidos=tuple((o["origen"], o["motivo"]) for o in datos["omitidos"]),
+    )
+
+
+def describir_plan(plan: Plan) -> str:
+    lineas = [
+        f"Mover: {Path(p.origen).name} -> "
+        f"{_carpeta_relativa(p.carpeta_destino, plan.raiz)} ({p.fuente})"
+        for p in plan.pasos
+    ]
+    lineas += [f"Omitido ({motivo}): {Path(o).name}" for o, motivo in plan.omitidos]
+    return "\n".join(lineas) if lineas else "Nada que hacer."
+
+
+class Evento(NamedTuple):
+    """
+    Lo que pasó con un archivo o carpeta al aplicar un plan. `ruta` es el
+    destino final (movido) o el origen (omitido, error).
+    """
+
+    tipo: str  # movido | omitido | error | carpeta | cancelado
+    nombre: str = ""
+    carpeta: str = ""  # relativa a la raíz del plan
+    detalle: str = ""  # motivo, error o total de archivos
+    ruta: str = ""
+
+    def texto(self) -> str:
+        if self.tipo == "movido":
+            return f"Movido: {self.nombre} -> {self.carpeta}"
+        if self.tipo == "omitido":
+            return f"Omitido ({self.detalle}): {self.nombre}"
+        if self.tipo == "error":
+            return f"Error moviendo {self.nombre}: {self.detalle}"
+        if self.tipo == "carpeta":
+            return (
+                f"Carpeta creada: {self.carpeta} | Total archivos: {self.detalle}\n"
+                + "=" * 50
+            )
+        return f"Cancelado: {self.detalle} archivos sin mover"
+
+
+TIPOS_EVENTO = ("movido", "omitido", "error", "carpeta", "cancelado")
+
+
+def iterar_plan(
+    plan: Plan,
+    hilos=4,
+    copias_por_dispositivo=1,
+    al_terminar=None,
+    cancelar=None,
+    progreso=None,
+    al_reservar=None,
+):
+    """
+    Ejecuta el plan y genera un Evento por archivo a medida que terminan,
+    siempre en el orden del plan.
+
+    - al_terminar(paso, destino_final, error): se llama al terminar cada archivo.
+    - al_reservar(paso, final): el nombre reservado, antes de mover el archivo.
+    - cancelar: threading.Event para detener la ejecución entre archivos.
+    - progreso(hechos, total): avance en archivos.
+    """
+    for origen, motivo in plan.omitidos:
+        yield Evento("omitido", Path(origen).name, detalle=motivo, ruta=origen)
+
+    movimientos = [
+        Movimiento(
+            Path(p.origen),
+            Path(p.carpeta_destino) / p.nombre_final,
+            Path(p.enlazar_a) if p.enlazar_a else None,
+        )
+        for p in plan.pasos
+    ]
+    terminados = {}  # indice -> (destino_final, error), solo los adelantados
+    siguiente = 0  # primer paso cuyo evento aún no se generó
+    grupo, total, cancelados = None, 0, 0
+
+    # En modo simple se cierra cada carpeta con un resumen (los pasos de una
+    # misma carpeta van seguidos en el plan)
+    def cerrar_grupo():
+        if grupo is not None:
+            yield Evento(
+                "carpeta",
+                carpeta=_carpeta_relativa(grupo, plan.raiz),
+                detalle=str(total),
+                ruta=grupo,
+            )
+
+    reservado = None
+    if al_reservar is not None:
+
+        def reservado(i, final):
+            al_reservar(plan.pasos[i], final)
+
+    for i, destino_final, error in ejecutar_movimientos(
+        movimientos, hilos, copias_por_dispositivo, cancelar, reservado
+    ):
+        terminados[i] = (destino_final, error)
+        if al_terminar is not None:
+            al_terminar(plan.pasos[i], destino_final, error)
+        if progreso is not None:
+            progreso(siguiente + len(terminados), len(movimientos))
+
+        while siguiente in terminados:
+            paso = plan.pasos[siguiente]
+            destino_final, error = terminados.pop(siguiente)
+            siguiente += 1
+            if plan.modo == "simple" and paso.carpeta_destino != grupo:
+                yield from cerrar_grupo()
+                grupo, total = paso.carpeta_destino, 0
+            total += 1
+            nombre = Path(paso.origen).name
+            if error is None:
+                carpeta = _carpeta_relativa(paso.carpeta_destino, plan.raiz)
+                yield Evento("movido", nombre, carpeta, ruta=str(destino_final))
+            elif isinstance(error, OperacionCancelada):
+                cancelados += 1
+            else:
+                yield Evento("error", nombre, detalle=str(error), ruta=paso.origen)
+    yield from cerrar_grupo()
+    if cancelados:
+        yield Evento("cancelado", detalle=str(cancelados))
+
+
+def aplicar_plan(
+    plan: Plan,
+    hilos=4,
+    copias_por_dispositivo=1,
+    al_terminar=None,
+    cancelar=None,
+    progreso=None,
+    al_evento=None,
+    al_reservar=None,
+) -> dict:
+    """
+    Ejecuta el plan pasando cada Evento a `al_evento(evento)` en cuanto
+    ocurre (ver iterar_plan para el resto). No acumula los eventos: retorna
+    solo cuántos hubo de cada tipo.
+    """
+    conteo = dict.fromkeys(TIPOS_EVENTO, 0)
+    with medidor.etapa("movimientos"):
+        for evento in iterar_plan(
+            plan,
+            hilos,
+            copias_por_dispositivo,
+            al_terminar,
+            cancelar,
+            progreso,
+            al_reservar,
+        ):
+            conteo[evento.tipo] += 1
+            if al_evento is not None:
+                al_evento(evento)
+    return conteo
+
+
+ACCIONES_DUPLICADOS = ("saltar", "enlazar", "cuarentena")
+
+
+def _huella_de(ruta: str):
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    return ArchivoHuella(ruta, st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+
+
+def marcar_duplicados(
+    plan: Plan,
+    accion: str,
+    repo: ClasificacionRepo = None,
+    hilos=4,
+    solo_lectura=False,
+) -> Plan:
+    """
+    Busca entre los archivos del plan y los que ya están en sus carpetas de
+    destino los que tienen el mismo contenido. De cada grupo se conserva el
+    que ya está en destino o, si no hay, el primero del plan; con los demás:
+
+    - saltar: no se mueven (quedan como omitidos).
+    - enlazar: en destino se crea un enlace duro al conservado.
+    - cuarentena: se mueven a la carpeta _Duplicados de la raíz.
+
+    Con `repo`, las huellas se guardan en la BD por (volumen, inodo, tamaño,
+    mtime) y no se vuelven a leer en la próxima ejecución; con `solo_lectura`
+    (--dry-run) solo se usan las ya guardadas.
+    """
+    if accion not in ACCIONES_DUPLICADOS:
+        raise ValueError(f"Acción para duplicados desconocida: {accion}")
+    if not plan.pasos:
+        return plan
+
+    with medidor.etapa("duplicados"):
+        archivos = []
+        indices = {}  # ruta -> índice en archivos
+        for paso in plan.pasos:
+            huella = _huella_de(paso.origen)
+            if huella is not None:
+                indices[paso.origen] = len(archivos)
+                archivos.append(huella)
+        requeridos = set(range(len(archivos)))
+        for carpeta in {p.carpeta_destino for p in plan.pasos}:
+            try:
+                with os.scandir(carpeta) as it:
+                    for entry in it:
+                        if entry.path in indices or not entry.is_file(
+                            follow_symlinks=False
+                        ):
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                        indices[entry.path] = len(archivos)
+                        archivos.append(
+                            ArchivoHuella(
+                                entry.path,
+                                st.st_size,
+                                st.st_mtime_ns,
+                                st.st_ino,
+                                st.st_dev,
+                            )
+                        )
+            except OSError:
+                continue  # la carpeta aún no existe
+
+        grupos, nuevas = agrupar_duplicados(
+            archivos,
+            requeridos,
+            repo.cargar_huellas if repo is not None else None,
+            hilos,
+        )
+        if repo is not None and nuevas and not solo_lectura:
+            repo.guardar_huellas(nuevas)
+
+        # origen del duplicado -> ruta del archivo que se conserva
+        conservar = {}
+        for grupo in grupos:
+            en_destino = [i for i in grupo if i not in requeridos]
+            original = archivos[min(en_destino or grupo)].ruta
+            for i in grupo:
+                if i in requeridos and archivos[i].ruta != original:
+                    conservar[archivos[i].ruta] = original
+        medidor.contar("duplicados", len(conservar))
+    if not conservar:
+        return plan
+
+    pasos, apartados, omitidos = [], [], list(plan.omitidos)
+    cuarentena = os.path.join(plan.raiz, CARPETA_DUPLICADOS)
+    for paso in plan.pasos:
+        original = conservar.get(paso.origen)
+        if original is None:
+            pasos.append(paso)
+        elif accion == "saltar":
+            omitidos.append((paso.origen, f"duplicado de {Path(original).name}"))
+        elif accion == "enlazar":
+            pasos.append(paso._replace(fuente="duplicado", enlazar_a=original))
+        else:
+            # Al final, para que en modo simple las carpetas sigan agrupadas
+            apartados.append(
+                paso._replace(carpeta_destino=cuarentena, fuente="duplicado")
+            )
+    return plan._replace(pasos=tuple(pasos + apartados), omitidos=tuple(omitidos))
+
+
+# -------------------------------
+# Diario de movimientos
+# -------------------------------
+class Diario:
+    """
+    Diario de movimientos en la BD. Cada paso del plan se anota como
+    pendiente antes de mover nada; el nombre que reserva cada archivo (que
+    puede llevar " (n)") se anota al reservarlo, antes de moverlo, y el
+    final se marca al terminar, con las marcas confirmadas por lotes. Si el
+    proceso muere a mitad, reanudar() arma el plan con lo que faltaba (sin
+    volver a escanear ni clasificar) y deshacer() el plan inverso de una
+    ejecución terminada.
+
+    Usa su propia conexión: al_terminar() se llama desde el hilo que aplica
+    el plan, que puede no ser el que abrió la BD de clasificaciones.
+    """
+
+    LOTE = 500  # marcas por transacción
+    INTERVALO = 1.0  # segundos máximos sin confirmar
+
+    def __init__(self, db_path: Path):
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        migrar(self.conn)
+        self.ejecucion = None
+        self._deshaciendo = False
+        self._ordenes = {}  # origen del paso -> orden en el diario
+        self._lock = threading.Lock()
+        self._marcas = []
+        self._ultima = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+
+    def iniciar(self, plan: Plan) -> str:
+        """Anota todos los pasos como pendientes y retorna el id de ejecución."""
+        # La fecha ordena y se lee; el uuid evita choques entre procesos
+        self.ejecucion = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex}"
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO ejecuciones VALUES (?, ?, ?, ?, 'en_curso')",
+                (self.ejecucion, plan.modo, plan.raiz, time.time()),
+            )
+            self.conn.executemany(
+                """INSERT INTO diario VALUES
+                       (?, ?, ?, ?, ?, ?, ?, '', 'pendiente', '', -1)""",
+                (
+                    (self.ejecucion, i, *paso)
+                    for i, paso in enumerate(plan.pasos)
+                ),
+            )
+        self._ordenes = {paso.origen: i for i, paso in enumerate(plan.pasos)}
+        return self.ejecucion
+
+    def _ejecucion(self, ejecucion: str, estados) -> tuple:
+        fila = self.conn.execute(
+            f"""SELECT id, modo, raiz FROM ejecuciones
+                 WHERE estado IN ({", ".join("?" * len(estados))})
+                   AND (? = '' OR id = ?)
+                 ORDER BY inicio DESC LIMIT 1""",
+            (*estados, ejecucion or "", ejecucion or ""),
+        ).fetchone()
+        if fila is None:
+            raise ValueError(f"No hay una ejecución {ejecucion or 'sin terminar'}")
+        self.ejecucion = fila[0]
+        return fila
+
+    def reanudar(self, ejecucion: str = "") -> Plan:
+        """
+        Plan con los pasos pendientes (o con error) de `ejecucion`, por
+        defecto la última sin terminar. Un paso sin origen se da por hecho
+        solo si el nombre que reservó está en el destino con el tamaño del
+        origen; si el origen sigue ahí, la reserva (vacía o copia a medias)
+        se borra y el paso se repite.
+        """
+        _, modo, raiz = self._ejecucion(ejecucion, ("en_curso",))
+        # Un nombre que se liberó tras un error pudo reservarlo otro paso
+        hechos = {
+            destino
+            for (destino,) in self.conn.execute(
+                """SELECT destino_final FROM diario
+                     WHERE ejecucion = ? AND estado = 'hecho'""",
+                (self.ejecucion,),
+            )
+        }
+        pasos = []
+        for orden, *datos, reservado, tamano in self.conn.execute(
+            """SELECT orden, origen, carpeta_destino, nombre_final, fuente,
+                      enlazar_a, destino_final, tamano
+                 FROM diario WHERE ejecucion = ? AND estado != 'hecho'
+                 ORDER BY orden""",
+            (self.ejecucion,),
+        ).fetchall():
+            paso = PasoPlan(*datos)
+            if os.path.exists(paso.origen):
+                if reservado and reservado not in hechos:
+                    _liberar_reserva(Path(reservado), tamano)
+                self._ordenes[paso.origen] = orden
+                pasos.append(paso)
+            elif reservado and tamano >= 0 and _tamano(reservado) == tamano:
+                # Se movió, pero el proceso murió antes de anotarlo
+                self._marcas.append(("hecho", reservado, "", self.ejecucion, orden))
+            else:
+                self._marcas.append(
+                    ("error", "", "No se encontró el origen", self.ejecucion, orden)
+                )
+        self._confirmar()
+        return Plan(modo, raiz, tuple(pasos), ())
+
+    def deshacer(self, ejecucion: str) -> Plan:
+        """
+        Plan que devuelve cada archivo movido en `ejecucion` a su origen. Se
+        omiten los que ya no están en su destino o cambiaron de tamaño.
+        """
+        _, _, raiz = self._ejecucion(ejecucion, ("completa", "en_curso"))
+        self._deshaciendo = True
+        pasos, omitidos = [], []
+        for orden, origen, destino_final, tamano in self.conn.execute(
+            """SELECT orden, origen, destino_final, tamano FROM diario
+                 WHERE ejecucion = ? AND estado = 'hecho'
+                 ORDER BY orden DESC""",
+            (self.ejecucion,),
+        ).fetchall():
+            actual = _tamano(destino_final)
+            if actual is None or (tamano >= 0 and actual != tamano):
+                omitidos.append((destino_final, "cambió desde que se movió"))
+                continue
+            self._ordenes[destino_final] = orden
+            pasos.append(
+                PasoPlan(
+                    destino_final,
+                    os.path.dirname(origen),
+                    os.path.basename(origen),
+                    "deshacer",
+                )
+            )
+        return Plan("deshacer", raiz, tuple(pasos), tuple(omitidos))
+
+    def al_reservar(self, paso: PasoPlan, final: Path):
+        """
+        Callback de aplicar_plan: anota el nombre reservado y el tamaño del
+        origen antes de moverlo. Se confirma en el acto (no por lotes): es lo
+        que reanudar() necesita para encontrar el archivo si el proceso muere.
+        """
+        orden = self._ordenes.get(paso.origen)
+        if orden is None or self._deshaciendo:
+            return
+        tamano = _tamano(paso.origen)
+        with self._lock, self.conn:
+            self.conn.execute(
+                """UPDATE diario SET estado = 'moviendo', destino_final = ?,
+                          tamano = ?
+                     WHERE ejecucion = ? AND orden = ?""",
+                (str(final), -1 if tamano is None else tamano, self.ejecucion, orden),
+            )
+
+    def al_terminar(self, paso: PasoPlan, destino_final, error):
+        # Callback de aplicar_plan; los cancelados siguen pendientes
+        orden = self._ordenes.get(paso.origen)
+        if orden is None or isinstance(error, OperacionCancelada):
+            return
+        if self._deshaciendo:
+            # Si falla, el archivo sigue en el destino: queda como hecho
+            estado = "deshecho" if error is None else "hecho"
+            marca = (estado, paso.origen, str(error or ""), self.ejecucion, orden)
+        elif error is None:
+            marca = ("hecho", str(destino_final), "", self.ejecucion, orden)
+        else:
+            marca = ("error", "", str(error), self.ejecucion, orden)
+        with self._lock:
+            self._marcas.append(marca)
+            if (
+                len(self._marcas) >= self.LOTE
+                or time.monotonic() - self._ultima >= self.INTERVALO
+            ):
+                self._confirmar()
+
+    def _confirmar(self):
+        self._ultima = time.monotonic()
+        if not self._marcas:
+            return
+        with self.conn:
+            self.conn.executemany(
+                """UPDATE diario SET estado = ?, destino_final = ?, error = ?
+                     WHERE ejecucion = ? AND orden = ?""",
+                self._marcas,
+            )
+        self._marcas = []
+
+    def cerrar(self):
+        if self.conn is None:
+            return
+        try:
+            with self._lock:
+                self._confirmar()
+            if self.ejecucion is not None:
+                self._actualizar_estado()
+        finally:
+            self.conn.close()
+            self.conn = None
+
+    def _actualizar_estado(self):
+        quedan = dict(
+            self.conn.execute(
+                """SELECT estado, COUNT(*) FROM diario WHERE ejecucion = ?
+                     GROUP BY estado""",
+                (self.ejecucion,),
+            ).fetchall()
         )
-        carpeta_destino = ruta / nombre_carpeta
-        carpeta_destino.mkdir(parents=True, exist_ok=True)
+        if self._deshaciendo:
+            estado = "en_curso" if quedan.get("hecho") else "deshecha"
+        elif quedan.get("pendiente") or quedan.get("moviendo") or quedan.get("error"):
+            estado = "en_curso"  # se puede reanudar
+        else:
+            estado = "completa"
+        with self.conn:
+            self.conn.execute(
+                "UPDATE ejecuciones SET estado = ? WHERE id = ?",
+                (estado, self.ejecucion),
+            )
+
 
-        for archivo in archivos:
-            destino = carpeta_destino / archivo.name
+def _tamano(ruta: str):
+    try:
+        return os.stat(ruta).st_size
+    except OSError:
+        return None
+
+
+def _liberar_reserva(final: Path, tamano: int):
+    # Lo que dejó un movimiento interrumpido con el origen todavía en su
+    # lugar: la copia temporal y la reserva, vacía o con la copia del origen.
+    # Si tiene otro tamaño no es nuestra y no se toca
+    for sobrante in (
+        final.with_name(f".{final.name}.parcial"),
+        final.with_name(f".{final.name}.enlace"),
+    ):
+        try:
+            sobrante.unlink()
+        except OSError:
+            pass
+    if _tamano(final) in (0, tamano):
+        try:
+            final.unlink()
+        except OSError:
+            pass
+
+
+def _encadenar(*funciones):
+    # Un solo callback que llama a todos los que no son None
+    funciones = [f for f in funciones if f is not None]
+    if not funciones:
+        return None
+
+    def llamar(*args):
+        for f in funciones:
+            f(*args)
+
+    return llamar
+
+
+def _borrar_carpetas_vacias(carpetas, raiz: str):
+    # Tras deshacer: quitar las carpetas que quedaron vacías, sin salir de raiz
+    raiz = os.path.normpath(raiz)
+    for carpeta in sorted(set(carpetas), key=len, reverse=True):
+        carpeta = os.path.normpath(carpeta)
+        while carpeta != raiz and carpeta.startswith(raiz + os.sep):
             try:
-                mover_archivo(archivo, destino)
-                logs.append(f"Movido: {archivo.name} -> {carpeta_destino.name}")
-            except Exception as e:
-                logs.append(f"Error moviendo {archivo.name}: {e}")
+                os.rmdir(carpeta)
+            except OSError:
+                break
+            carpeta = os.path.dirname(carpeta)
 
-        logs.append(
-            f"Carpeta creada: {nombre_carpeta} | Total archivos: {len(archivos)}"
+
+# -------------------------------
+# Modo: Solo ordenar (v1.0 mejorado)
+# -------------------------------
+def planificar_simple(
+    ruta: Path,
+    extensiones: list,
+    profundidad=0,
+    incluir=(),
+    excluir=(),
+    manifiesto: Manifiesto = None,
+    similares=False,
+) -> Plan:
+    # Solo lee la carpeta: no crea carpetas ni mueve nada
+    with medidor.etapa("analisis"):
+        entradas = escanear(
+            ruta,
+            extensiones,
+            profundidad,
+            incluir,
+            excluir,
+            omitir_organizadas=False,
+            con_stat=manifiesto is not None,
         )
-        logs.append("=" * 50)
+        return agrupar_simple(
+            ruta,
+            medidor.iterar("escaneo", entradas, "archivos_escaneados"),
+            manifiesto,
+            similares,
+        )
+
+
+_CARPETA_TEMPORADA = re.compile(r"(.+) - (Season \d+)")
+
 
-    return "\n".join(logs) if logs else "No se encontraron archivos para ordenar."
+def _series_existentes(ruta: Path) -> set:
+    # Nombres de serie de las carpetas que ya hay en la raíz
+    nombres = set()
+    try:
+        with os.scandir(ruta) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    m = _CARPETA_TEMPORADA.fullmatch(entry.name)
+                    nombres.add(m.group(1) if m else entry.name)
+    except OSError:
+        pass
+    return nombres
+
+
+def agrupar_simple(
+    ruta: Path, entradas, manifiesto: Manifiesto = None, similares=False
+) -> Plan:
+    """
+    Plan del modo simple para las EntradaArchivo dadas (ya escaneadas): una
+    carpeta por serie y temporada. Con `similares`, los nombres se limpian de
+    etiquetas de release y los que son la misma serie con otra escritura van
+    a una sola carpeta (la que ya existe, si hay).
+    """
+    archivos = []
+    for entrada in entradas:
+        previo = manifiesto.sin_cambios(entrada) if manifiesto else None
+        if previo:
+            if previo.destino:
+                continue  # ya organizado y sin cambios
+            nombre, cap, temp = previo.nombre, previo.capitulo, previo.temporada
+        else:
+            nombre, cap, temp = obtener_nombre_cap(entrada.nombre)
+        archivos.append((entrada, nombre, cap, temp))
+
+    if similares and archivos:
+        with medidor.etapa("agrupar_similares"):
+            limpios = [limpiar(nb, e.nombre, temp) for e, nb, _, temp in archivos]
+            canonicos = agrupar_nombres(limpios, _series_existentes(ruta))
+        series = [canonicos[limpio] for limpio in limpios]
+    else:
+        series = [nombre for _, nombre, _, _ in archivos]
+
+    archivos_por_serie = {}
+    for serie, (entrada, nombre, cap, temp) in zip(series, archivos):
+        archivos_por_serie.setdefault((serie, temp), []).append((entrada, nombre, cap))
+
+    pasos = []
+    for (nombre_serie, temporada), entradas in archivos_por_serie.items():
+        nombre_carpeta = (
+            nombre_serie if not temporada else f"{nombre_serie} - {temporada}"
+        )
+        carpeta_destino = str(ruta / nombre_carpeta)
+        for entrada, nombre, cap in entradas:
+            if manifiesto:
+                # Se guarda el nombre sin agrupar: se vuelve a agrupar cada vez
+                ubicado = entrada.ruta if entrada.carpeta == carpeta_destino else ""
+                manifiesto.anotar(entrada, nombre, cap, temporada, ubicado)
+            if entrada.carpeta == carpeta_destino:
+                continue  # ya está en su carpeta
+            pasos.append(
+                PasoPlan(entrada.ruta, carpeta_destino, entrada.nombre, "simple")
+            )
+    return Plan("simple", str(ruta), tuple(pasos), ())
+
+
+def organizar_simple(
+    ruta: Path,
+    extensiones: list,
+    profundidad=0,
+    incluir=(),
+    excluir=(),
+    hilos=4,
+    copias_por_dispositivo=1,
+    manifiesto: Manifiesto = None,
+    al_evento=None,
+    progreso=None,
+    cancelar=None,
+    similares=False,
+) -> dict:
+    plan = planificar_simple(
+        ruta, extensiones, profundidad, incluir, excluir, manifiesto, similares
+    )
+    return aplicar_plan(
+        plan,
+        hilos,
+        copias_por_dispositivo,
+        manifiesto.al_terminar if manifiesto else None,
+        cancelar,
+        progreso,
+        al_evento,
+    )
 
 
 # -------------------------------
 # Modo: Clasificar y ordenar
 # -------------------------------
-def organizar_clasificar(ruta: Path, db_path: Path, cfg: dict, parent=None) -> str:
+def carpeta_por_tipo(ruta: Path, nb: str, temp: str, clasif) -> "Path | None":
+    tipo, categoria, nacionalidad = clasif
+    if tipo == "serie":
+        destino_dir = ruta / "Series" / nb
+        if temp:
+            destino_dir = destino_dir / temp
+    elif tipo == "pelicula":
+        destino_dir = ruta / "Películas" / (categoria or "Otros") / nb
+    elif tipo == "novela":
+        destino_dir = ruta / "Novelas" / (nacionalidad or "Otra") / nb
+    elif tipo == "musica":
+        destino_dir = ruta / "Audio" / nb
+    elif tipo == "show":
+        destino_dir = ruta / "Shows" / nb
+    else:
+        return None
+    return destino_dir
+
+
+class AnalisisCarpeta(NamedTuple):
+    ruta: Path
+    archivos: list  # de (entrada, nombre_base, cap, temp, regla o None)
+    nombres_base: set
+    nombres_nuevos: set  # los que vienen de archivos nuevos o modificados
+
+    def senales(self) -> dict:
+        # nombre_base -> (algún archivo con capítulo, con temporada)
+        senales = {}
+        for _, nb, cap, temp, regla in self.archivos:
+            if regla is None:
+                con_cap, con_temp = senales.get(nb, (False, False))
+                senales[nb] = (con_cap or bool(cap), con_temp or bool(temp))
+        return senales
+
+    def por_nombre(self) -> dict:
+        # nombre_base -> (ruta, cap, temp) de sus archivos sin regla
+        por_nombre = {}
+        for entrada, nb, cap, temp, regla in self.archivos:
+            if regla is None:
+                por_nombre.setdefault(nb, []).append((entrada.ruta, cap, temp))
+        return por_nombre
+
+
+def analizar_carpeta(
+    ruta: Path,
+    cfg: dict,
+    profundidad=0,
+    incluir=(),
+    excluir=(),
+    manifiesto: Manifiesto = None,
+) -> AnalisisCarpeta:
+    # Escaneo y parsing, sin BD: se puede correr en paralelo por carpeta
+    with medidor.etapa("analisis"):
+        entradas = escanear(
+            ruta,
+            cfg["extensiones"],
+            profundidad,
+            incluir,
+            excluir,
+            con_stat=manifiesto is not None or cfg["motor_reglas"].usa_tamano,
+        )
+        return analizar_entradas(
+            ruta,
+            cfg,
+            medidor.iterar("escaneo", entradas, "archivos_escaneados"),
+            manifiesto,
+        )
 
-    inicializar_db(db_path)
-    extensiones = set(e.lower() for e in cfg["extensiones"])
-    archivos = [
-        f for f in ruta.iterdir() if f.is_file() and f.suffix.lower() in extensiones
-    ]
 
-    # Identificar nombres base a clasificar
-    mapa_archivos = []  # lista de tuplas (path, nombre_base, cap, temp, ext)
+def analizar_entradas(
+    ruta: Path, cfg: dict, entradas, manifiesto: Manifiesto = None
+) -> AnalisisCarpeta:
+    """Parsing y reglas de las EntradaArchivo dadas (ya escaneadas)."""
+    archivos = []
     nombres_base = set()
-    for f in archivos:
-        nombre_base, cap, temp = obtener_nombre_cap(f.name)
-        # Heurística: MP3 se marcan como música/audio automáticamente
-        mapa_archivos.append((f, nombre_base, cap, temp, f.suffix.lower()))
+    nombres_nuevos = set()
+    motor = cfg["motor_reglas"]
+    for entrada in entradas:
+        previo = manifiesto.sin_cambios(entrada) if manifiesto else None
+        if previo:
+            if previo.destino:
+                continue  # ya organizado y sin cambios
+            nombre_base, cap, temp = previo.nombre, previo.capitulo, previo.temporada
+        else:
+            nombre_base, cap, temp = obtener_nombre_cap(entrada.nombre)
+            if manifiesto:
+                manifiesto.anotar(entrada, nombre_base, cap, temp)
+        regla = motor.buscar(entrada.nombre, entrada.tamano)
+        archivos.append((entrada, nombre_base, cap, temp, regla))
+        if regla is not None:
+            medidor.contar("aciertos_reglas")
+            continue  # resuelto por una regla: no hace falta la BD
         nombres_base.add(nombre_base)
+        if not previo:
+            nombres_nuevos.add(nombre_base)
+    return AnalisisCarpeta(ruta, archivos, nombres_base, nombres_nuevos)
 
-    # Consultar DB y determinar pendientes
-    ya_clasificados = {}
-    pendientes = []
-    for nb in sorted(nombres_base):
-        clasif = obtener_clasificacion(nb, db_path)
-        if clasif:
-            ya_clasificados[nb] = clasif
-        else:
-            pendientes.append(nb)
 
-    # Abrir una sola ventana para clasificar los pendientes
-    nuevos = clasificar_por_lote(pendientes, cfg, db_path, parent=parent)
-    ya_clasificados.update(nuevos)
-    for nb, (t, cat, nac) in nuevos.items():
-        guardar_clasificacion_en_db(nb, t, cat or "", nac or "", db_path)
+# obtener_nombre_cap toma un año suelto ("Película 2019") como capítulo
+_ANIO_CAPITULO = re.compile(r"(?:19|20)\d\d")
 
-    logs = []
-    # Aplicar reglas y mover
-    for f, nb, cap, temp, ext in mapa_archivos:
-        try:
-            if ext == ".mp3":
-                tipo, categoria, nacionalidad = ("musica", "audio", "")
-            else:
-                clasif = ya_clasificados.get(nb)
-                if not clasif:
-                    # Si sigue sin clasificación, no mover
-                    logs.append(f"Omitido (sin clasificación): {f.name}")
-                    continue
-                tipo, categoria, nacionalidad = clasif
-
-            # Construir destino según tipo
-            if tipo == "serie":
-                destino_dir = ruta / "Series" / nb
-                if temp:
-                    destino_dir = destino_dir / temp
-            elif tipo == "pelicula":
-                categoria = categoria or "Otros"
-                destino_dir = ruta / "Películas" / categoria / nb
-            elif tipo == "novela":
-                nacionalidad = nacionalidad or "Otra"
-                destino_dir = ruta / "Novelas" / nacionalidad / nb
-            elif tipo == "musica":
-                destino_dir = ruta / "Audio" / nb
-            elif tipo == "show":
-                destino_dir = ruta / "Shows" / nb
+
+def peliculas_por_duracion(
+    archivos: dict,
+    minutos: float,
+    repo: ClasificacionRepo = None,
+    hilos=4,
+    solo_lectura=False,
+) -> set:
+    """
+    Nombres de `archivos` (nombre_base -> [(ruta, cap, temp)]) que son
+    películas por la duración: ningún archivo con temporada ni capítulo
+    (salvo un año) y todos sus .mkv/.mp4/.mov/.avi de más de `minutos` según
+    la cabecera del contenedor (ver sondeo.py). Si alguno no se puede
+    sondear, no se decide. Con `repo`, los sondeos se guardan por (volumen,
+    inodo, tamaño, mtime); con `solo_lectura`, solo se leen los ya guardados.
+    """
+    candidatos = {
+        nb: [
+            ruta
+            for ruta, _, _ in lista
+            if os.path.splitext(ruta)[1].lower() in EXTENSIONES_SONDEO
+        ]
+        for nb, lista in archivos.items()
+        if all(
+            not temp and (not cap or _ANIO_CAPITULO.fullmatch(cap))
+            for _, cap, temp in lista
+        )
+    }
+    huellas = [
+        huella
+        for rs in candidatos.values()
+        for huella in map(_huella_de, rs)
+        if huella is not None
+    ]
+    info, nuevos = sondear_lote(
+        huellas, repo.cargar_sondeos if repo is not None else None, hilos
+    )
+    if repo is not None and nuevos and not solo_lectura:
+        repo.guardar_sondeos(nuevos)
+    medidor.contar("archivos_sondeados", len(nuevos))
+    limite = minutos * 60
+    return {
+        nb
+        for nb, rs in candidatos.items()
+        if rs and all(r in info and info[r].duracion > limite for r in rs)
+    }
+
+
+def clasificar_pendientes(
+    repo: ClasificacionRepo,
+    cfg: dict,
+    encontrados: dict,
+    nombres_nuevos,
+    frontend: FrontendClasificacion,
+    senales: dict = None,
+    archivos: dict = None,
+    solo_lectura=False,
+):
+    """
+    Pide al modelo una sugerencia para cada nombre nuevo que no está en
+    `encontrados`: las que superan cfg["umbral_sugerencias"] se usan sin
+    preguntar. Con `archivos`, de los que quedan se sondean los videos (ver
+    peliculas_por_duracion) y el resto va, con su sugerencia, a una sola
+    sesión del frontend. Guarda lo clasificado a mano (el modelo aprende de
+    eso), a medida que el frontend lo entrega, y lo agrega a `encontrados`.
+
+    `senales`: nombre_base -> (capítulo, temporada) y `archivos`:
+    nombre_base -> [(ruta, cap, temp)], ver AnalisisCarpeta. Con
+    `solo_lectura` (--dry-run) no se guardan los sondeos nuevos.
+    """
+    pendientes = sorted(nb for nb in set(nombres_nuevos) if nb not in encontrados)
+    if not pendientes:
+        return
+    senales = senales or {}
+    with medidor.etapa("sugerencias"):
+        sugerencias = repo.modelo.predecir_lote(
+            {nb: caracteristicas(nb, *senales.get(nb, ())) for nb in pendientes}
+        )
+    # Lo sugerido no se guarda en la BD: se vuelve a predecir con lo aprendido
+    seguras = {
+        nb: s.clasif
+        for nb, s in sugerencias.items()
+        if s.confianza >= cfg["umbral_sugerencias"]
+    }
+    medidor.contar("aciertos_sugerencias", len(seguras))
+    encontrados.update((nb, (clasif, "sugerencia")) for nb, clasif in seguras.items())
+    pendientes = [nb for nb in pendientes if nb not in seguras]
+    # Las palabras clave aproximadas (prefijo, una letra de diferencia) no
+    # clasifican solas: sugieren para los títulos en los que el modelo no sabe
+    for nb in pendientes:
+        if nb not in sugerencias:
+            sugerencia = repo.indice.sugerir(nb)
+            if sugerencia is not None:
+                sugerencias[nb] = sugerencia
+    if pendientes and archivos and cfg["minutos_pelicula"] > 0:
+        with medidor.etapa("sondeo"):
+            peliculas = peliculas_por_duracion(
+                {nb: archivos.get(nb, ()) for nb in pendientes},
+                cfg["minutos_pelicula"],
+                repo,
+                cfg["hilos"],
+                solo_lectura,
+            )
+        medidor.contar("aciertos_sondeo", len(peliculas))
+        for nb in peliculas:
+            # Si el modelo ya pensaba en una película, se usa su categoría
+            sugerencia = sugerencias.get(nb)
+            if sugerencia and sugerencia.clasif[0] == "pelicula":
+                clasif = sugerencia.clasif
             else:
-                logs.append(f"Omitido (tipo desconocido): {f.name}")
-                continue
+                clasif = ("pelicula", "Otros", "")
+            encontrados[nb] = (clasif, "sondeo")
+        pendientes = [nb for nb in pendientes if nb not in peliculas]
+    if not pendientes:
+        return
+    medidor.contar("titulos_pendientes", len(pendientes))
+    guardados = {}
+
+    def al_guardar(lote: dict):
+        repo.guardar_lote(lote, senales)
+        guardados.update(lote)
+
+    with medidor.etapa("clasificacion_manual"):
+        nuevos = frontend.clasificar(
+            pendientes,
+            cfg,
+            repo.db_path,
+            sugerencias=sugerencias,
+            al_guardar=al_guardar,
+        )
+    # Lo que el frontend no guardó por su cuenta
+    repo.guardar_lote(
+        {nb: c for nb, c in nuevos.items() if guardados.get(nb) != c}, senales
+    )
+    encontrados.update((nb, (clasif, "manual")) for nb, clasif in nuevos.items())
 
-            destino = destino_dir / f.name
-            mover_archivo(f, destino)
-            logs.append(f"Movido: {f.name} -> {destino_dir.relative_to(ruta)}")
-        except Exception as e:
-            logs.append(f"Error moviendo {f.name}: {e}")
 
-    return "\n".join(logs) if logs else "No se movieron archivos."
+# Motivo de los archivos que quedan sin mover porque su título no se clasificó
+SIN_CLASIFICACION = "sin clasificación"
+
+
+def armar_plan_clasificar(
+    analisis: AnalisisCarpeta, encontrados: dict, manifiesto: Manifiesto = None
+) -> Plan:
+    ruta = analisis.ruta
+    pasos = []
+    omitidos = []
+    for entrada, nb, cap, temp, regla in analisis.archivos:
+        # Las reglas de la config (incluida MP3 -> música) van antes que la BD
+        if regla is not None:
+            clasif, fuente = regla.clasif, "regla"
+        elif nb in encontrados:
+            clasif, fuente = encontrados[nb]
+        else:
+            # Si sigue sin clasificación, no mover
+            omitidos.append((entrada.ruta, SIN_CLASIFICACION))
+            continue
+
+        # Construir destino según la plantilla de la regla o el tipo
+        if regla is not None and regla.destino:
+            destino_dir = Path(regla.carpeta(ruta, nb, cap, temp))
+        else:
+            destino_dir = carpeta_por_tipo(ruta, nb, temp, clasif)
+        if destino_dir is None:
+            omitidos.append((entrada.ruta, "tipo desconocido"))
+            continue
+        if entrada.carpeta == str(destino_dir):
+            if manifiesto:
+                manifiesto.anotar(entrada, nb, cap, temp, entrada.ruta)
+            continue  # ya está en su carpeta
+        pasos.append(PasoPlan(entrada.ruta, str(destino_dir), entrada.nombre, fuente))
+
+    return Plan("clasificar", str(ruta), tuple(pasos), tuple(omitidos))
+
+
+def planificar_clasificar(
+    ruta: Path,
+    repo: ClasificacionRepo,
+    cfg: dict,
+    parent=None,
+    interactivo=True,
+    profundidad=0,
+    incluir=(),
+    excluir=(),
+    manifiesto: Manifiesto = None,
+    frontend: FrontendClasificacion = None,
+) -> Plan:
+    """
+    Escanea, consulta la BD y (si interactivo) pide clasificar los pendientes.
+    No toca el sistema de archivos. Con interactivo=False (--dry-run) el
+    modelo y el sondeo deciden igual que al aplicar, pero no se abre la
+    ventana, los pendientes quedan como omitidos y la BD no se escribe.
+
+    `frontend` decide cómo clasificar los pendientes (por defecto, la ventana
+    Tk sobre `parent`).
+
+    Con `manifiesto`, los archivos sin cambios desde la ejecución anterior no
+    se vuelven a analizar: si ya se habían movido se saltan, y si se habían
+    omitido solo se vuelven a buscar en la BD (sin pedir clasificarlos otra vez).
+    """
+    analisis = analizar_carpeta(ruta, cfg, profundidad, incluir, excluir, manifiesto)
+
+    # Consultar DB y determinar pendientes
+    encontrados = repo.buscar_lote(sorted(analisis.nombres_base))
+    # Una sola sesión de clasificación para todos los pendientes; sin
+    # interacción solo se aplican las etapas automáticas
+    clasificar_pendientes(
+        repo,
+        cfg,
+        encontrados,
+        analisis.nombres_nuevos,
+        (frontend or FrontendTk(parent)) if interactivo else FrontendReglas(),
+        analisis.senales(),
+        analisis.por_nombre(),
+        solo_lectura=not interactivo,
+    )
+    return armar_plan_clasificar(analisis, encontrados, manifiesto)
+
+
+def organizar_clasificar(
+    ruta: Path,
+    repo: ClasificacionRepo,
+    cfg: dict,
+    parent=None,
+    profundidad=0,
+    incluir=(),
+    excluir=(),
+    hilos=4,
+    copias_por_dispositivo=1,
+    manifiesto: Manifiesto = None,
+    al_evento=None,
+    progreso=None,
+    cancelar=None,
+    frontend: FrontendClasificacion = None,
+) -> dict:
+    plan = planificar_clasificar(
+        ruta,
+        repo,
+        cfg,
+        parent,
+        True,
+        profundidad,
+        incluir,
+        excluir,
+        manifiesto,
+        frontend,
+    )
+    return aplicar_plan(
+        plan,
+        hilos,
+        copias_por_dispositivo,
+        manifiesto.al_terminar if manifiesto else None,
+        cancelar,
+        progreso,
+        al_evento,
+    )
 
 
 # -------------------------------
@@ -488,36 +3460,441 @@ def organizar_clasificar(ruta: Path, db_path: Path, cfg: dict, parent=None) -> s
 # -------------------------------
 def main():
     parser = argparse.ArgumentParser(description="Organizador de multimedia")
-    parser.add_argument("--modo", choices=["simple", "clasificar"], required=True)
-    parser.add_argument("--dir", dest="directorio", required=True)
+    parser.add_argument("--modo", choices=["simple", "clasificar"])
+    parser.add_argument("--dir", dest="directorio")
     parser.add_argument("--db", dest="db_path", required=False)
     parser.add_argument("--config", dest="config_path", required=False)
+    parser.add_argument(
+        "--profundidad",
+        type=int,
+        default=0,
+        help="Niveles de subcarpetas a recorrer (0 = solo la carpeta, -1 = todos)",
+    )
+    parser.add_argument("--incluir", action="append", default=[], metavar="GLOB")
+    parser.add_argument("--excluir", action="append", default=[], metavar="GLOB")
+    parser.add_argument(
+        "--hilos", type=int, help="Hilos para mover archivos (por defecto: config)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Solo calcular y mostrar el plan, sin mover nada",
+    )
+    parser.add_argument(
+        "--plan-out", metavar="PLAN.json", help="Guardar el plan calculado en JSON"
+    )
+    parser.add_argument(
+        "--apply", metavar="PLAN.json", help="Ejecutar un plan guardado con --plan-out"
+    )
+    parser.add_argument(
+        "--frontend",
+        choices=sorted(FRONTENDS),
+        help="Cómo clasificar títulos nuevos: ventana Tk, terminal, "
+        "anotarlos en un archivo (cola) o solo reglas (por defecto: tk, o cola "
+        "con --vigilar)",
+    )
+    parser.add_argument(
+        "--pendientes",
+        metavar="ARCHIVO",
+        help="Archivo donde el frontend 'cola' anota los títulos pendientes",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Saltar los archivos que no cambiaron desde la ejecución anterior",
+    )
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="",
+        metavar="EJECUCION",
+        help="Terminar una ejecución interrumpida (por defecto, la última)",
+    )
+    parser.add_argument(
+        "--undo",
+        metavar="EJECUCION",
+        help="Devolver a su lugar los archivos movidos en una ejecución",
+    )
+    parser.add_argument(
+        "--diario",
+        action="store_true",
+        help="En modo simple, anotar los movimientos en la BD para poder usar "
+        "--resume y --undo (el modo clasificar siempre los anota)",
+    )
+    parser.add_argument(
+        "--reentrenar",
+        action="store_true",
+        help="Rehacer el modelo de sugerencias con todo lo clasificado en la BD",
+    )
+    parser.add_argument(
+        "--exportar",
+        metavar="ARCHIVO",
+        help="Guardar clasificaciones y palabras clave en CSV (.csv) o JSON Lines",
+    )
+    parser.add_argument(
+        "--importar",
+        metavar="ARCHIVO",
+        help="Agregar a la BD las clasificaciones de un archivo de --exportar "
+        "(o un catálogo con columnas nombre, tipo, categoria, nacionalidad)",
+    )
+    parser.add_argument(
+        "--conflictos",
+        choices=POLITICAS_IMPORTACION,
+        default="conservar",
+        help="Con --importar, si un título ya está en la BD: conservar el de la "
+        "BD, sobrescribirlo o quedarse con el más reciente",
+    )
+    parser.add_argument(
+        "--duplicados",
+        choices=ACCIONES_DUPLICADOS,
+        help="Buscar copias idénticas antes de mover y saltarlas, enlazarlas "
+        "o apartarlas en _Duplicados (por defecto: config)",
+    )
+    parser.add_argument(
+        "--vigilar",
+        action="store_true",
+        help="Quedarse corriendo y organizar los archivos nuevos a medida que "
+        "llegan (Ctrl+C para salir)",
+    )
+    parser.add_argument(
+        "--espera",
+        type=float,
+        default=3.0,
+        metavar="SEG",
+        help="Con --vigilar: segundos sin cambios de tamaño ni mtime antes de "
+        "mover un archivo nuevo (descargas a medias)",
+    )
+    parser.add_argument(
+        "--sondeo",
+        action="store_true",
+        help="Con --vigilar: revisar las carpetas periódicamente en vez de usar "
+        "inotify (p. ej. en carpetas de red)",
+    )
+    parser.add_argument(
+        "--formato",
+        choices=["texto", "jsonl"],
+        default="texto",
+        help="Formato de los eventos que se muestran mientras se mueven archivos",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        metavar="ARCHIVO.json",
+        help="Medir tiempos por etapa y contadores; sin archivo, muestra una "
+        "tabla al terminar",
+    )
+    parser.add_argument(
+        "--cprofile", metavar="ARCHIVO.prof", help="Guardar un perfil de cProfile"
+    )
     args = parser.parse_args()
 
+    if args.profile:
+        medidor.activar()
+    cache_antes = _parser_nombres.info_cache()[0]
+    perfil = None
+    if args.cprofile:
+        import cProfile
+
+        perfil = cProfile.Profile()
+        perfil.enable()
+    try:
+        _ejecutar(parser, args)
+    finally:
+        if perfil is not None:
+            perfil.disable()
+            perfil.dump_stats(args.cprofile)
+        if args.profile:
+            cache = _parser_nombres.info_cache()[0]
+            medidor.contar("cache_parseo_aciertos", cache.hits - cache_antes.hits)
+            medidor.contar("cache_parseo_fallos", cache.misses - cache_antes.misses)
+            if args.profile == "-":
+                print(medidor.resumen(), file=sys.stderr)
+            else:
+                with open(args.profile, "w", encoding="utf-8") as f:
+                    json.dump(medidor.como_dict(), f, ensure_ascii=False, indent=1)
+
+
+def _mostrar_eventos(formato: str):
+    # Cada evento se escribe en cuanto ocurre; no se guarda el log en memoria
+    if formato == "jsonl":
+
+        def mostrar(evento):
+            print(json.dumps(evento._asdict(), ensure_ascii=False), flush=True)
+
+    else:
+
+        def mostrar(evento):
+            print(evento.texto(), flush=True)
+
+    return mostrar
+
+
+def _aplicar_y_mostrar(
+    plan: Plan, hilos, copias, formato: str, al_terminar=None, al_reservar=None
+):
+    conteo = aplicar_plan(
+        plan,
+        hilos,
+        copias,
+        al_terminar,
+        al_evento=_mostrar_eventos(formato),
+        al_reservar=al_reservar,
+    )
+    if formato == "texto" and not any(conteo.values()):
+        if plan.modo == "simple":
+            print("No se encontraron archivos para ordenar.")
+        else:
+            print("No se movieron archivos.")
+
+
+def _aplicar_con_diario(
+    plan: Plan,
+    db_path: Path,
+    hilos,
+    copias,
+    formato: str,
+    al_terminar=None,
+    con_diario=True,
+):
+    if not con_diario:
+        _aplicar_y_mostrar(plan, hilos, copias, formato, al_terminar)
+        return
+    with Diario(db_path) as diario:
+        print(f"Ejecución: {diario.iniciar(plan)}", file=sys.stderr)
+        al_terminar = _encadenar(al_terminar, diario.al_terminar)
+        _aplicar_y_mostrar(
+            plan, hilos, copias, formato, al_terminar, diario.al_reservar
+        )
+
+
+def _crear_frontend(args) -> FrontendClasificacion:
+    nombre = args.frontend or ("cola" if args.vigilar else "tk")
+    if nombre == "cola":
+        return FrontendCola(
+            Path(args.pendientes)
+            if args.pendientes
+            else resource_path("pendientes.txt")
+        )
+    return FRONTENDS[nombre]()
+
+
+def _vigilar(args, ruta: Path, db_path: Path, escaneo: dict, duplicados: str):
+    # Import diferido: vigilancia importa este módulo
+    from vigilancia import vigilar
+
+    def al_lote(ejecucion, conteo):
+        if ejecucion:
+            print(f"Ejecución: {ejecucion}", file=sys.stderr, flush=True)
+
+    def al_error(e):
+        print(f"Error: {e}", file=sys.stderr, flush=True)
+
+    print(f"Vigilando {ruta} (Ctrl+C para salir)", file=sys.stderr, flush=True)
+    vigilar(
+        ruta,
+        args.modo,
+        db_path,
+        Path(args.config_path) if args.config_path else resource_path("config.json"),
+        espera=args.espera,
+        hilos=args.hilos,
+        duplicados=duplicados,
+        frontend=_crear_frontend(args),
+        sondeo=args.sondeo,
+        diario=args.modo != "simple" or args.diario,
+        al_evento=_mostrar_eventos(args.formato),
+        al_lote=al_lote,
+        al_error=al_error,
+        **escaneo,
+    )
+
+
+def _intercambiar(args, db_path: Path):
+    # Primero se importa, así --exportar incluye lo importado
+    def progreso(accion):
+        def mostrar(*conteo):
+            print(f"\r{accion}: {conteo[0]} filas", end="", file=sys.stderr)
+
+        return mostrar
+
+    with ClasificacionRepo(db_path) as repo:
+        if args.importar:
+            conteo = intercambio.importar(
+                repo, args.importar, args.conflictos, progreso("Leídas")
+            )
+            print(
+                f"\rImportadas: {conteo['escritas']} de {conteo['leidas']} filas",
+                file=sys.stderr,
+            )
+        if args.exportar:
+            n = intercambio.exportar(
+                repo, args.exportar, al_progreso=progreso("Exportadas")
+            )
+            print(f"\rExportadas: {n} filas", file=sys.stderr)
+
+
+def _ejecutar(parser: argparse.ArgumentParser, args):
+    cfg = cargar_config(
+        Path(args.config_path) if args.config_path else resource_path("config.json")
+    )
+    hilos = args.hilos or cfg["hilos"]
+    copias = cfg["copias_por_dispositivo"]
+    duplicados = args.duplicados or cfg["duplicados"]
+
+    # Si no se da una ruta, crear la BD junto al ejecutable/script
+    db_path = Path(args.db_path) if args.db_path else resource_path("clasificacion.db")
+
+    if args.apply:
+        try:
+            plan = cargar_plan(Path(args.apply))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Plan inválido: {e}", file=sys.stderr)
+            sys.exit(2)
+        _aplicar_con_diario(
+            plan,
+            db_path,
+            hilos,
+            copias,
+            args.formato,
+            con_diario=plan.modo != "simple" or args.diario,
+        )
+        sys.exit(0)
+
+    if args.reentrenar:
+        with ClasificacionRepo(db_path) as repo:
+            modelo = repo.reentrenar_modelo()
+        print(f"Modelo de sugerencias: {len(modelo)} títulos")
+        if not args.modo:
+            sys.exit(0)
+
+    if args.importar or args.exportar:
+        try:
+            _intercambiar(args, db_path)
+        except (OSError, sqlite3.Error, ValueError) as e:
+            print(f"\nError: {e}", file=sys.stderr)
+            sys.exit(1)
+        if not args.modo:
+            sys.exit(0)
+
+    if args.resume is not None or args.undo:
+        try:
+            with Diario(db_path) as diario:
+                if args.undo:
+                    plan = diario.deshacer(args.undo)
+                else:
+                    plan = diario.reanudar(args.resume)
+                print(f"Ejecución: {diario.ejecucion}", file=sys.stderr)
+                _aplicar_y_mostrar(
+                    plan,
+                    hilos,
+                    copias,
+                    args.formato,
+                    diario.al_terminar,
+                    diario.al_reservar,
+                )
+            if args.undo:
+                _borrar_carpetas_vacias(
+                    (os.path.dirname(p.origen) for p in plan.pasos), plan.raiz
+                )
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+
+    if not args.modo or not args.directorio:
+        parser.error(
+            "--modo y --dir son obligatorios "
+            "(salvo con --apply, --resume, --undo, --reentrenar, --importar "
+            "o --exportar)"
+        )
+
     ruta = Path(args.directorio).resolve()
     if not ruta.exists() or not ruta.is_dir():
         print("Directorio inválido.", file=sys.stderr)
         sys.exit(2)
 
-    cfg = cargar_config(
-        Path(args.config_path) if args.config_path else resource_path("config.json")
+    escaneo = dict(
+        profundidad=None if args.profundidad < 0 else args.profundidad,
+        incluir=args.incluir,
+        excluir=args.excluir,
     )
 
-    if args.modo == "simple":
-        salida = organizar_simple(ruta, [e.lower() for e in cfg["extensiones"]])
-        print(salida)
+    if args.vigilar:
+        if args.dry_run or args.plan_out or args.incremental:
+            parser.error(
+                "--vigilar no se combina con --dry-run, --plan-out ni --incremental"
+            )
+        _vigilar(args, ruta, db_path, escaneo, duplicados)
         sys.exit(0)
 
-    # Clasificar
-    if not args.db_path:
-        # Si no se da una ruta, crear la BD junto al ejecutable/script
-        db_path = resource_path("clasificacion.db")
-    else:
-        db_path = Path(args.db_path)
     try:
-        salida = organizar_clasificar(ruta, db_path, cfg)
-        print(salida)
+        repo = None
+        # Un --dry-run del modo simple no crea la BD solo para leer huellas
+        if (
+            args.modo == "clasificar"
+            or args.incremental
+            or (duplicados and (not args.dry_run or db_path.exists()))
+        ):
+            repo = ClasificacionRepo(db_path)
+        try:
+            manifiesto = None
+            if args.incremental:
+                filtro = FiltroEscaneo(
+                    ruta,
+                    cfg["extensiones"],
+                    escaneo["profundidad"],
+                    escaneo["incluir"],
+                    escaneo["excluir"],
+                )
+                manifiesto = Manifiesto(repo, ruta, filtro)
+            if args.modo == "simple":
+                plan = planificar_simple(
+                    ruta,
+                    [e.lower() for e in cfg["extensiones"]],
+                    manifiesto=manifiesto,
+                    similares=cfg["agrupar_similares"],
+                    **escaneo,
+                )
+            else:
+                plan = planificar_clasificar(
+                    ruta,
+                    repo,
+                    cfg,
+                    interactivo=not args.dry_run,
+                    manifiesto=manifiesto,
+                    frontend=_crear_frontend(args),
+                    **escaneo,
+                )
+
+            if duplicados:
+                plan = marcar_duplicados(
+                    plan, duplicados, repo, hilos, solo_lectura=args.dry_run
+                )
+            if args.plan_out:
+                guardar_plan(plan, Path(args.plan_out))
+            if args.dry_run:
+                print(describir_plan(plan))
+            else:
+                al_terminar = manifiesto.al_terminar if manifiesto else None
+                _aplicar_con_diario(
+                    plan,
+                    db_path,
+                    hilos,
+                    copias,
+                    args.formato,
+                    al_terminar,
+                    args.modo != "simple" or args.diario,
+                )
+                if manifiesto:
+                    manifiesto.guardar()
+        finally:
+            if repo is not None:
+                repo.cerrar()
         sys.exit(0)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
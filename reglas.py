@@ -0,0 +1,263 @@
+import fnmatch
+import os
+import re
+from typing import NamedTuple, Optional
+
+# Reglas que se aplican siempre, después de las del usuario
+REGLAS_INTERNAS = [{"extension": ".mp3", "tipo": "musica", "categoria": "audio"}]
+
+_CAMPOS_PLANTILLA = dict(
+    nombre="", capitulo="", temporada="", tipo="", categoria="", nacionalidad=""
+)
+_MB = 1024 * 1024
+
+
+class Regla(NamedTuple):
+    clasif: tuple  # (tipo, categoria, nacionalidad)
+    destino: str  # plantilla relativa a la raíz; "" = carpeta según el tipo
+    tamano_min: int  # bytes, -1 sin límite
+    tamano_max: int
+
+    def acepta_tamano(self, tamano: int) -> bool:
+        if tamano < 0:
+            return self.tamano_min < 0 and self.tamano_max < 0
+        if self.tamano_min >= 0 and tamano < self.tamano_min:
+            return False
+        return self.tamano_max < 0 or tamano <= self.tamano_max
+
+    def carpeta(self, raiz, nombre: str, capitulo: str, temporada: str) -> str:
+        tipo, categoria, nacionalidad = self.clasif
+        relativa = self.destino.format(
+            nombre=nombre,
+            capitulo=capitulo,
+            temporada=temporada,
+            tipo=tipo,
+            categoria=categoria,
+            nacionalidad=nacionalidad,
+        )
+        # Sin partes vacías (p. ej. "{nombre}/{temporada}" sin temporada)
+        partes = [p for p in re.split(r"[\\/]+", relativa) if p.strip()]
+        return os.path.join(raiz, *partes)
+
+
+def _lista(valor) -> list:
+    if valor is None:
+        return []
+    return [valor] if isinstance(valor, str) else list(valor)
+
+
+_PALABRA = re.compile(r"[^\W_]+")
+_FLAGS_GLOBALES = re.compile(r"\(\?([aiLmsux]+)\)")
+
+
+def _flags_locales(patron: str) -> str:
+    # "(?x)..." solo vale al inicio de la expresión completa: dentro de la
+    # combinada se pasa a un grupo con flags que afectan solo a este patrón
+    flags = ""
+    m = _FLAGS_GLOBALES.match(patron)
+    while m:
+        flags += m.group(1)
+        patron = patron[m.end() :]
+        m = _FLAGS_GLOBALES.match(patron)
+    if not flags:
+        return patron
+    # En modo verbose un comentario al final se comería el paréntesis
+    return f"(?{flags}:{patron}\n)" if "x" in flags else f"(?{flags}:{patron})"
+
+
+def _condiciones_texto(regla: dict) -> str:
+    # Cada condición es una búsqueda hacia adelante desde el inicio del
+    # nombre, así que todas deben cumplirse sin consumir texto
+    condiciones = []
+    for patron in _lista(regla.get("regex")):
+        condiciones.append(f"(?=.*?(?:{_flags_locales(patron)}))")
+    globs = _lista(regla.get("glob"))
+    if globs:
+        condiciones.append(
+            "(?=" + "|".join(f"(?:{fnmatch.translate(g)})" for g in globs) + ")"
+        )
+    # Las palabras sueltas se buscan por token; las frases, con la expresión
+    frases = [p for p in _lista(regla.get("palabras")) if not _es_palabra(p)]
+    if frases:
+        opciones = "|".join(re.escape(p) for p in frases)
+        condiciones.append(f"(?=.*?(?<![^\\W_])(?:{opciones})(?![^\\W_]))")
+    return "".join(condiciones)
+
+
+def _es_palabra(texto: str) -> bool:
+    return _PALABRA.fullmatch(texto) is not None
+
+
+try:
+    from re import _parser as _sre  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre
+
+
+def _literal_obligatorio(patron: str) -> str:
+    """
+    El tramo de texto fijo más largo que toda coincidencia de `patron`
+    contiene (en minúsculas), o "" si no se puede saber.
+    """
+    try:
+        arbol = _sre.parse(patron)
+    except re.error:
+        return ""
+    mejor, actual = "", []
+
+    def cortar():
+        nonlocal mejor
+        if len(actual) > len(mejor):
+            mejor = "".join(actual)
+        actual.clear()
+
+    def recorrer(elementos):
+        for op, valor in elementos:
+            if op is _sre.LITERAL:
+                actual.append(chr(valor).lower())
+            elif op is _sre.SUBPATTERN:
+                recorrer(valor[-1])
+            elif op is getattr(_sre, "ATOMIC_GROUP", None):
+                recorrer(valor)
+            elif op is _sre.AT:
+                continue  # anclas: no consumen texto
+            else:
+                cortar()
+
+    recorrer(arbol)
+    cortar()
+    return mejor
+
+
+class _Condiciones(NamedTuple):
+    texto: Optional[re.Pattern]  # regex, glob y frases
+    palabras: frozenset  # vacío = sin condición
+    extensiones: frozenset
+
+
+class MotorReglas:
+    """
+    Reglas de clasificación de la config, indexadas para probar miles de
+    reglas por archivo sin recorrerlas una por una.
+
+    Cada regla es un dict con una o más condiciones (todas deben cumplirse):
+    "regex", "glob", "palabras", "extension" (valor o lista) y
+    "tamano_min_mb" / "tamano_max_mb"; y el resultado: "tipo", "categoria",
+    "nacionalidad" y opcionalmente "destino", una plantilla relativa a la
+    raíz con {nombre}, {temporada}, {capitulo}, {tipo}, {categoria} y
+    {nacionalidad}. Las condiciones de texto se prueban sobre el nombre del
+    archivo sin distinguir mayúsculas. Gana la primera regla que se cumple.
+
+    Al compilar, cada regla se indexa por una condición barata de buscar:
+    una de sus palabras, su extensión o un trigrama del texto fijo que su
+    regex/glob exige. Por archivo se buscan en esos índices sus palabras, su
+    extensión y sus trigramas, y solo las reglas que salen de ahí (más las
+    que no se pudieron indexar) se comprueban completas, en orden.
+    """
+
+    def __init__(self, reglas):
+        self._reglas = []
+        self._condiciones = []
+        self._por_palabra = {}  # palabra -> índices de reglas
+        self._por_extension = {}  # extensión -> índices de reglas
+        self._por_trigrama = {}  # trigrama -> índices de reglas
+        self._sin_indice = []  # se comprueban siempre
+        for i, regla in enumerate(reglas):
+            try:
+                self._reglas.append(self._compilar(regla))
+                texto = _condiciones_texto(regla)
+                palabras = frozenset(
+                    p.lower()
+                    for p in _lista(regla.get("palabras"))
+                    if _es_palabra(p)
+                )
+                extensiones = frozenset(
+                    (e if e.startswith(".") else f".{e}").lower()
+                    for e in _lista(regla.get("extension"))
+                )
+                patron = re.compile(texto, re.IGNORECASE | re.DOTALL) if texto else None
+            except (re.error, KeyError, ValueError, TypeError, AttributeError) as e:
+                raise ValueError(f"Regla {i + 1} inválida: {e}") from None
+            self._condiciones.append(_Condiciones(patron, palabras, extensiones))
+            self._indexar(i, regla, palabras, extensiones)
+        self.usa_tamano = any(
+            r.tamano_min >= 0 or r.tamano_max >= 0 for r in self._reglas
+        )
+
+    def _indexar(self, i: int, regla: dict, palabras, extensiones):
+        # Basta una condición obligatoria: si no aparece, la regla no se cumple
+        if palabras:
+            for p in palabras:
+                self._por_palabra.setdefault(p, []).append(i)
+            return
+        fijos = [_literal_obligatorio(r) for r in _lista(regla.get("regex"))]
+        globs = _lista(regla.get("glob"))
+        if len(globs) == 1:
+            fijos.append(_literal_obligatorio(fnmatch.translate(globs[0])))
+        frases = _lista(regla.get("palabras"))
+        if len(frases) == 1:
+            fijos.append(frases[0].lower())
+        fijo = max(fijos, key=len, default="")
+        if len(fijo) >= 3:
+            # El trigrama con menos reglas, para repartir los índices
+            trigrama = min(
+                (fijo[k : k + 3] for k in range(len(fijo) - 2)),
+                key=lambda t: len(self._por_trigrama.get(t, ())),
+            )
+            self._por_trigrama.setdefault(trigrama, []).append(i)
+        elif extensiones:
+            for e in extensiones:
+                self._por_extension.setdefault(e, []).append(i)
+        else:
+            self._sin_indice.append(i)
+
+    @staticmethod
+    def _compilar(regla: dict) -> Regla:
+        destino = regla.get("destino", "")
+        destino.format(**_CAMPOS_PLANTILLA)  # falla si la plantilla es inválida
+
+        def en_bytes(clave):
+            valor = regla.get(clave)
+            return -1 if valor is None else int(float(valor) * _MB)
+
+        return Regla(
+            (
+                regla.get("tipo", ""),
+                regla.get("categoria", ""),
+                regla.get("nacionalidad", ""),
+            ),
+            destino,
+            en_bytes("tamano_min_mb"),
+            en_bytes("tamano_max_mb"),
+        )
+
+    def __len__(self):
+        return len(self._reglas)
+
+    def _cumple(self, i: int, nombre: str, tokens, ext: str, tamano: int) -> bool:
+        c = self._condiciones[i]
+        return (
+            (not c.palabras or not c.palabras.isdisjoint(tokens))
+            and (not c.extensiones or ext in c.extensiones)
+            and (c.texto is None or c.texto.match(nombre) is not None)
+            and self._reglas[i].acepta_tamano(tamano)
+        )
+
+    def buscar(self, nombre_archivo: str, tamano: int = -1) -> Optional[Regla]:
+        """Primera regla que cumple el nombre (y el tamaño, si se conoce)."""
+        if not self._reglas:
+            return None
+        minusculas = nombre_archivo.lower()
+        tokens = set(_PALABRA.findall(minusculas))
+        ext = os.path.splitext(minusculas)[1]
+        candidatas = set(self._sin_indice)
+        candidatas.update(self._por_extension.get(ext, ()))
+        for token in tokens:
+            candidatas.update(self._por_palabra.get(token, ()))
+        if self._por_trigrama:
+            for k in range(len(minusculas) - 2):
+                candidatas.update(self._por_trigrama.get(minusculas[k : k + 3], ()))
+        for i in sorted(candidatas):
+            if self._cumple(i, nombre_archivo, tokens, ext, tamano):
+                return self._reglas[i]
+        return None
@@ -0,0 +1,288 @@
+import mmap
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+# Contenedores que se saben leer (el formato se reconoce por el contenido)
+EXTENSIONES = frozenset((".mkv", ".webm", ".mp4", ".m4v", ".mov", ".avi"))
+# Elementos o cajas que se recorren antes de rendirse con un archivo raro
+MAX_ELEMENTOS = 20000
+
+
+class InfoMedio(NamedTuple):
+    duracion: float  # segundos, -1 si no se pudo saber
+    ancho: int  # píxeles del video, 0 si no se sabe
+    alto: int
+    titulo: str  # título guardado en el contenedor, "" si no tiene
+
+
+DESCONOCIDO = InfoMedio(-1.0, 0, 0, "")
+
+
+def _texto(datos: bytes) -> str:
+    return datos.split(b"\0", 1)[0].decode("utf-8", "replace").strip()
+
+
+# -------------------------------
+# Matroska / WebM (EBML)
+# -------------------------------
+_SEGMENTO = 0x18538067
+_INFO = 0x1549A966
+_ESCALA = 0x2AD7B1  # TimecodeScale, en ns
+_DURACION = 0x4489  # en unidades de TimecodeScale
+_TITULO = 0x7BA9
+_PISTAS = 0x1654AE6B
+_PISTA = 0xAE
+_TIPO_PISTA = 0x83  # 1 = video
+_VIDEO = 0xE0
+_ANCHO = 0xB0
+_ALTO = 0xBA
+_CLUSTER = 0x1F43B675
+
+
+def _vint(m, pos: int, es_id=False):
+    # Entero de largo variable: la cantidad de ceros iniciales da el largo.
+    # Retorna (valor, posición siguiente); el tamaño "desconocido" es -1
+    primero = m[pos]
+    largo = 1
+    while largo <= 8 and not primero & (0x80 >> (largo - 1)):
+        largo += 1
+    if largo > 8:
+        raise ValueError("vint inválido")
+    valor = int.from_bytes(m[pos : pos + largo], "big")
+    if es_id:
+        return valor, pos + largo
+    valor &= (1 << (7 * largo)) - 1
+    if valor == (1 << (7 * largo)) - 1:
+        valor = -1
+    return valor, pos + largo
+
+
+def _elementos(m, inicio: int, fin: int):
+    # (id, inicio de los datos, fin de los datos) de cada hijo
+    pos = inicio
+    for _ in range(MAX_ELEMENTOS):
+        if pos >= fin:
+            return
+        id_, pos = _vint(m, pos, es_id=True)
+        tamano, pos = _vint(m, pos)
+        final = fin if tamano < 0 else min(fin, pos + tamano)
+        yield id_, pos, final
+        pos = final
+
+
+def _mkv(m) -> InfoMedio:
+    fin = len(m)
+    escala, duracion, titulo, ancho, alto = 1_000_000, -1.0, "", 0, 0
+    vistos = set()
+    for id_, ini, fin_ in _elementos(m, 0, fin):
+        if id_ == _SEGMENTO:
+            segmento = (ini, fin_)
+            break
+    else:
+        return DESCONOCIDO
+    for id_, ini, fin_ in _elementos(m, *segmento):
+        if id_ == _INFO:
+            for hijo, a, b in _elementos(m, ini, fin_):
+                if hijo == _ESCALA:
+                    escala = int.from_bytes(m[a:b], "big") or escala
+                elif hijo == _DURACION and b - a in (4, 8):
+                    duracion = struct.unpack(">f" if b - a == 4 else ">d", m[a:b])[0]
+                elif hijo == _TITULO:
+                    titulo = _texto(m[a:b])
+        elif id_ == _PISTAS:
+            for pista, a, b in _elementos(m, ini, fin_):
+                if pista != _PISTA:
+                    continue
+                datos = {hijo: (c, d) for hijo, c, d in _elementos(m, a, b)}
+                tipo = datos.get(_TIPO_PISTA)
+                if tipo is None or int.from_bytes(m[slice(*tipo)], "big") != 1:
+                    continue
+                if _VIDEO in datos and not ancho:
+                    for hijo, c, d in _elementos(m, *datos[_VIDEO]):
+                        if hijo == _ANCHO:
+                            ancho = int.from_bytes(m[c:d], "big")
+                        elif hijo == _ALTO:
+                            alto = int.from_bytes(m[c:d], "big")
+        elif id_ == _CLUSTER and fin_ == fin:
+            break  # cluster sin tamaño: no se puede saltar
+        vistos.add(id_)
+        if _INFO in vistos and _PISTAS in vistos:
+            break  # el resto son los datos (clusters, cues...)
+    segundos = duracion * escala / 1e9 if duracion >= 0 else -1.0
+    return InfoMedio(segundos, ancho, alto, titulo)
+
+
+# -------------------------------
+# MP4 / QuickTime
+# -------------------------------
+def _cajas(m, inicio: int, fin: int):
+    # (tipo, inicio de los datos, fin de los datos) de cada caja
+    pos = inicio
+    for _ in range(MAX_ELEMENTOS):
+        if pos + 8 > fin:
+            return
+        tamano, tipo = struct.unpack(">I4s", m[pos : pos + 8])
+        datos = pos + 8
+        if tamano == 1:
+            (tamano,) = struct.unpack(">Q", m[datos : datos + 8])
+            datos += 8
+        elif tamano == 0:
+            tamano = fin - pos
+        if tamano < datos - pos:
+            return
+        yield tipo, datos, min(fin, pos + tamano)
+        pos += tamano
+
+
+def _titulo_mp4(m, ini: int, fin: int) -> str:
+    # udta/©nam de QuickTime o udta/meta/ilst/©nam/data de iTunes
+    for tipo, a, b in _cajas(m, ini, fin):
+        if tipo == b"\xa9nam":
+            if m[a + 4 : a + 8] == b"data":
+                return _texto(m[a + 16 : b])
+            return _texto(m[a + 4 : b])
+        if tipo == b"meta":
+            # En MP4 meta es una "full box" (versión y flags antes de los
+            # hijos); en QuickTime los hijos empiezan enseguida
+            salto = 0 if m[a + 4 : a + 8] in (b"hdlr", b"ilst") else 4
+            titulo = _titulo_mp4(m, a + salto, b)
+            if titulo:
+                return titulo
+        elif tipo == b"ilst":
+            titulo = _titulo_mp4(m, a, b)
+            if titulo:
+                return titulo
+    return ""
+
+
+def _mp4(m) -> InfoMedio:
+    duracion, ancho, alto, titulo = -1.0, 0, 0, ""
+    for tipo, ini, fin in _cajas(m, 0, len(m)):
+        if tipo != b"moov":
+            continue  # mdat se salta sin leerse
+        for hijo, a, b in _cajas(m, ini, fin):
+            if hijo == b"mvhd":
+                if m[a] == 1:
+                    escala, dur = struct.unpack(">IQ", m[a + 20 : a + 32])
+                else:
+                    escala, dur = struct.unpack(">II", m[a + 12 : a + 20])
+                if escala:
+                    duracion = dur / escala
+            elif hijo == b"trak":
+                for caja, c, d in _cajas(m, a, b):
+                    if caja == b"tkhd" and d - c >= 84:
+                        # Ancho y alto (16.16) son los últimos campos; las
+                        # pistas de audio tienen 0
+                        w, h = struct.unpack(">II", m[d - 8 : d])
+                        if w >> 16 and not ancho:
+                            ancho, alto = w >> 16, h >> 16
+            elif hijo == b"udta" and not titulo:
+                titulo = _titulo_mp4(m, a, b)
+        break
+    return InfoMedio(duracion, ancho, alto, titulo)
+
+
+# -------------------------------
+# AVI (RIFF)
+# -------------------------------
+def _trozos(m, inicio: int, fin: int):
+    # (id, tipo de LIST o b"", inicio de los datos, fin) de cada trozo
+    pos = inicio
+    for _ in range(MAX_ELEMENTOS):
+        if pos + 8 > fin:
+            return
+        id_, tamano = struct.unpack("<4sI", m[pos : pos + 8])
+        datos = pos + 8
+        final = min(fin, datos + tamano)
+        if id_ in (b"LIST", b"RIFF"):
+            yield id_, bytes(m[datos : datos + 4]), datos + 4, final
+        else:
+            yield id_, b"", datos, final
+        pos = datos + tamano + (tamano & 1)  # relleno a par
+
+
+def _avi(m) -> InfoMedio:
+    us_por_cuadro = cuadros = ancho = alto = 0
+    titulo = ""
+    for id_, tipo, ini, fin in _trozos(m, 0, len(m)):
+        if (id_, tipo) != (b"RIFF", b"AVI "):
+            break  # los RIFF AVIX siguientes son solo datos
+        for hijo, lista, a, b in _trozos(m, ini, fin):
+            if lista == b"hdrl":
+                for sub, sublista, c, d in _trozos(m, a, b):
+                    if sub == b"avih" and d - c >= 40:
+                        (us_por_cuadro,) = struct.unpack("<I", m[c : c + 4])
+                        (cuadros,) = struct.unpack("<I", m[c + 16 : c + 20])
+                        ancho, alto = struct.unpack("<II", m[c + 32 : c + 40])
+                    elif sublista == b"odml":
+                        # OpenDML (más de 1 GB): avih solo cuenta el primer RIFF
+                        for dml, _, e, f in _trozos(m, c, d):
+                            if dml == b"dmlh" and f - e >= 4:
+                                (cuadros,) = struct.unpack("<I", m[e : e + 4])
+            elif lista == b"INFO":
+                for sub, _, c, d in _trozos(m, a, b):
+                    if sub == b"INAM":
+                        titulo = _texto(m[c:d])
+        break
+    duracion = cuadros * us_por_cuadro / 1e6 if us_por_cuadro else -1.0
+    return InfoMedio(duracion, ancho, alto, titulo)
+
+
+# -------------------------------
+# Sondeo
+# -------------------------------
+def sondear(ruta: str) -> InfoMedio:
+    """
+    Duración, resolución y título de un .mkv/.webm, .mp4/.mov o .avi leyendo
+    solo las cabeceras del contenedor: el archivo se mapea en memoria y los
+    datos de audio y video se saltan por su tamaño, sin tocarlos. Retorna
+    DESCONOCIDO si el formato no se reconoce o está dañado; OSError si no se
+    puede leer.
+    """
+    with open(ruta, "rb") as f:
+        try:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return DESCONOCIDO  # archivo vacío
+        with m:
+            try:
+                if m[:4] == b"\x1a\x45\xdf\xa3":
+                    return _mkv(m)
+                if m[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip"):
+                    return _mp4(m)
+                if m[:4] == b"RIFF" and m[8:12] == b"AVI ":
+                    return _avi(m)
+            except (ValueError, IndexError, struct.error):
+                pass
+    return DESCONOCIDO
+
+
+def sondear_lote(archivos, cargar_cache=None, hilos=4):
+    """
+    Sondea los archivos (con .ruta y .clave, como ArchivoHuella) en un
+    conjunto de hilos. cargar_cache(claves) -> {clave: InfoMedio} da los ya
+    sondeados, que no se vuelven a abrir.
+
+    Retorna (resultados, nuevos): ruta -> InfoMedio (sin los que no se
+    pudieron leer) y clave -> InfoMedio de los sondeados en esta llamada,
+    para guardarlos en la caché.
+    """
+    cache = {}
+    if cargar_cache is not None and archivos:
+        cache = dict(cargar_cache({a.clave for a in archivos}))
+    faltan = list({a.clave: a for a in archivos if a.clave not in cache}.values())
+
+    def leer(archivo):
+        try:
+            return sondear(archivo.ruta)
+        except OSError:
+            return None
+
+    nuevos = {}
+    with ThreadPoolExecutor(max_workers=max(1, hilos)) as pool:
+        for archivo, info in zip(faltan, pool.map(leer, faltan)):
+            if info is not None:
+                cache[archivo.clave] = nuevos[archivo.clave] = info
+    resultados = {a.ruta: cache[a.clave] for a in archivos if a.clave in cache}
+    return resultados, nuevos
@@ -0,0 +1,125 @@
+import math
+import re
+import unicodedata
+from operator import add
+from typing import NamedTuple
+
+# Señales del nombre del archivo (ver obtener_nombre_cap), como tokens extra
+CAPITULO = "#capitulo"
+TEMPORADA = "#temporada"
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def caracteristicas(nombre: str, capitulo=False, temporada=False) -> list:
+    """Tokens de un título (sin acentos, en minúsculas, sin repetir) y señales."""
+    texto = nombre
+    if not texto.isascii():  # NFKD no cambia texto ASCII
+        texto = unicodedata.normalize("NFKD", texto)
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.lower()
+    tokens = [t for t in dict.fromkeys(_TOKEN.findall(texto)) if len(t) > 1]
+    if capitulo:
+        tokens.append(CAPITULO)
+    if temporada:
+        tokens.append(TEMPORADA)
+    return tokens
+
+
+def contar(ejemplos):
+    """
+    Cambios en las cuentas del modelo por `ejemplos` (clasif, tokens, signo):
+    signo 1 para aprender un título y -1 para olvidarlo. Retorna
+    ({clasif: [títulos, tokens]}, {(token, clasif): cuenta}).
+    """
+    clases, tokens = {}, {}
+    for clasif, toks, signo in ejemplos:
+        fila = clases.setdefault(clasif, [0, 0])
+        fila[0] += signo
+        fila[1] += signo * len(toks)
+        for t in toks:
+            tokens[(t, clasif)] = tokens.get((t, clasif), 0) + signo
+    return clases, tokens
+
+
+class Sugerencia(NamedTuple):
+    clasif: tuple  # (tipo, categoria, nacionalidad)
+    confianza: float  # probabilidad estimada, de 0 a 1
+
+
+class ModeloBayes:
+    """
+    Naive Bayes multinomial sobre los tokens de los títulos ya clasificados.
+    Cada clasificación completa (tipo, categoria, nacionalidad) es una clase.
+    Las cuentas se pueden sumar y restar, así que se actualiza por lotes sin
+    reentrenar.
+    """
+
+    ALFA = 1.0  # suavizado de Laplace
+    MINIMO = 20  # títulos aprendidos antes de sugerir nada
+
+    def __init__(self, clases=(), tokens=()):
+        # Filas como las de las tablas modelo_clases y modelo_tokens
+        self._titulos = {}  # clasif -> títulos
+        self._tokens = {}  # clasif -> tokens en total
+        self._cuentas = {}  # token -> {clasif: cuenta}
+        self.sumar(
+            {tuple(f[:3]): f[3:] for f in clases},
+            {(f[0], tuple(f[1:4])): f[4] for f in tokens},
+        )
+
+    def __len__(self):
+        return sum(self._titulos.values())
+
+    def sumar(self, clases: dict, tokens: dict):
+        """Aplica los cambios que retorna contar()."""
+        for clasif, (titulos, n) in clases.items():
+            self._titulos[clasif] = self._titulos.get(clasif, 0) + titulos
+            self._tokens[clasif] = self._tokens.get(clasif, 0) + n
+            if self._titulos[clasif] <= 0:
+                del self._titulos[clasif], self._tokens[clasif]
+        for (token, clasif), n in tokens.items():
+            cuentas = self._cuentas.setdefault(token, {})
+            cuentas[clasif] = cuentas.get(clasif, 0) + n
+            if cuentas[clasif] <= 0:
+                del cuentas[clasif]
+                if not cuentas:
+                    del self._cuentas[token]
+
+    def predecir_lote(self, documentos: dict) -> dict:
+        """
+        Retorna nombre -> Sugerencia para los `documentos` (nombre -> tokens
+        de caracteristicas()) que tienen alguna palabra conocida. Las
+        log-probabilidades de cada token para todas las clases se calculan una
+        vez por lote y se suman como vectores.
+        """
+        clases = list(self._titulos)
+        if len(self) < self.MINIMO or len(clases) < 2:
+            return {}
+        total = len(self)
+        vocabulario = len(self._cuentas)
+        previas = [math.log(self._titulos[c] / total) for c in clases]
+        denominadores = [
+            math.log(self._tokens[c] + self.ALFA * vocabulario) for c in clases
+        ]
+        vectores = {}  # token -> log P(token | clase) por clase
+        resultados = {}
+        for nombre, tokens in documentos.items():
+            conocidos = [t for t in tokens if t in self._cuentas]
+            if all(t in (CAPITULO, TEMPORADA) for t in conocidos):
+                continue  # sin palabras conocidas solo quedaría la previa
+            puntos = previas
+            for t in conocidos:
+                vector = vectores.get(t)
+                if vector is None:
+                    cuentas = self._cuentas[t]
+                    vector = vectores[t] = [
+                        math.log(cuentas.get(c, 0) + self.ALFA) - d
+                        for c, d in zip(clases, denominadores)
+                    ]
+                puntos = list(map(add, puntos, vector))
+            maximo = max(puntos)
+            pesos = [math.exp(p - maximo) for p in puntos]
+            mejor = pesos.index(1.0)
+            resultados[nombre] = Sugerencia(clases[mejor], 1.0 / sum(pesos))
+        return resultados
@@ -0,0 +1,36 @@
+from pathlib import Path
+
+import pytest
+
+from agrupamiento import agrupar_nombres
+from organizador_core import cargar_config, planificar_simple
+
+
+def test_agrupa_errores_de_tipeo():
+    nombres = ["Breaking Bad"] * 3 + ["BreakingBad", "Braking Bad", "Breaknig Bad"]
+    assert set(agrupar_nombres(nombres).values()) == {"Breaking Bad"}
+
+
+@pytest.mark.parametrize(
+    "nombres",
+    [["The Crown", "The Clown"], ["The Boys", "The Bots"], ["Rocky 2", "Rocky 3"]],
+)
+def test_titulos_cortos_distintos_no_se_juntan(nombres):
+    assert agrupar_nombres(nombres) == {n: n for n in nombres}
+
+
+def test_no_encadena_grupos():
+    # Cada uno a una letra del siguiente, pero el último a dos del primero
+    nombres = ["Breaking Bad"] * 3 + ["Breaking Ba"] * 2 + ["Breaking B"]
+    canonicos = agrupar_nombres(nombres)
+    assert canonicos["Breaking Ba"] == "Breaking Bad"
+    assert canonicos["Breaking B"] == "Breaking B"
+
+
+def test_modo_simple_no_agrupa_por_defecto(tmp_path):
+    for nombre in ("Braking Bad 1x01.mkv", "Breaking Bad 1x02.mkv"):
+        (tmp_path / nombre).write_bytes(b"x")
+    cfg = cargar_config(tmp_path / "config.json")
+    plan = planificar_simple(tmp_path, cfg["extensiones"])
+    carpetas = {Path(p.carpeta_destino).name for p in plan.pasos}
+    assert carpetas == {"Braking Bad", "Breaking Bad"}
@@ -0,0 +1,159 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from organizador_core import (
+    AsignadorDestinos,
+    Diario,
+    PasoPlan,
+    Plan,
+    aplicar_plan,
+    procesar_directorios,
+)
+
+
+@pytest.fixture
+def biblioteca(tmp_path):
+    # Un episodio por mover y, en el destino, otro archivo con el mismo nombre
+    origen = tmp_path / "Show 1x01.mkv"
+    origen.write_bytes(b"nuevo" * 100)
+    destino = tmp_path / "Series" / "Show" / "Temporada 1"
+    destino.mkdir(parents=True)
+    (destino / "Show 1x01.mkv").write_bytes(b"viejo")
+    paso = PasoPlan(str(origen), str(destino), origen.name, "exacta")
+    plan = Plan("clasificar", str(tmp_path), (paso,), ())
+    return tmp_path, paso, plan
+
+
+def _morir(diario: Diario):
+    # Como si el proceso terminara sin confirmar ni cerrar el diario
+    diario.conn.close()
+    diario.conn = None
+
+
+def _reservar(diario: Diario, paso: PasoPlan) -> Path:
+    destino = Path(paso.carpeta_destino) / paso.nombre_final
+    final = AsignadorDestinos().reservar(destino)
+    diario.al_reservar(paso, final)
+    return final
+
+
+def test_reanudar_usa_el_nombre_reservado(biblioteca):
+    raiz, paso, plan = biblioteca
+    db = raiz / "c.db"
+    diario = Diario(db)
+    diario.iniciar(plan)
+    final = _reservar(diario, paso)
+    os.replace(paso.origen, final)
+    _morir(diario)
+
+    with Diario(db) as diario:
+        assert diario.reanudar().pasos == ()
+    with Diario(db) as diario:
+        deshacer = diario.deshacer("")
+        aplicar_plan(deshacer, 1, al_terminar=diario.al_terminar)
+
+    assert Path(paso.origen).read_bytes() == b"nuevo" * 100
+    existente = Path(paso.carpeta_destino) / "Show 1x01.mkv"
+    assert existente.read_bytes() == b"viejo"
+    assert not final.exists()
+
+
+@pytest.mark.parametrize("copia_a_medias", [False, True])
+def test_reanudar_borra_la_reserva_huerfana(biblioteca, copia_a_medias):
+    raiz, paso, plan = biblioteca
+    db = raiz / "c.db"
+    diario = Diario(db)
+    diario.iniciar(plan)
+    final = _reservar(diario, paso)
+    temporal = final.with_name(f".{final.name}.parcial")
+    if copia_a_medias:
+        temporal.write_bytes(b"nue")
+    _morir(diario)
+
+    with Diario(db) as diario:
+        plan = diario.reanudar()
+        assert not final.exists() and not temporal.exists()
+        aplicar_plan(
+            plan, 1, al_terminar=diario.al_terminar, al_reservar=diario.al_reservar
+        )
+
+    carpeta = Path(paso.carpeta_destino)
+    assert sorted(os.listdir(carpeta)) == ["Show 1x01 (1).mkv", "Show 1x01.mkv"]
+    assert (carpeta / "Show 1x01 (1).mkv").read_bytes() == b"nuevo" * 100
+
+
+def test_reanudar_no_da_por_hecho_otro_archivo(biblioteca):
+    # Sin origen y sin la reserva esperada, el paso queda con error
+    raiz, paso, plan = biblioteca
+    db = raiz / "c.db"
+    diario = Diario(db)
+    diario.iniciar(plan)
+    final = _reservar(diario, paso)
+    final.unlink()
+    os.unlink(paso.origen)
+    _morir(diario)
+
+    with Diario(db) as diario:
+        assert diario.reanudar().pasos == ()
+        estado = diario.conn.execute("SELECT estado FROM diario").fetchone()[0]
+    assert estado == "error"
+
+
+def test_deshacer_omite_lo_que_cambio(biblioteca):
+    raiz, paso, plan = biblioteca
+    db = raiz / "c.db"
+    with Diario(db) as diario:
+        diario.iniciar(plan)
+        aplicar_plan(
+            plan, 1, al_terminar=diario.al_terminar, al_reservar=diario.al_reservar
+        )
+    final = Path(paso.carpeta_destino) / "Show 1x01 (1).mkv"
+    final.write_bytes(b"editado")
+
+    with Diario(db) as diario:
+        deshacer = diario.deshacer("")
+    assert deshacer.pasos == ()
+    assert deshacer.omitidos == ((str(final), "cambió desde que se movió"),)
+
+
+def test_copia_entre_volumenes_sin_temporales(tmp_path):
+    from organizador_core import mover_archivo
+
+    origen = tmp_path / "a.mkv"
+    origen.write_bytes(b"x" * 1000)
+    reservados = []
+    final = mover_archivo(
+        origen, tmp_path / "dest" / "a.mkv", False, al_reservar=reservados.append
+    )
+    assert reservados == [final]
+    assert os.listdir(final.parent) == ["a.mkv"]
+    assert not origen.exists()
+
+
+def test_ids_de_ejecucion_no_chocan(biblioteca):
+    raiz, _, plan = biblioteca
+    with Diario(raiz / "c.db") as diario:
+        ids = {diario.iniciar(plan) for _ in range(50)}
+    assert len(ids) == 50
+
+
+def test_procesar_directorios_avisa_la_ejecucion(tmp_path):
+    carpeta = tmp_path / "raiz"
+    carpeta.mkdir()
+    (carpeta / "Show 1x01.mkv").write_bytes(b"x")
+    iniciadas = []
+    procesar_directorios(
+        [str(carpeta)],
+        "simple",
+        tmp_path / "c.db",
+        tmp_path / "config.json",
+        diario=True,
+        al_iniciar=lambda d, ejecucion: iniciadas.append((d, ejecucion)),
+    )
+    ((directorio, ejecucion),) = iniciadas
+    assert directorio == str(carpeta)
+    with Diario(tmp_path / "c.db") as diario:
+        aplicar_plan(diario.deshacer(ejecucion), 1, al_terminar=diario.al_terminar)
+    assert (carpeta / "Show 1x01.mkv").exists()
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+import organizador_core
+from duplicados import BLOQUE, ArchivoHuella, agrupar_duplicados
+from organizador_core import ClasificacionRepo, PasoPlan, Plan, marcar_duplicados
+
+
+def _huella(ruta) -> ArchivoHuella:
+    st = os.stat(ruta)
+    return ArchivoHuella(str(ruta), st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+
+
+def test_agrupar_por_contenido(tmp_path):
+    grande = os.urandom(3 * BLOQUE)
+    # Mismos extremos, distinto medio: solo la huella completa los separa
+    medio = grande[:BLOQUE] + b"x" * BLOQUE + grande[-BLOQUE:]
+    contenidos = {
+        "a": grande,
+        "b": grande,
+        "c": medio,
+        "d": b"chico",
+        "e": b"chico",
+        "f": b"otro!",
+        "g": b"",
+        "h": b"",
+    }
+    for nombre, datos in contenidos.items():
+        (tmp_path / nombre).write_bytes(datos)
+    os.link(tmp_path / "a", tmp_path / "a2")
+    nombres = [*contenidos, "a2"]
+    archivos = [_huella(tmp_path / n) for n in nombres]
+    grupos, nuevas = agrupar_duplicados(archivos)
+    assert sorted(sorted(nombres[i] for i in g) for g in grupos) == [
+        ["a", "a2", "b"],
+        ["d", "e"],
+    ]
+    # Los enlaces duros del mismo inodo se leen una sola vez
+    assert len(nuevas) == 6  # a, b, c, d, e y f; no a2 ni los vacíos
+
+
+def test_cache_distingue_volumenes(tmp_path):
+    clave = ArchivoHuella("x", 10, 1, 42, 1).clave
+    otro_volumen = ArchivoHuella("y", 10, 1, 42, 2).clave
+    assert clave != otro_volumen
+    with ClasificacionRepo(tmp_path / "c.db") as repo:
+        repo.guardar_huellas({clave: ("parcial", "completa")})
+        assert repo.cargar_huellas([otro_volumen]) == {}
+        assert repo.cargar_huellas([clave]) == {clave: ("parcial", "completa")}
+
+
+@pytest.fixture
+def copias(tmp_path):
+    raiz = tmp_path / "raiz"
+    destino = raiz / "Show"
+    destino.mkdir(parents=True)
+    (destino / "viejo.mkv").write_bytes(b"contenido")
+    pasos = []
+    for nombre, datos in (("a.mkv", b"contenido"), ("b.mkv", b"nuevo!!!!")):
+        (raiz / nombre).write_bytes(datos)
+        pasos.append(PasoPlan(str(raiz / nombre), str(destino), nombre, "simple"))
+    return raiz, Plan("simple", str(raiz), tuple(pasos), ())
+
+
+@pytest.mark.parametrize("accion", ["saltar", "enlazar", "cuarentena"])
+def test_marcar_duplicados(copias, accion):
+    raiz, plan = copias
+    viejo = str(raiz / "Show" / "viejo.mkv")
+    marcado = marcar_duplicados(plan, accion)
+    a, b = plan.pasos
+    if accion == "saltar":
+        assert marcado.pasos == (b,)
+        assert marcado.omitidos == ((a.origen, "duplicado de viejo.mkv"),)
+    elif accion == "enlazar":
+        assert marcado.pasos == (a._replace(fuente="duplicado", enlazar_a=viejo), b)
+    else:
+        cuarentena = str(raiz / "_Duplicados")
+        assert marcado.pasos == (
+            b,
+            a._replace(carpeta_destino=cuarentena, fuente="duplicado"),
+        )
+
+
+def test_dry_run_no_escribe_huellas(tmp_path, copias, monkeypatch):
+    raiz, _ = copias
+    db = tmp_path / "c.db"
+    argv = ["x", "--modo", "simple", "--dir", str(raiz), "--db", str(db)]
+    monkeypatch.setattr(sys, "argv", argv + ["--duplicados", "saltar", "--dry-run"])
+    with pytest.raises(SystemExit):
+        organizador_core.main()
+    assert not db.exists()
+
+    ClasificacionRepo(db).cerrar()
+    with pytest.raises(SystemExit):
+        organizador_core.main()
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM huellas").fetchone() == (0,)
+    assert (raiz / "a.mkv").exists()
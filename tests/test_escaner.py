@@ -0,0 +1,109 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from escaner import FiltroEscaneo, escanear
+
+EXTS = [".mkv", ".avi"]
+
+
+@pytest.fixture
+def arbol(tmp_path):
+    archivos = [
+        "a.mkv",
+        "B.AVI",
+        ".oculto.mkv",
+        "notas.txt",
+        "sub/c.mkv",
+        "sub/muestra/d.mkv",
+        "sub/muestra/mas/e.avi",
+        "Series/ya.mkv",
+        "_Duplicados/copia.mkv",
+        "sub/Series/f.mkv",
+    ]
+    for rel in archivos:
+        ruta = tmp_path / rel
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_bytes(b"x")
+    (tmp_path / "enlace.mkv").symlink_to(tmp_path / "sub" / "c.mkv")
+    (tmp_path / "roto.mkv").symlink_to(tmp_path / "no-existe.mkv")
+    (tmp_path / "sub" / "bucle").symlink_to(tmp_path)
+    return tmp_path
+
+
+def _relativas(raiz, entradas):
+    return sorted(Path(e.ruta).relative_to(raiz).as_posix() for e in entradas)
+
+
+def test_raiz_igual_que_iterdir(arbol):
+    # Lo que listaba el organizador antes de escanear()
+    esperado = sorted(
+        f.name for f in arbol.iterdir() if f.is_file() and f.suffix.lower() in EXTS
+    )
+    assert _relativas(arbol, escanear(arbol, EXTS)) == esperado
+    assert ".oculto.mkv" in esperado and "enlace.mkv" in esperado
+
+
+@pytest.mark.parametrize(
+    "profundidad, mas",
+    [
+        (0, []),
+        (1, ["sub/c.mkv"]),
+        (2, ["sub/Series/f.mkv", "sub/c.mkv", "sub/muestra/d.mkv"]),
+        (
+            None,
+            [
+                "sub/Series/f.mkv",
+                "sub/c.mkv",
+                "sub/muestra/d.mkv",
+                "sub/muestra/mas/e.avi",
+            ],
+        ),
+    ],
+)
+def test_profundidad_y_carpetas_omitidas(arbol, profundidad, mas):
+    # Series y _Duplicados solo se omiten en la raíz; los enlaces a carpetas
+    # no se siguen (sub/bucle apunta a la raíz)
+    raiz = [".oculto.mkv", "B.AVI", "a.mkv", "enlace.mkv"]
+    entradas = list(escanear(arbol, EXTS, profundidad))
+    assert _relativas(arbol, entradas) == sorted(raiz + mas)
+    for e in entradas:
+        assert e.profundidad == e.ruta.count(os.sep) - str(arbol).count(os.sep) - 1
+
+
+def test_incluir_y_excluir(arbol):
+    entradas = escanear(arbol, EXTS, None, incluir=["*.mkv"], excluir=["muestra"])
+    assert _relativas(arbol, entradas) == [
+        ".oculto.mkv",
+        "a.mkv",
+        "enlace.mkv",
+        "sub/Series/f.mkv",
+        "sub/c.mkv",
+    ]
+
+
+def test_carpeta_sin_permiso(arbol, monkeypatch):
+    original = os.scandir
+    prohibida = str(arbol / "sub" / "muestra")
+
+    def scandir(ruta):
+        if os.fspath(ruta) == prohibida:
+            raise PermissionError(13, "Permiso denegado", ruta)
+        return original(ruta)
+
+    monkeypatch.setattr(os, "scandir", scandir)
+    # La carpeta que no se puede leer se salta; el resto se recorre igual
+    relativas = _relativas(arbol, escanear(arbol, EXTS, None))
+    assert "sub/c.mkv" in relativas and "sub/Series/f.mkv" in relativas
+    assert not any("muestra" in r for r in relativas)
+
+
+def test_con_stat_y_filtro_coinciden(arbol):
+    filtro = FiltroEscaneo(arbol, EXTS, None)
+    for entrada in escanear(arbol, EXTS, None, con_stat=True):
+        st = os.stat(entrada.ruta)
+        assert (entrada.tamano, entrada.mtime_ns) == (st.st_size, st.st_mtime_ns)
+        assert filtro.entrada(entrada.ruta)[:5] == entrada[:5]
+    assert filtro.entrada(arbol / "Series" / "ya.mkv") is None
+    assert filtro.entrada(arbol / "notas.txt") is None
@@ -0,0 +1,45 @@
+import itertools
+
+from organizador_core import ClasificacionRepo, IndicePalabrasClave
+
+SERIE = ("serie", "", "")
+PELICULA = ("pelicula", "Drama", "")
+
+
+def test_palabra_corta_no_coincide_por_prefijo():
+    indice = IndicePalabrasClave([("dark", *SERIE)])
+    assert indice.buscar("Donnie Darko") is None
+    assert indice.sugerir("Donnie Darko") is None
+    assert indice.buscar("Dark 2017") == (SERIE, 1.0)
+
+
+def test_coincidencias_aproximadas_solo_sugieren():
+    indice = IndicePalabrasClave([("breaking", *SERIE)])
+    assert indice.buscar("Breakin Bad") is None
+    sugerencia = indice.sugerir("Breakin Bad")
+    assert sugerencia.clasif == SERIE
+    assert 0 < sugerencia.confianza < 1
+
+
+def test_desempate_no_depende_del_orden():
+    filas = [("reina", *SERIE, 0.5), ("reina", *PELICULA, 0.5)]
+    for orden in itertools.permutations(filas):
+        assert IndicePalabrasClave(orden).buscar("Reina") == (PELICULA, 1.0)
+    filas.append(("reina", *SERIE, 0.25))
+    for orden in itertools.permutations(filas):
+        assert IndicePalabrasClave(orden).buscar("Reina") == (SERIE, 1.0)
+
+
+def test_el_indice_refleja_lo_guardado(tmp_path):
+    # Lo confirmado cuenta igual que si el índice se cargara de cero
+    db = tmp_path / "c.db"
+    with ClasificacionRepo(db) as repo:
+        repo.guardar("Reina Roja", *PELICULA)
+        repo.confirmar()
+        assert repo.buscar_lote(["Reina"])["Reina"][0] == PELICULA
+        repo.guardar("Reina", *SERIE)
+        repo.guardar("La Reina Blanca", *SERIE)
+        repo.confirmar()
+        assert repo.buscar_lote(["Reina Madre"])["Reina Madre"][0] == SERIE
+    with ClasificacionRepo(db) as repo:
+        assert repo.buscar_lote(["Reina Madre"])["Reina Madre"][0] == SERIE
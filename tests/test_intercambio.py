@@ -0,0 +1,72 @@
+import pytest
+
+from intercambio import exportar, importar
+from organizador_core import ClasificacionRepo
+
+FILAS = [
+    ("clasificacion", "La Niña, «Señorita»", "novela", "", "Colombiana", 1.5),
+    ("clasificacion", 'El "Último" Tango', "pelicula", "Drama", "", 2.25),
+    ("clasificacion", "Línea\npartida", "serie", "", "", 3.0),
+    ("palabras_clave", "acción", "pelicula", "Accion", "", 4.0),
+    ("palabras_clave", "telenovela", "novela", "", "", 0.0),
+]
+
+
+def _contenido(repo):
+    return [
+        (tabla, *fila)
+        for tabla in ("clasificacion", "palabras_clave")
+        for fila in repo.exportar(tabla)
+    ]
+
+
+@pytest.fixture
+def origen(tmp_path):
+    with ClasificacionRepo(tmp_path / "origen.db") as repo:
+        repo.importar(FILAS)
+        yield repo
+
+
+@pytest.mark.parametrize("archivo", ["catalogo.csv", "catalogo.jsonl"])
+def test_ida_y_vuelta(tmp_path, origen, archivo):
+    ruta = tmp_path / archivo
+    assert exportar(origen, ruta) == len(FILAS)
+    with ClasificacionRepo(tmp_path / "destino.db") as destino:
+        conteo = importar(destino, ruta)
+        assert conteo == {"leidas": len(FILAS), "escritas": len(FILAS)}
+        assert _contenido(destino) == _contenido(origen) == FILAS
+
+
+@pytest.mark.parametrize(
+    "archivo, texto, error",
+    [
+        ("c.jsonl", '{"clave": "Dark", "tipo": "serie"}\n{"clave": \n', "Línea 2"),
+        ("c.jsonl", '\n\n["Dark", "serie"]\n', "Línea 3: se esperaba"),
+        ("c.jsonl", '{"tabla": "otra", "clave": "x"}\n', "tabla desconocida"),
+        ("c.jsonl", '{"clave": "x", "actualizado": "ayer"}\n', "fecha inválida"),
+        (
+            "c.csv",
+            'tabla,clave,tipo\nclasificacion,"a\nb",serie\nclasificacion,,serie\n',
+            "Línea 4: falta la clave",
+        ),
+    ],
+)
+def test_lineas_mal_formadas(tmp_path, archivo, texto, error):
+    ruta = tmp_path / archivo
+    ruta.write_text(texto, encoding="utf-8")
+    with ClasificacionRepo(tmp_path / "c.db") as repo:
+        with pytest.raises(ValueError, match=error):
+            importar(repo, ruta)
+        # Lo leído antes del error no queda a medias en la BD
+        assert _contenido(repo) == []
+
+
+def test_catalogo_sin_columna_tabla(tmp_path):
+    ruta = tmp_path / "c.csv"
+    # Con BOM, como lo guardan algunas hojas de cálculo
+    ruta.write_text("\ufeffpalabra,tipo\nacción,pelicula\n", encoding="utf-8")
+    with ClasificacionRepo(tmp_path / "c.db") as repo:
+        importar(repo, ruta)
+        assert _contenido(repo) == [
+            ("palabras_clave", "acción", "pelicula", "", "", 0.0)
+        ]
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+import organizador_core
+from escaner import escanear
+from organizador_core import ClasificacionRepo, Manifiesto
+
+
+def _main(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["organizador_core.py", *map(str, args)])
+    with pytest.raises(SystemExit) as salida:
+        organizador_core.main()
+    assert salida.value.code == 0
+
+
+def _filas(db, raiz):
+    with ClasificacionRepo(db) as repo:
+        return repo.cargar_manifiesto(str(raiz))
+
+
+def test_sin_cambios_e_invalidacion(tmp_path):
+    archivo = tmp_path / "Show 1x01.mkv"
+    archivo.write_bytes(b"x")
+    with ClasificacionRepo(tmp_path / "c.db") as repo:
+        manifiesto = Manifiesto(repo, tmp_path)
+        (entrada,) = escanear(tmp_path, [".mkv"], con_stat=True)
+        manifiesto.anotar(entrada, "Show", "01", "1")
+        manifiesto.guardar()
+
+        (entrada,) = escanear(tmp_path, [".mkv"], con_stat=True)
+        assert Manifiesto(repo, tmp_path).sin_cambios(entrada).nombre == "Show"
+        # Otro contenido (tamaño y mtime distintos): se vuelve a analizar
+        archivo.write_bytes(b"xy")
+        (entrada,) = escanear(tmp_path, [".mkv"], con_stat=True)
+        assert Manifiesto(repo, tmp_path).sin_cambios(entrada) is None
+
+
+def test_incremental_salta_lo_ya_organizado(tmp_path, monkeypatch, capsys):
+    raiz = tmp_path / "raiz"
+    raiz.mkdir()
+    for nombre in ("Show 1x01.mkv", "Show 1x02.mkv"):
+        (raiz / nombre).write_bytes(b"x")
+    opciones = ["--modo", "simple", "--dir", raiz, "--db", tmp_path / "c.db"]
+    todo = [*opciones, "--incremental", "--profundidad", "-1"]
+    _main(monkeypatch, *todo)
+    filas = _filas(tmp_path / "c.db", raiz)
+    assert len(filas) == 2
+    for ruta, fila in filas.items():
+        assert fila.destino == ruta and os.path.dirname(ruta) != str(raiz)
+
+    capsys.readouterr()
+    _main(monkeypatch, *todo, "--dry-run")
+    assert capsys.readouterr().out.strip() == "Nada que hacer."
+    assert _filas(tmp_path / "c.db", raiz) == filas
+
+
+def test_destinos_fuera_del_escaneo_no_se_anotan(tmp_path, monkeypatch):
+    raiz = tmp_path / "raiz"
+    raiz.mkdir()
+    (raiz / "Show 1x01.mkv").write_bytes(b"x")
+    opciones = ["--modo", "simple", "--dir", raiz, "--db", tmp_path / "c.db"]
+    _main(monkeypatch, *opciones, "--incremental")
+    # La profundidad 0 no entra en la carpeta de la serie
+    assert _filas(tmp_path / "c.db", raiz) == {}
@@ -0,0 +1,25 @@
+from organizador_core import ClasificacionRepo
+
+SERIE = ("serie", "", "")
+PELICULA = ("pelicula", "Drama", "")
+
+
+def _cuentas(repo: ClasificacionRepo):
+    return (
+        sorted(repo.conn.execute("SELECT * FROM modelo_clases")),
+        sorted(repo.conn.execute("SELECT * FROM modelo_tokens")),
+    )
+
+
+def test_reclasificar_olvida_las_mismas_senales(tmp_path):
+    with ClasificacionRepo(tmp_path / "c.db") as repo:
+        repo.guardar_lote({"Show": SERIE, "Otra Cosa": PELICULA}, {"Show": (1, 1)})
+        repo.guardar_lote({"Show": PELICULA}, {"Show": (False, False)})
+        # Una importación aprende con las señales que ya tenía el título
+        repo.importar(
+            [("clasificacion", "Otra Cosa", "serie", "", "", 1.0)], "sobrescribir"
+        )
+        incremental = _cuentas(repo)
+        repo.reentrenar_modelo()
+        assert _cuentas(repo) == incremental
+    assert ("#capitulo", "serie", "", "", 1) not in incremental[1]
@@ -0,0 +1,129 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import organizador_core
+from organizador_core import (
+    AsignadorDestinos,
+    Movimiento,
+    OperacionCancelada,
+    ejecutar_movimientos,
+    medidor,
+    mover_archivo,
+)
+
+
+@pytest.fixture
+def contadores():
+    medidor.reiniciar()
+    medidor.activar()
+    yield medidor.contadores
+    medidor.activar(False)
+    medidor.reiniciar()
+
+
+def test_mover_en_el_mismo_volumen_renombra(tmp_path, contadores):
+    origen = tmp_path / "a.mkv"
+    origen.write_bytes(b"x" * 1000)
+    inodo = origen.stat().st_ino
+    final = mover_archivo(origen, tmp_path / "dest" / "a.mkv")
+    assert final.stat().st_ino == inodo
+    assert contadores == {"archivos_renombrados": 1, "bytes_renombrados": 1000}
+
+
+def test_reservar_el_mismo_nombre_dos_veces(tmp_path):
+    asignador = AsignadorDestinos()
+    primero = asignador.reservar(tmp_path / "x.mkv")
+    segundo = asignador.reservar(tmp_path / "x.mkv")
+    assert (primero.name, segundo.name) == ("x.mkv", "x (1).mkv")
+    # Otro asignador (otro proceso) tampoco recibe los ya creados
+    assert AsignadorDestinos().reservar(tmp_path / "x.mkv").name == "x (2).mkv"
+    assert primero.stat().st_size == segundo.stat().st_size == 0
+
+
+def test_reservas_simultaneas(tmp_path):
+    asignador = AsignadorDestinos()
+    with ThreadPoolExecutor(8) as pool:
+        finales = list(pool.map(asignador.reservar, [tmp_path / "x.mkv"] * 40))
+    assert len(set(finales)) == 40
+    assert len(os.listdir(tmp_path)) == 40
+
+
+def test_origen_inexistente_libera_la_reserva(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        mover_archivo(tmp_path / "no-existe.mkv", tmp_path / "dest" / "x.mkv")
+    assert os.listdir(tmp_path / "dest") == []
+
+
+def _movimientos(tmp_path, n):
+    origen = tmp_path / "origen"
+    origen.mkdir()
+    movimientos = []
+    for i in range(n):
+        archivo = origen / f"{i}.mkv"
+        archivo.write_bytes(b"x" * (i + 1))
+        movimientos.append(Movimiento(archivo, tmp_path / "dest" / f"{i % 3}.mkv"))
+    return movimientos
+
+
+def test_movimientos_en_paralelo(tmp_path, contadores):
+    movimientos = _movimientos(tmp_path, 12)
+    movimientos[5].origen.unlink()
+    resultados = {
+        i: (final, error)
+        for i, final, error in ejecutar_movimientos(movimientos, hilos=4)
+    }
+    assert sorted(resultados) == list(range(12))
+    # Solo falla el que no existe; los nombres repetidos reciben sufijo
+    assert isinstance(resultados[5][1], FileNotFoundError)
+    finales = [final for i, (final, _) in resultados.items() if i != 5]
+    assert len(set(finales)) == 11
+    for i, (final, error) in resultados.items():
+        if i != 5:
+            assert error is None and final.stat().st_size == i + 1
+    assert sorted(os.listdir(tmp_path / "dest")) == sorted(f.name for f in finales)
+    assert contadores["archivos_renombrados"] == 11
+    assert contadores["bytes_renombrados"] == sum(range(1, 13)) - 6
+
+
+def test_copias_limitadas_por_volumen(tmp_path, monkeypatch, contadores):
+    # Origen y destino en "volúmenes" distintos: cada archivo se copia
+    monkeypatch.setattr(
+        organizador_core,
+        "_dispositivo",
+        lambda ruta, cache: 1 if "origen" in str(ruta) else 2,
+    )
+    copia = shutil.copy2
+    activas, maximo, lock = [0], [0], threading.Lock()
+
+    def copy2(origen, destino):
+        with lock:
+            activas[0] += 1
+            maximo[0] = max(maximo[0], activas[0])
+        time.sleep(0.02)
+        try:
+            return copia(origen, destino)
+        finally:
+            with lock:
+                activas[0] -= 1
+
+    monkeypatch.setattr(organizador_core.shutil, "copy2", copy2)
+    movimientos = _movimientos(tmp_path, 8)
+    errores = [e for _, _, e in ejecutar_movimientos(movimientos, 4, 2) if e]
+    assert errores == []
+    assert maximo[0] == 2
+    assert contadores["archivos_copiados"] == 8
+    assert not list((tmp_path / "origen").iterdir())
+
+
+def test_cancelar_antes_de_empezar(tmp_path):
+    cancelar = threading.Event()
+    cancelar.set()
+    movimientos = _movimientos(tmp_path, 3)
+    resultados = list(ejecutar_movimientos(movimientos, cancelar=cancelar))
+    assert all(isinstance(e, OperacionCancelada) for _, _, e in resultados)
+    assert all(m.origen.exists() for m in movimientos)
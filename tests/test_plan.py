@@ -0,0 +1,100 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+import organizador_core
+from organizador_core import (
+    ClasificacionRepo,
+    PasoPlan,
+    Plan,
+    cargar_plan,
+    guardar_plan,
+)
+
+
+def _main(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["organizador_core.py", *map(str, args)])
+    with pytest.raises(SystemExit) as salida:
+        organizador_core.main()
+    assert salida.value.code == 0
+
+
+@pytest.fixture
+def carpeta(tmp_path):
+    raiz = tmp_path / "raiz"
+    raiz.mkdir()
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"umbral_sugerencias": 0.5}))
+    # Lo suficiente para que el modelo sugiera serie a "Los ..." con capítulos
+    series = {f"Los Casos {i}": ("serie", "", "") for i in range(10)}
+    peliculas = {f"Pelicula {i}": ("pelicula", "Drama", "") for i in range(10)}
+    with ClasificacionRepo(tmp_path / "c.db") as repo:
+        repo.guardar_lote(series, dict.fromkeys(series, (True, True)))
+        repo.guardar_lote(peliculas)
+    return raiz, ["--db", tmp_path / "c.db", "--config", config]
+
+
+def test_dry_run_planea_lo_que_hace_aplicar(tmp_path, monkeypatch, carpeta):
+    raiz, opciones = carpeta
+    for nombre in ("Los Zz Ww 1x02.mkv", "Los Zz Ww 1x03.mkv"):
+        (raiz / nombre).write_bytes(b"x")
+    comun = ["--modo", "clasificar", "--dir", raiz, "--frontend", "reglas"]
+    _main(monkeypatch, *comun, *opciones, "--dry-run", "--plan-out", tmp_path / "p")
+
+    plan = cargar_plan(tmp_path / "p")
+    assert [p.fuente for p in plan.pasos] == ["sugerencia", "sugerencia"]
+    _main(monkeypatch, *comun, *opciones)
+    for paso in plan.pasos:
+        assert (Path(paso.carpeta_destino) / paso.nombre_final).exists()
+        assert not Path(paso.origen).exists()
+
+
+def test_sugerencias_no_se_aplican_por_defecto(tmp_path, monkeypatch, carpeta):
+    raiz, opciones = carpeta
+    (tmp_path / "config.json").write_text("{}")
+    (raiz / "Los Zz Ww 1x02.mkv").write_bytes(b"x")
+    comun = ["--modo", "clasificar", "--dir", raiz, "--frontend", "reglas"]
+    _main(monkeypatch, *comun, *opciones, "--dry-run", "--plan-out", tmp_path / "p")
+
+    plan = cargar_plan(tmp_path / "p")
+    assert plan.pasos == ()
+    assert [motivo for _, motivo in plan.omitidos] == ["sin clasificación"]
+
+
+def test_plan_ida_y_vuelta(tmp_path):
+    plan = Plan(
+        "clasificar",
+        str(tmp_path),
+        (
+            PasoPlan("/a/Canción.mp3", "/a/Audio", "Canción.mp3", "regla"),
+            PasoPlan("/a/x.mkv", "/a/Series/X", "x (1).mkv", "duplicado", "/b/x.mkv"),
+        ),
+        (("/a/raro.avi", "sin clasificación"),),
+    )
+    guardar_plan(plan, tmp_path / "plan.json")
+    assert cargar_plan(tmp_path / "plan.json") == plan
+
+
+def test_aplicar_plan_guardado(tmp_path, monkeypatch, capsys):
+    raiz = tmp_path / "raiz"
+    raiz.mkdir()
+    for nombre in ("Show 1x01.mkv", "Show 1x02.mkv", "Otra 2x01.mkv"):
+        (raiz / nombre).write_bytes(b"x")
+    opciones = ["--modo", "simple", "--dir", raiz, "--config", tmp_path / "c.json"]
+    _main(monkeypatch, *opciones, "--dry-run", "--plan-out", tmp_path / "p")
+    plan = cargar_plan(tmp_path / "p")
+    assert len(plan.pasos) == 3
+    assert sorted(raiz.iterdir()) == sorted(Path(p.origen) for p in plan.pasos)
+
+    # Entre planear y aplicar, un archivo desaparece
+    (raiz / "Show 1x02.mkv").unlink()
+    capsys.readouterr()
+    _main(monkeypatch, "--apply", tmp_path / "p", "--db", tmp_path / "c.db")
+    salida = capsys.readouterr().out
+    assert "Error moviendo Show 1x02.mkv" in salida
+    for paso in plan.pasos:
+        final = Path(paso.carpeta_destino) / paso.nombre_final
+        assert final.exists() == (paso.nombre_final != "Show 1x02.mkv")
+    assert not (tmp_path / "c.db").exists()
@@ -0,0 +1,116 @@
+import fnmatch
+import os
+import random
+import re
+
+import pytest
+
+from reglas import MotorReglas
+
+
+@pytest.mark.parametrize(
+    "regex, nombre",
+    [
+        ("(?i)serie", "Mi SERIE 1x01.mkv"),
+        ("(?x) pel \\d+  # número", "pel12.mkv"),
+        ("(?m)(?a)^doc$", "intro\ndoc"),
+    ],
+)
+def test_flags_al_inicio_del_regex(regex, nombre):
+    motor = MotorReglas([{"regex": regex, "tipo": "a"}, {"glob": "*", "tipo": "b"}])
+    assert motor.buscar(nombre).clasif == ("a", "", "")
+
+
+def test_flags_solo_afectan_a_su_regex():
+    # El verbose del primero no quita los espacios del segundo
+    motor = MotorReglas([{"regex": ["(?x) a b ", "c d"], "tipo": "a"}])
+    assert motor.buscar("ab c d.mkv") is not None
+    assert motor.buscar("ab cd.mkv") is None
+
+
+def test_flags_en_medio_siguen_siendo_invalidos():
+    with pytest.raises(ValueError, match="Regla 1"):
+        MotorReglas([{"regex": "x(?i)y", "tipo": "a"}])
+
+
+def _lista(valor):
+    return [valor] if isinstance(valor, str) else list(valor or ())
+
+
+def _cumple(regla: dict, nombre: str, tamano: int) -> bool:
+    # Cada condición por separado, sin índices: lo que MotorReglas promete
+    regex = _lista(regla.get("regex"))
+    if not all(re.search(p, nombre, re.I | re.S) for p in regex):
+        return False
+    globs = _lista(regla.get("glob"))
+    minusculas = nombre.lower()
+    if globs and not any(fnmatch.fnmatchcase(minusculas, g.lower()) for g in globs):
+        return False
+    palabras = _lista(regla.get("palabras"))
+    borde = r"(?<![^\W_]){}(?![^\W_])"
+    if palabras and not any(
+        re.search(borde.format(re.escape(p.lower())), minusculas) for p in palabras
+    ):
+        return False
+    extensiones = [
+        (e if e.startswith(".") else f".{e}").lower()
+        for e in _lista(regla.get("extension"))
+    ]
+    if extensiones and os.path.splitext(minusculas)[1] not in extensiones:
+        return False
+    limites = [regla.get("tamano_min_mb"), regla.get("tamano_max_mb")]
+    if tamano < 0:
+        return limites == [None, None]
+    minimo, maximo = (-1 if mb is None else mb * 1024 * 1024 for mb in limites)
+    return tamano >= minimo and (maximo < 0 or tamano <= maximo)
+
+
+def test_indices_igual_que_probar_todas():
+    azar = random.Random(3)
+    palabras = ["show", "live", "dark", "the", "office", "señor", "1080p", "amor"]
+    regex = [
+        "live",
+        "Li?ve",
+        "(?:dark|light)",
+        "^the",
+        "off.ce",
+        "[0-9]{4}p",
+        "se(ñ|n)or",
+        "a+mor",
+        "(?i)DARK",
+        "(?x) off ice",
+    ]
+    globs = ["*live*", "the*", "*.mkv", "*[Ll]ove*", "*1080?*"]
+    reglas = []
+    for i in range(300):
+        regla = {"tipo": f"t{i}"}
+        k = azar.random()
+        if k < 0.3:
+            regla["regex"] = azar.choice(regex)
+        elif k < 0.45:
+            regla["glob"] = azar.choice(globs)
+        elif k < 0.6:
+            regla["palabras"] = azar.sample(palabras, azar.randint(1, 2))
+        elif k < 0.7:
+            regla["palabras"] = azar.choice(["the office", "dark show"])
+        elif k < 0.85:
+            regla["extension"] = azar.choice([".mkv", "mp4", ".AVI"])
+        else:
+            regla["regex"] = azar.choice(regex)
+            regla["extension"] = ".mkv"
+        if azar.random() < 0.15:
+            regla[azar.choice(["tamano_min_mb", "tamano_max_mb"])] = 1
+        reglas.append(regla)
+    motor = MotorReglas(reglas)
+
+    for _ in range(3000):
+        nombre = " ".join(
+            azar.choice(palabras + ["The", "LIVE", "Dark", "Office", "x"])
+            for _ in range(azar.randint(1, 4))
+        ) + azar.choice([".mkv", ".mp4", ".avi", ".MKV"])
+        tamano = azar.choice([-1, 0, 5 * 1024 * 1024])
+        esperada = next(
+            (r["tipo"] for r in reglas if _cumple(r, nombre, tamano)), None
+        )
+        encontrada = motor.buscar(nombre, tamano)
+        assert (encontrada and encontrada.clasif[0]) == esperada, (nombre, tamano)
@@ -0,0 +1,79 @@
+import sqlite3
+
+import pytest
+
+from organizador_core import (
+    MIGRACIONES,
+    ClasificacionRepo,
+    obtener_clasificacion,
+    obtener_clasificaciones_lote,
+)
+
+TITULOS = {
+    "Breaking Bad": ("serie", "", ""),
+    "Dark": ("serie", "", ""),
+    "La Reina del Sur": ("novela", "", "Mexicana"),
+    "Matrix": ("pelicula", "Accion", ""),
+}
+NOMBRES = [
+    "Breaking Bad",
+    "Breaking",
+    "Reina del Sur",
+    "La Reína del Sur 2",
+    "Matrix Reloaded",
+    "Donnie Darko",
+    "Dark",
+    "Desconocido",
+    "",
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = tmp_path / "c.db"
+    with ClasificacionRepo(db) as repo:
+        for nombre, clasif in TITULOS.items():
+            repo.guardar(nombre, *clasif)
+    return db
+
+
+def test_obtener_igual_que_lote(db):
+    lote = obtener_clasificaciones_lote(NOMBRES, db)
+    for nombre in NOMBRES:
+        assert obtener_clasificacion(nombre, db) == lote.get(nombre), nombre
+    with ClasificacionRepo(db) as repo:
+        for nombre in NOMBRES:
+            assert repo.obtener(nombre) == lote.get(nombre), nombre
+
+
+def test_lote_exactas_y_palabras(db):
+    with ClasificacionRepo(db) as repo:
+        encontrados = repo.buscar_lote(NOMBRES)
+    assert encontrados["Breaking Bad"] == (("serie", "", ""), "exacta")
+    assert encontrados["Reina del Sur"] == (("novela", "", "Mexicana"), "palabra_clave")
+    assert "Desconocido" not in encontrados
+
+
+def test_migrar_desde_la_version_1_sin_fts(tmp_path):
+    conn = sqlite3.connect(tmp_path / "c.db")
+    MIGRACIONES[0](conn.cursor())
+    conn.execute("INSERT INTO clasificacion VALUES ('Dark', 'serie', '', '')")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    with ClasificacionRepo(tmp_path / "c.db") as repo:
+        tablas = {n for (n,) in repo.conn.execute("SELECT name FROM sqlite_master")}
+        assert repo.obtener("Dark") == ("serie", "", "")
+    assert "titulo_palabra" in tablas
+    assert not any("fts" in n for n in tablas)
+
+
+def test_palabras_clave_sin_acentos(tmp_path):
+    with ClasificacionRepo(tmp_path / "c.db") as repo:
+        repo.guardar("Pelé Eterno", "pelicula", "Documental", "")
+        repo.confirmar()
+        for tabla in ("palabras_clave", "titulo_palabra"):
+            palabras = repo.conn.execute(f"SELECT palabra FROM {tabla}")
+            assert {p for (p,) in palabras} == {"pele", "eterno"}
+        assert repo.obtener("Pele") == ("pelicula", "Documental", "")
@@ -0,0 +1,104 @@
+import struct
+
+import pytest
+
+from organizador_core import peliculas_por_duracion
+from sondeo import DESCONOCIDO, InfoMedio, sondear
+
+PELICULA = InfoMedio(5400.0, 1920, 1080, "Peli")
+
+
+def _ebml(id_: int, datos: bytes) -> bytes:
+    # Tamaño siempre en 8 bytes (vint con marcador 0x01)
+    tamano = ((1 << 56) | len(datos)).to_bytes(8, "big")
+    return id_.to_bytes((id_.bit_length() + 7) // 8, "big") + tamano + datos
+
+
+def _mkv() -> bytes:
+    info = (
+        _ebml(0x2AD7B1, (1_000_000).to_bytes(3, "big"))
+        + _ebml(0x4489, struct.pack(">d", 5_400_000.0))
+        + _ebml(0x7BA9, b"Peli\0")
+    )
+    video = _ebml(0xB0, (1920).to_bytes(2, "big")) + _ebml(
+        0xBA, (1080).to_bytes(2, "big")
+    )
+    pista = _ebml(0xAE, _ebml(0x83, b"\x01") + _ebml(0xE0, video))
+    segmento = _ebml(0x1549A966, info) + _ebml(0x1654AE6B, pista)
+    return _ebml(0x1A45DFA3, b"") + _ebml(0x18538067, segmento)
+
+
+def _caja(tipo: bytes, datos: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(datos), tipo) + datos
+
+
+def _mp4() -> bytes:
+    mvhd = bytes(12) + struct.pack(">II", 1000, 5_400_000) + bytes(80)
+    tkhd = bytes(76) + struct.pack(">II", 1920 << 16, 1080 << 16)
+    udta = _caja(b"\xa9nam", struct.pack(">HH", 4, 0) + b"Peli")
+    moov = _caja(b"mvhd", mvhd) + _caja(b"trak", _caja(b"tkhd", tkhd))
+    return (
+        _caja(b"ftyp", b"isom" + bytes(4))
+        + _caja(b"mdat", bytes(64))
+        + _caja(b"moov", moov + _caja(b"udta", udta))
+    )
+
+
+def _trozo(id_: bytes, datos: bytes) -> bytes:
+    return struct.pack("<4sI", id_, len(datos)) + datos + bytes(len(datos) & 1)
+
+
+def _avi() -> bytes:
+    avih = struct.pack("<I12xI12xII", 40_000, 135_000, 1920, 1080) + bytes(16)
+    hdrl = _trozo(b"LIST", b"hdrl" + _trozo(b"avih", avih))
+    info = _trozo(b"LIST", b"INFO" + _trozo(b"INAM", b"Peli\0"))
+    return _trozo(b"RIFF", b"AVI " + hdrl + info + _trozo(b"LIST", b"movi"))
+
+
+CONTENEDORES = {".mkv": _mkv, ".mp4": _mp4, ".avi": _avi}
+
+
+@pytest.mark.parametrize("ext", CONTENEDORES)
+def test_cabeceras(tmp_path, ext):
+    ruta = tmp_path / f"peli{ext}"
+    ruta.write_bytes(CONTENEDORES[ext]())
+    assert sondear(str(ruta)) == PELICULA
+
+
+@pytest.mark.parametrize("ext", CONTENEDORES)
+@pytest.mark.parametrize("corte", [0.3, 0.6, 0.9])
+def test_archivo_cortado(tmp_path, ext, corte):
+    datos = CONTENEDORES[ext]()
+    ruta = tmp_path / f"peli{ext}"
+    ruta.write_bytes(datos[: int(len(datos) * corte)])
+    info = sondear(str(ruta))
+    assert isinstance(info, InfoMedio)
+    assert info.duracion in (-1.0, PELICULA.duracion)
+
+
+@pytest.mark.parametrize("ext", CONTENEDORES)
+def test_archivo_danado(tmp_path, ext):
+    datos = bytearray(CONTENEDORES[ext]())
+    datos[12:] = b"\xff" * (len(datos) - 12)
+    ruta = tmp_path / f"peli{ext}"
+    ruta.write_bytes(bytes(datos))
+    assert isinstance(sondear(str(ruta)), InfoMedio)
+
+
+@pytest.mark.parametrize("datos", [b"", b"no es un video", b"\x1a\x45\xdf\xa3"])
+def test_formato_desconocido(tmp_path, datos):
+    ruta = tmp_path / "x.mkv"
+    ruta.write_bytes(datos)
+    assert sondear(str(ruta)) == DESCONOCIDO
+
+
+def test_peliculas_por_duracion(tmp_path):
+    peli, corto = tmp_path / "Peli.mkv", tmp_path / "Corto.avi"
+    peli.write_bytes(_mkv())
+    corto.write_bytes(_avi()[:40])
+    archivos = {
+        "Peli": [(str(peli), "", "")],
+        "Corto": [(str(corto), "", "")],
+        "Serie": [(str(peli), "01", "1")],
+    }
+    assert peliculas_por_duracion(archivos, 75) == {"Peli"}
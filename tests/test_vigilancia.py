@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from organizador_core import ClasificacionRepo, FrontendCola
+from vigilancia import Vigilante
+
+
+@pytest.fixture
+def vigilar(tmp_path):
+    hilos = []
+
+    def vigilar(modo, config: dict, **opciones):
+        raiz = tmp_path / "raiz"
+        raiz.mkdir(exist_ok=True)
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(config))
+        vigilante = Vigilante(
+            raiz,
+            modo,
+            tmp_path / "c.db",
+            config_path,
+            espera=0.2,
+            sondeo=True,
+            detener=threading.Event(),
+            **opciones,
+        )
+        hilo = threading.Thread(target=vigilante.correr)
+        hilo.start()
+        hilos.append((vigilante, hilo))
+        return raiz, config_path
+
+    yield vigilar
+    for vigilante, hilo in hilos:
+        vigilante.detener.set()
+        hilo.join()
+
+
+def _esperar(condicion, segundos=10.0):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        if condicion():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def test_reintenta_lo_que_espera_clasificacion(tmp_path, vigilar):
+    pendientes = tmp_path / "pendientes.txt"
+    raiz, _ = vigilar(
+        "clasificar", {"minutos_pelicula": 0}, frontend=FrontendCola(pendientes)
+    )
+    episodio = raiz / "Show Nuevo 1x01.mkv"
+    episodio.write_bytes(b"x")
+    assert _esperar(pendientes.exists)
+    titulo = pendientes.read_text(encoding="utf-8").strip()
+
+    # Otro proceso lo clasifica: el archivo se mueve sin tocarlo
+    with ClasificacionRepo(tmp_path / "c.db") as repo:
+        repo.guardar(titulo, "serie", "", "")
+    assert _esperar(lambda: not episodio.exists())
+    assert list((raiz / "Series").rglob("*.mkv"))
+
+
+def test_config_nueva_revisa_las_carpetas(vigilar):
+    raiz, config_path = vigilar("simple", {"extensiones": [".mkv"]})
+    otro = raiz / "Show 1x01.xyz"
+    otro.write_bytes(b"x")
+    time.sleep(1.0)
+    assert otro.exists()
+
+    config_path.write_text(json.dumps({"extensiones": [".mkv", ".xyz"]}))
+    st = config_path.stat()
+    os.utime(config_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert _esperar(lambda: not otro.exists())
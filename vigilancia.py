@@ -0,0 +1,524 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+from escaner import FiltroEscaneo, escanear
+from organizador_core import (
+    SIN_CLASIFICACION,
+    ClasificacionRepo,
+    Diario,
+    FrontendCola,
+    Plan,
+    agrupar_simple,
+    aplicar_plan,
+    analizar_entradas,
+    armar_plan_clasificar,
+    cargar_config,
+    clasificar_pendientes,
+    marcar_duplicados,
+    resource_path,
+)
+
+# -------------------------------
+# Fuentes de cambios
+# -------------------------------
+# Constantes de <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+_MASCARA = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+_EVENTO = struct.Struct("iIII")  # wd, mask, cookie, len; luego el nombre
+
+
+def _listar(filtro: FiltroEscaneo, carpeta: str):
+    """Archivos y subcarpetas (las que se recorren) directamente en `carpeta`."""
+    archivos, carpetas = [], []
+    try:
+        with os.scandir(carpeta) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if filtro.carpeta(entry.path):
+                            carpetas.append(entry.path)
+                    elif entry.is_file():
+                        archivos.append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return archivos, carpetas
+
+
+class FuenteInotify:
+    """
+    Avisos del kernel (inotify, solo Linux) de archivos creados, escritos o
+    movidos dentro de las carpetas que recorrería escanear(). Las carpetas
+    nuevas se vigilan en cuanto aparecen.
+    """
+
+    def __init__(self, filtro: FiltroEscaneo):
+        self.filtro = filtro
+        nombre = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(nombre, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, f"inotify_init1: {os.strerror(e)}")
+        self._carpetas = {}  # wd -> carpeta
+        try:
+            self.agregar(filtro.raiz)
+        except OSError:
+            self.cerrar()
+            raise
+
+    def agregar(self, carpeta: str) -> list:
+        """Vigila `carpeta` y sus subcarpetas; retorna los archivos que ya tienen."""
+        archivos = []
+        pila = [carpeta]
+        while pila:
+            actual = pila.pop()
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(actual), _MASCARA)
+            if wd < 0:
+                e = ctypes.get_errno()
+                if e in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                    continue  # desapareció o no se puede leer
+                # p. ej. ENOSPC: se acabó fs.inotify.max_user_watches
+                raise OSError(e, f"inotify_add_watch {actual}: {os.strerror(e)}")
+            self._carpetas[wd] = actual
+            nuevos, subcarpetas = _listar(self.filtro, actual)
+            archivos += nuevos
+            pila += subcarpetas
+        return archivos
+
+    def _quitar(self, carpeta: str):
+        # Una carpeta movida fuera: sus vigilancias apuntarían a rutas viejas
+        prefijo = carpeta + os.sep
+        for wd, actual in list(self._carpetas.items()):
+            if actual == carpeta or actual.startswith(prefijo):
+                self._libc.inotify_rm_watch(self.fd, wd)
+                del self._carpetas[wd]
+
+    def esperar(self, timeout: float):
+        """
+        Espera avisos hasta `timeout` segundos. Retorna (rutas, desborde): las
+        rutas que cambiaron y si se perdieron avisos (hay que reescanear).
+        """
+        rutas, desborde = set(), False
+        listos, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not listos:
+            return rutas, desborde
+        while True:
+            try:
+                datos = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not datos:
+                break
+            pos = 0
+            while pos < len(datos):
+                wd, mascara, _, largo = _EVENTO.unpack_from(datos, pos)
+                pos += _EVENTO.size
+                nombre = datos[pos : pos + largo].rstrip(b"\0")
+                pos += largo
+                if mascara & IN_Q_OVERFLOW:
+                    desborde = True
+                    continue
+                if mascara & IN_IGNORED:
+                    self._carpetas.pop(wd, None)
+                    continue
+                carpeta = self._carpetas.get(wd)
+                if carpeta is None or not nombre:
+                    continue
+                ruta = os.path.join(carpeta, os.fsdecode(nombre))
+                if not mascara & IN_ISDIR:
+                    if not mascara & IN_MOVED_FROM:
+                        rutas.add(ruta)
+                elif mascara & IN_MOVED_FROM:
+                    self._quitar(ruta)
+                elif self.filtro.carpeta(ruta):
+                    try:
+                        rutas.update(self.agregar(ruta))
+                    except OSError:
+                        desborde = True  # sin vigilancia: queda el reescaneo
+        return rutas, desborde
+
+    def cerrar(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class FuenteSondeo:
+    """
+    Alternativa sin inotify (otros sistemas, carpetas de red): cada
+    `intervalo` segundos compara el mtime de las carpetas y solo lista las
+    que cambiaron.
+    """
+
+    def __init__(self, filtro: FiltroEscaneo, intervalo: float = 2.0):
+        self.filtro = filtro
+        self.intervalo = intervalo
+        self._mtimes = {}  # carpeta -> mtime_ns
+        self._proximo = time.monotonic() + intervalo
+        self.agregar(filtro.raiz)
+
+    def agregar(self, carpeta: str) -> list:
+        archivos = []
+        pila = [carpeta]
+        while pila:
+            actual = pila.pop()
+            try:
+                self._mtimes[actual] = os.stat(actual).st_mtime_ns
+            except OSError:
+                continue
+            nuevos, subcarpetas = _listar(self.filtro, actual)
+            archivos += nuevos
+            pila += subcarpetas
+        return archivos
+
+    def esperar(self, timeout: float):
+        rutas = set()
+        espera = min(timeout, self._proximo - time.monotonic())
+        if espera > 0:
+            time.sleep(espera)
+        if time.monotonic() < self._proximo:
+            return rutas, False
+        self._proximo = time.monotonic() + self.intervalo
+        for carpeta, mtime in list(self._mtimes.items()):
+            try:
+                actual = os.stat(carpeta).st_mtime_ns
+            except OSError:
+                del self._mtimes[carpeta]
+                continue
+            if actual == mtime:
+                continue
+            self._mtimes[carpeta] = actual
+            archivos, subcarpetas = _listar(self.filtro, carpeta)
+            rutas.update(archivos)
+            for sub in subcarpetas:
+                if sub not in self._mtimes:
+                    rutas.update(self.agregar(sub))
+        return rutas, False
+
+    def cerrar(self):
+        pass
+
+
+def crear_fuente(filtro: FiltroEscaneo, sondeo: bool = False, intervalo=2.0):
+    # inotify si se puede; si no (u otro sistema), sondeo de mtimes
+    if not sondeo and sys.platform.startswith("linux"):
+        try:
+            return FuenteInotify(filtro)
+        except (OSError, AttributeError):
+            pass
+    return FuenteSondeo(filtro, intervalo)
+
+
+# -------------------------------
+# Espera de descargas a medias
+# -------------------------------
+class Estabilizador:
+    """
+    Retiene los archivos hasta que su tamaño y su mtime no cambian durante
+    `espera` segundos, para no mover descargas o copias a medias.
+    """
+
+    def __init__(self, espera: float):
+        self.espera = espera
+        self._pendientes = {}  # ruta -> (firma, desde)
+
+    def __len__(self):
+        return len(self._pendientes)
+
+    def agregar(self, rutas):
+        for ruta in rutas:
+            self._pendientes.setdefault(ruta, (None, 0.0))
+
+    def listos(self, entrada, ya_vistos: dict) -> list:
+        """
+        Las EntradaArchivo estables. `entrada(ruta)` las construye (o None si
+        no interesan) y se descartan las que siguen igual que en `ya_vistos`.
+        """
+        ahora = time.monotonic()
+        listos = []
+        for ruta, (firma, desde) in list(self._pendientes.items()):
+            e = entrada(ruta)
+            actual = None if e is None else (e.tamano, e.mtime_ns)
+            if actual is None or ya_vistos.get(ruta) == actual:
+                del self._pendientes[ruta]
+            elif actual != firma or e.tamano == 0:
+                self._pendientes[ruta] = (actual, ahora)
+            elif ahora - desde >= self.espera:
+                del self._pendientes[ruta]
+                listos.append(e)
+        return listos
+
+    def proxima(self) -> float:
+        """Segundos hasta que algún pendiente pueda estar listo."""
+        if not self._pendientes:
+            return float("inf")
+        desde = min(d for _, d in self._pendientes.values())
+        return max(0.0, desde + self.espera - time.monotonic())
+
+
+# -------------------------------
+# Vigilancia
+# -------------------------------
+class Vigilante:
+    """
+    Organiza los archivos nuevos de `raiz` a medida que llegan, con la misma
+    lógica que una ejecución normal (reglas, BD, frontend, duplicados y
+    diario) pero aplicada solo a los archivos nuevos: no vuelve a escanear la
+    carpeta entera salvo al empezar o si el kernel pierde avisos.
+
+    La config, el parser de nombres y la conexión a la BD quedan cargados; la
+    config se relee solo si cambia su mtime. `detener` (threading.Event)
+    termina el bucle de correr().
+
+    - al_evento(evento): cada Evento de los planes aplicados.
+    - al_lote(ejecucion, conteo): al terminar cada lote; ejecucion es el id
+      del diario ("" si no se movió nada o no se usa el diario).
+    - al_error(excepcion): si un lote falla; sin él, el error se propaga.
+    """
+
+    def __init__(
+        self,
+        raiz,
+        modo: str,
+        db_path: Path,
+        config_path: Path,
+        profundidad=0,
+        incluir=(),
+        excluir=(),
+        espera: float = 3.0,
+        hilos: int = None,
+        duplicados: str = None,
+        frontend=None,
+        sondeo: bool = False,
+        diario: bool = None,
+        detener: threading.Event = None,
+        al_evento=None,
+        al_lote=None,
+        al_error=None,
+    ):
+        self.raiz = Path(raiz).resolve()
+        self.modo = modo
+        self.db_path = Path(db_path)
+        self.config_path = Path(config_path)
+        self.escaneo = (profundidad, tuple(incluir), tuple(excluir))
+        self.espera = espera
+        self.hilos = hilos
+        self.duplicados = duplicados
+        self.frontend = frontend or FrontendCola(resource_path("pendientes.txt"))
+        self.sondeo = sondeo
+        # Como en procesar_directorios: el modo simple no anota por defecto
+        self.diario = modo != "simple" if diario is None else diario
+        self.detener = detener or threading.Event()
+        self.al_evento = al_evento
+        self.al_lote = al_lote
+        self.al_error = al_error
+        self._mtime_config = None
+        self.cfg = None
+        self.filtro = None
+        # ruta -> (tamaño, mtime_ns) de los archivos ya procesados que siguen
+        # ahí (omitidos o ya en su carpeta) y de los recién movidos
+        self.vistos = {}
+        # Rutas omitidas porque su título no tiene clasificación: no van a
+        # vistos y se reintentan cuando alguien escribe en la BD
+        self.sin_clasificar = set()
+
+    def _cargar_config(self) -> bool:
+        # Releer solo si cambió (retorna si se releyó); el motor de reglas
+        # también se cachea por mtime
+        try:
+            mtime = self.config_path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        if self.cfg is not None and mtime == self._mtime_config:
+            return False
+        self._mtime_config = mtime
+        self.cfg = cargar_config(self.config_path)
+        profundidad, incluir, excluir = self.escaneo
+        self.filtro = FiltroEscaneo(
+            self.raiz,
+            self.cfg["extensiones"],
+            profundidad,
+            incluir,
+            excluir,
+            omitir_organizadas=self.modo != "simple",
+        )
+        return True
+
+    def _todos(self) -> list:
+        # Escaneo completo: al empezar y si se perdieron avisos
+        profundidad, incluir, excluir = self.escaneo
+        entradas = escanear(
+            self.raiz,
+            self.cfg["extensiones"],
+            profundidad,
+            incluir,
+            excluir,
+            omitir_organizadas=self.modo != "simple",
+        )
+        rutas = [e.ruta for e in entradas]
+        presentes = set(rutas)
+        self.vistos = {r: v for r, v in self.vistos.items() if r in presentes}
+        self.sin_clasificar &= presentes
+        return rutas
+
+    def correr(self):
+        self._cargar_config()
+        repo = None
+        if self.modo != "simple" or self.duplicados or self.cfg["duplicados"]:
+            repo = ClasificacionRepo(self.db_path)
+        # Primero vigilar y después escanear, para no perder lo que llegue en
+        # medio (si algo aparece dos veces, el estabilizador lo junta)
+        fuente = crear_fuente(self.filtro, self.sondeo, min(2.0, self.espera))
+        estables = Estabilizador(self.espera)
+        try:
+            estables.agregar(self._todos())
+            while not self.detener.is_set():
+                rutas, desborde = fuente.esperar(min(1.0, estables.proxima()))
+                if self._cargar_config():
+                    # Con otro filtro cambian las carpetas que se recorren:
+                    # vigilar las nuevas y revisar lo que ya tienen
+                    fuente.filtro = self.filtro
+                    rutas.update(fuente.agregar(self.filtro.raiz))
+                if desborde:
+                    rutas.update(self._todos())
+                if (
+                    self.sin_clasificar
+                    and repo is not None
+                    and repo.recargar_si_cambio()
+                ):
+                    # Quizás ya se clasificaron: se vuelven a planificar
+                    rutas.update(self.sin_clasificar)
+                    self.sin_clasificar.clear()
+                estables.agregar(rutas)
+                if not len(estables):
+                    continue
+                listos = estables.listos(self.filtro.entrada, self.vistos)
+                if listos:
+                    self._procesar_lote(repo, listos)
+        finally:
+            fuente.cerrar()
+            if repo is not None:
+                repo.cerrar()
+
+    def _procesar_lote(self, repo, entradas: list):
+        try:
+            plan = self.planificar(repo, entradas)
+            ejecucion, conteo = self._aplicar(plan)
+        except Exception as e:
+            if self.al_error is None:
+                raise
+            self.al_error(e)
+            return
+        sin_clasificar = {
+            origen for origen, motivo in plan.omitidos if motivo == SIN_CLASIFICACION
+        }
+        self.sin_clasificar |= sin_clasificar
+        for e in entradas:
+            # Los movidos ya no están; el resto no se repite si no cambia,
+            # salvo los que esperan una clasificación
+            if e.ruta in sin_clasificar:
+                self.vistos.pop(e.ruta, None)
+            elif os.path.exists(e.ruta):
+                self.vistos[e.ruta] = (e.tamano, e.mtime_ns)
+        if self.al_lote is not None:
+            self.al_lote(ejecucion, conteo)
+
+    def planificar(self, repo, entradas: list) -> Plan:
+        """Plan para solo estas EntradaArchivo, como lo armaría una ejecución."""
+        cfg = self.cfg
+        if self.modo == "simple":
+            plan = agrupar_simple(
+                self.raiz, entradas, similares=cfg["agrupar_similares"]
+            )
+        else:
+            analisis = analizar_entradas(self.raiz, cfg, entradas)
+            encontrados = repo.buscar_lote(sorted(analisis.nombres_base))
+            clasificar_pendientes(
+                repo,
+                cfg,
+                encontrados,
+                analisis.nombres_nuevos,
+                self.frontend,
+                analisis.senales(),
+                analisis.por_nombre(),
+            )
+            plan = armar_plan_clasificar(analisis, encontrados)
+        duplicados = self.duplicados or cfg["duplicados"]
+        if duplicados:
+            plan = marcar_duplicados(plan, duplicados, repo, self.hilos or cfg["hilos"])
+        return plan
+
+    def _al_terminar(self, paso, destino_final, error):
+        # Lo movido no se vuelve a procesar si su destino también se vigila
+        if error is not None:
+            return
+        self.vistos.pop(paso.origen, None)
+        try:
+            st = os.stat(destino_final)
+        except OSError:
+            return
+        self.vistos[str(destino_final)] = (st.st_size, st.st_mtime_ns)
+
+    def _aplicar(self, plan: Plan):
+        cfg = self.cfg
+        hilos = self.hilos or cfg["hilos"]
+        copias = cfg["copias_por_dispositivo"]
+        if not plan.pasos or not self.diario:
+            conteo = aplicar_plan(
+                plan,
+                hilos,
+                copias,
+                self._al_terminar,
+                self.detener,
+                al_evento=self.al_evento,
+            )
+            return "", conteo
+        with Diario(self.db_path) as diario:
+            ejecucion = diario.iniciar(plan)
+
+            def al_terminar(paso, destino_final, error):
+                self._al_terminar(paso, destino_final, error)
+                diario.al_terminar(paso, destino_final, error)
+
+            conteo = aplicar_plan(
+                plan,
+                hilos,
+                copias,
+                al_terminar,
+                self.detener,
+                al_evento=self.al_evento,
+                al_reservar=diario.al_reservar,
+            )
+        return ejecucion, conteo
+
+
+def vigilar(raiz, modo: str, db_path: Path, config_path: Path, **opciones):
+    """Atajo: crea un Vigilante y corre hasta Ctrl+C o `detener`."""
+    vigilante = Vigilante(raiz, modo, db_path, config_path, **opciones)
+    try:
+        vigilante.correr()
+    except KeyboardInterrupt:
+        pass
+    return vigilante